@@ -40,17 +40,35 @@
 
 //Serial
 #define SERIAL_BAUD 115200
+// set_baud: the host may raise the link rate after connecting. The reply goes
+// out at the old rate, then the UART switches; unless a ping arrives at the
+// new rate within BAUD_CONFIRM_MS we go back to the old rate, so a rate the
+// USB bridge cannot carry never strands the link.
+#define BAUD_CONFIRM_MS 1500
+static const uint32_t BAUD_RATES[] = {115200, 230400, 460800, 921600, 1500000, 2000000};
+// Room for the host's in-flight commands while loop() is busy (e.g. in a
+// long tx_raw); the host keeps at most TX_WINDOW_BYTES (2048) outstanding.
+#define SERIAL_RX_BUFFER 4096
 
 //RAW capture
 #define RAW_MAX_PULSES        10000
 #define RAW_IDLE_TIMEOUT_US   8000
 
+//Streamed TX (tx_stream): a chunked replay is abandoned if the host stops
+//feeding it for this long after the last chunk ran out.
+#define STREAM_IDLE_TIMEOUT_US 2000000UL
+
+//RSSI: settle time after entering RX, and cap on get_rssi's peak-hold dwell.
+#define RSSI_SETTLE_US    500
+#define RSSI_MAX_DWELL_MS 200
+
 //Defaults
 static double g_freq = 315.000;   // MHz
 static String g_mod  = "OOK";
 static double g_br   = 3.30;      // kbps
 static double g_dev  = 30.0;      // kHz
 static int    g_txp  = 0;         // dBm
+static bool   g_radio_ok = false; // last applyRadioConfig() succeeded
 
 //RAW state
 volatile bool     raw_active        = false;
@@ -63,6 +81,12 @@ static   uint32_t raw_frame_start_us = 0;
 enum RxMode { RX_NONE, RX_PACKET, RX_RAW };
 static RxMode rxMode = RX_NONE;
 
+//Link speed
+static uint32_t g_baud = SERIAL_BAUD;
+static uint32_t g_baud_prev = SERIAL_BAUD;
+static bool     g_baud_pending = false;   // switched, waiting for the confirming ping
+static uint32_t g_baud_since_ms = 0;
+
 //Utils
 static void jsonLine(const String& s){ Serial.println(s); }
 static String jsonEscape(const String& in){
@@ -70,8 +94,81 @@ static String jsonEscape(const String& in){
   for(char c: in){ if(c=='"'||c=='\\'){out+='\\'; out+=c;} else if(c=='\n') out+="\\n"; else out+=c; }
   return out;
 }
-static void sendOK(const char* of){ String s="{\"event\":\"ok\",\"of\":\""; s+=of; s+="\"}"; jsonLine(s); }
-static void sendERR(const String& msg){ String s="{\"event\":\"error\",\"msg\":\""; s+=jsonEscape(msg); s+="\"}"; jsonLine(s); }
+// "id" of the command being handled (-1: none). Replies echo it so the host
+// can match them to the request; unsolicited events never carry one.
+static long g_req_id = -1;
+static void jsonReply(String s){
+  if(g_req_id >= 0){ s.remove(s.length()-1); s += ",\"id\":"; s += String(g_req_id); s += "}"; }
+  jsonLine(s);
+}
+static void sendOK(const char* of){ String s="{\"event\":\"ok\",\"of\":\""; s+=of; s+="\"}"; jsonReply(s); }
+static void sendERR(const String& msg){ String s="{\"event\":\"error\",\"msg\":\""; s+=jsonEscape(msg); s+="\"}"; jsonReply(s); }
+
+//Compact pulse encoding
+// Negotiated per link: the host lists "pulses_vlq" in ping caps and we echo it
+// in pong. Pulse durations then travel as unsigned LEB128 varints, CRC-16
+// (CCITT-FALSE) over the varint bytes, base64 in the JSON line:
+//   "pulses_vlq":"<base64>","n":<count>,"crc":<crc16>
+static bool g_vlq = false;
+static const char B64[] = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+
+static uint16_t crc16Update(uint16_t crc, uint8_t b){
+  crc ^= (uint16_t)b << 8;
+  for(int i=0;i<8;i++) crc = (crc & 0x8000) ? (uint16_t)((crc << 1) ^ 0x1021) : (uint16_t)(crc << 1);
+  return crc;
+}
+static int b64Val(char c){
+  if(c>='A'&&c<='Z') return c-'A';
+  if(c>='a'&&c<='z') return c-'a'+26;
+  if(c>='0'&&c<='9') return c-'0'+52;
+  if(c=='+') return 62;
+  if(c=='/') return 63;
+  return -1;
+}
+
+// Streams varint bytes through CRC and base64 straight into a String.
+struct VlqWriter {
+  String* out; uint8_t tri[3]; uint8_t n; uint16_t crc;
+  void begin(String* s){ out=s; n=0; crc=0xFFFF; }
+  void put(uint8_t b){
+    crc = crc16Update(crc, b);
+    tri[n++] = b;
+    if(n==3){
+      *out += B64[tri[0]>>2]; *out += B64[((tri[0]&0x03)<<4)|(tri[1]>>4)];
+      *out += B64[((tri[1]&0x0F)<<2)|(tri[2]>>6)]; *out += B64[tri[2]&0x3F];
+      n = 0;
+    }
+  }
+  void pulse(uint32_t v){ while(v >= 0x80){ put((uint8_t)((v & 0x7F) | 0x80)); v >>= 7; } put((uint8_t)v); }
+  void finish(){
+    if(n==1){ *out += B64[tri[0]>>2]; *out += B64[(tri[0]&0x03)<<4]; *out += "=="; }
+    else if(n==2){ *out += B64[tri[0]>>2]; *out += B64[((tri[0]&0x03)<<4)|(tri[1]>>4)]; *out += B64[(tri[1]&0x0F)<<2]; *out += '='; }
+    n = 0;
+  }
+};
+
+// Decodes line[b,e) (base64 varints) into raw_pulses. Returns count, -1 on error.
+static int decodeVlqPulses(const String& line, int b, int e, uint16_t want_crc){
+  uint32_t acc=0, v=0; int bits=0, shift=0, cnt=0; uint16_t crc=0xFFFF;
+  for(int i=b;i<e;i++){
+    char c = line[i];
+    if(c=='=') break;
+    int d = b64Val(c); if(d<0) return -1;
+    acc = (acc<<6) | (uint32_t)d; bits += 6;
+    if(bits < 8) continue;
+    bits -= 8;
+    uint8_t byte = (acc >> bits) & 0xFF;
+    crc = crc16Update(crc, byte);
+    v |= (uint32_t)(byte & 0x7F) << shift;
+    if(byte & 0x80){ shift += 7; if(shift > 28) return -1; }
+    else{
+      if(cnt >= RAW_MAX_PULSES) return -1;
+      raw_pulses[cnt++] = v; v = 0; shift = 0;
+    }
+  }
+  if(shift || crc != want_crc) return -1;
+  return cnt;
+}
 
 //RAW ISR
 void IRAM_ATTR gdo0_isr(){
@@ -100,6 +197,7 @@ static bool applyRadioConfig(){
   ELECHOUSE_cc1101.setSpiPin(PIN_SCK, PIN_MISO, PIN_MOSI, PIN_CS);
   ELECHOUSE_cc1101.Init();                 // void
   ELECHOUSE_cc1101.setGDO(PIN_GDO0, PIN_GDO2);
+  g_radio_ok = false;
   if (!ELECHOUSE_cc1101.getCC1101()) return false;
 
   ELECHOUSE_cc1101.setMHZ(g_freq);
@@ -112,9 +210,18 @@ static bool applyRadioConfig(){
   ELECHOUSE_cc1101.setDRate(g_br);
   ELECHOUSE_cc1101.setRxBW(270.0);
   ELECHOUSE_cc1101.setPA(g_txp);
+  g_radio_ok = true;
   return true;
 }
 
+// A frequency-only change: retune without the chip reset in Init(), so a
+// band sweep of set_config + get_rssi costs microseconds per step.
+static void retuneRadio(){
+  ELECHOUSE_cc1101.SpiStrobe(CC1101_SIDLE);
+  ELECHOUSE_cc1101.setMHZ(g_freq);
+  if(rxMode != RX_NONE) ELECHOUSE_cc1101.SetRx();
+}
+
 // --- Radio state helpers (v0.2.0) ---------------------------------------
 // The CC1101 can wedge in a FIFO-fault or calibration state after an RX/TX
 // cycle. These helpers read MARCSTATE and clear faults so RX/TX keep working
@@ -197,7 +304,8 @@ static bool txBytes(const String& hex){
 }
 
 //OOK RAW TX
-static bool txRawDirect(const uint32_t* pulses, int count, int repeat, int gap_ms, bool invert){
+// Puts the radio in async TX with GDO0 as the data input, at the idle level.
+static bool txEnter(bool invert){
   ELECHOUSE_cc1101.SpiStrobe(CC1101_SIDLE);   // clean state before TX
   clearRadioFaults();
   ELECHOUSE_cc1101.setPktFormat(3);
@@ -220,8 +328,24 @@ static bool txRawDirect(const uint32_t* pulses, int count, int repeat, int gap_m
   }
 
   pinMode(PIN_GDO0, OUTPUT);
+  digitalWrite(PIN_GDO0, invert ? HIGH : LOW);
+  return true;
+}
+
+static void txLeave(){
+  ELECHOUSE_cc1101.SpiStrobe(CC1101_SIDLE);
+  ELECHOUSE_cc1101.SpiStrobe(CC1101_SFTX);
+  pinMode(PIN_GDO0, INPUT);
+}
+
+static void txHold(uint32_t us){
+  while(us > 16000){ delayMicroseconds(16000); us -= 16000; yield(); }
+  delayMicroseconds(us);
+}
+
+static bool txRawDirect(const uint32_t* pulses, int count, int repeat, int gap_ms, bool invert){
+  if(!txEnter(invert)) return false;
   bool level = invert ? HIGH : LOW;
-  digitalWrite(PIN_GDO0, level);
   delayMicroseconds(400);
 
   for(int r=0;r<repeat;r++){
@@ -229,8 +353,7 @@ static bool txRawDirect(const uint32_t* pulses, int count, int repeat, int gap_m
       level = !level;
       digitalWrite(PIN_GDO0, level);
       uint32_t us = pulses[i]; if(us < 2) us = 2;
-      while(us > 16000){ delayMicroseconds(16000); us -= 16000; yield(); }
-      delayMicroseconds(us);
+      txHold(us);
       // Feed the task watchdog on very long pulse trains. Yielding once every
       // 128 edges keeps a huge replay from resetting the ESP32 (which on USB
       // would drop the link) while adding only negligible timing jitter.
@@ -243,17 +366,76 @@ static bool txRawDirect(const uint32_t* pulses, int count, int repeat, int gap_m
     }
   }
 
-  ELECHOUSE_cc1101.SpiStrobe(CC1101_SIDLE);
-  ELECHOUSE_cc1101.SpiStrobe(CC1101_SFTX);
-  pinMode(PIN_GDO0, INPUT);
+  txLeave();
   return true;
 }
 
+// Streamed TX: the host sends a long train as consecutive chunks, one ahead
+// of the one on air (it waits in the UART buffer). The last pulse of a chunk
+// is not waited out here: its level is set and its end recorded, so parsing
+// the next chunk happens inside it (the host cuts chunks after long idle
+// pulses). The next chunk, or the end of the stream, finishes the wait.
+static bool     g_stream = false;
+static bool     g_stream_invert = false;
+static bool     g_stream_level = LOW;
+static uint32_t g_stream_hold_until = 0;
+
+static void streamWait(){
+  int32_t left = (int32_t)(g_stream_hold_until - micros());
+  if(left > 0) txHold((uint32_t)left);
+}
+
+// Returns how many µs the chunk started after the previous one should have ended.
+static uint32_t streamChunk(const uint32_t* pulses, int count){
+  int32_t late = (int32_t)(micros() - g_stream_hold_until);
+  streamWait();
+  for(int i=0;i<count;i++){
+    g_stream_level = !g_stream_level;
+    digitalWrite(PIN_GDO0, g_stream_level);
+    uint32_t us = pulses[i]; if(us < 2) us = 2;
+    if(i+1 == count){ g_stream_hold_until = micros() + us; break; }
+    txHold(us);
+    if((i & 0x7F) == 0x7F) yield();
+  }
+  return late > 0 ? (uint32_t)late : 0;
+}
+
+static void restoreRxMode(){
+  if(rxMode == RX_RAW){ enterAsyncRx(); rawStart(); }
+  else if(rxMode == RX_PACKET){ enterPacketRx(); }
+  else { radioForceIdle(); }
+}
+
+static void streamEnd(){
+  streamWait();
+  digitalWrite(PIN_GDO0, g_stream_invert ? HIGH : LOW);
+  txLeave();
+  g_stream = false;
+  restoreRxMode();
+}
+
 //RSSI
-static void sendRSSI(){
+// Only meaningful in RX; set_config leaves the radio IDLE, so enter RX for
+// the reading and go back afterwards. dwell_ms > 0 reports the peak over
+// that window, so a sweep catches bursty transmitters.
+static void sendRSSI(uint32_t dwell_ms){
+  bool enter = marcState() != MARC_RX;
+  if(enter){
+    ELECHOUSE_cc1101.SetRx();
+    waitMarcState(MARC_RX, 100);
+    delayMicroseconds(RSSI_SETTLE_US);
+  }
   int rssi = ELECHOUSE_cc1101.getRssi();
+  if(dwell_ms > RSSI_MAX_DWELL_MS) dwell_ms = RSSI_MAX_DWELL_MS;
+  uint32_t t0 = millis();
+  while(millis() - t0 < dwell_ms){
+    int r = ELECHOUSE_cc1101.getRssi();
+    if(r > rssi) rssi = r;
+    delayMicroseconds(100);
+  }
+  if(enter) ELECHOUSE_cc1101.SpiStrobe(CC1101_SIDLE);
   String s = "{\"event\":\"rssi\",\"value_dbm\":"; s+=String(rssi); s+="}";
-  jsonLine(s);
+  jsonReply(s);
 }
 
 //JSON helpers
@@ -280,8 +462,33 @@ static String valS(const String& line, const char* k, const char* def){
   return line.substring(q1+1,q2);
 }
 
+// Decode the pulses of a tx_raw / tx_stream line into raw_pulses[].
+// Returns the count, 0 if there are none, or -1 if the payload is corrupt.
+static int parsePulses(const String& line){
+  int k = line.indexOf("\"pulses_vlq\"");
+  int b, e;
+  if(k >= 0){ b = line.indexOf('"', line.indexOf(':', k)+1); e = line.indexOf('"', b+1); }
+  else{ b = line.indexOf('['); e = line.indexOf(']', b+1); }
+  if(b<0 || e<0) return -1;
+  if(k >= 0){
+    int cnt = decodeVlqPulses(line, b+1, e, (uint16_t)valI(line,"crc",-1));
+    return cnt == valI(line,"n",-1) ? cnt : -1;
+  }
+  int cnt=0;
+  String arr = line.substring(b+1, e);
+  int start=0;
+  while(start < arr.length() && cnt < RAW_MAX_PULSES){
+    int c = arr.indexOf(',', start); if(c<0) c = arr.length();
+    String num = arr.substring(start, c); num.trim();
+    if(num.length()>0) raw_pulses[cnt++] = (uint32_t)num.toInt();
+    start = c+1;
+  }
+  return cnt;
+}
+
 //Setup / Loop
 void setup(){
+  Serial.setRxBufferSize(SERIAL_RX_BUFFER);
   Serial.begin(SERIAL_BAUD);
   delay(200);
 
@@ -317,9 +524,21 @@ void loop(){
         int rssi = ELECHOUSE_cc1101.getRssi();
         uint32_t dur_ms = (now - raw_frame_start_us)/1000UL;
 
-        String s = "{\"event\":\"rx_raw\",\"pulses_us\":[";
-        for(int i=0;i<cnt;i++){ s += String((int)raw_pulses[i]); if(i+1<cnt) s += ","; }
-        s += "],\"rssi_dbm\":"; s += String(rssi);
+        String s;
+        if(g_vlq){
+          s.reserve(cnt*3 + 96);
+          s = "{\"event\":\"rx_raw\",\"pulses_vlq\":\"";
+          VlqWriter w; w.begin(&s);
+          for(int i=0;i<cnt;i++) w.pulse(raw_pulses[i]);
+          w.finish();
+          s += "\",\"n\":"; s += String(cnt);
+          s += ",\"crc\":"; s += String(w.crc);
+        }else{
+          s = "{\"event\":\"rx_raw\",\"pulses_us\":[";
+          for(int i=0;i<cnt;i++){ s += String((int)raw_pulses[i]); if(i+1<cnt) s += ","; }
+          s += "]";
+        }
+        s += ",\"rssi_dbm\":"; s += String(rssi);
         s += ",\"dur_ms\":";    s += String((int)dur_ms);
         s += "}";
         jsonLine(s);
@@ -328,12 +547,47 @@ void loop(){
     }
   }
 
+  // Abandoned stream: the host stopped sending chunks.
+  if(g_stream && (int32_t)(micros() - g_stream_hold_until) > (int32_t)STREAM_IDLE_TIMEOUT_US){
+    streamEnd();
+    sendERR("tx_stream timeout");
+  }
+
+  // Unconfirmed link speed change: the host never reached us, go back.
+  if(g_baud_pending && millis() - g_baud_since_ms > BAUD_CONFIRM_MS){
+    g_baud = g_baud_prev;
+    Serial.updateBaudRate(g_baud);
+    g_baud_pending = false;
+  }
+
   // Commands
   String line;
-  if(readJsonLine(line)){
+  if(readJsonLine(line) && line.length() > 0){
     String cmd = valS(line, "cmd", "");
+    g_req_id = (long)valD(line, "id", -1);
+    // Any other command ends a stream first so the radio is back in a known state.
+    if(g_stream && cmd!="tx_stream" && cmd!="ping") streamEnd();
     if(cmd=="ping"){
-      jsonLine("{\"event\":\"pong\"}");
+      g_baud_pending = false;
+      g_vlq = line.indexOf("\"pulses_vlq\"") >= 0;
+      jsonReply(g_vlq ? "{\"event\":\"pong\",\"caps\":[\"pulses_vlq\"]}" : "{\"event\":\"pong\"}");
+    }
+    else if(cmd=="set_baud"){
+      uint32_t baud = (uint32_t)valD(line,"baud",0);
+      bool known = false;
+      for(uint32_t b: BAUD_RATES) if(b == baud) known = true;
+      if(!known){
+        sendERR("Unsupported baud");
+      }else{
+        String s = "{\"event\":\"ok\",\"of\":\"set_baud\",\"baud\":"; s += String(baud); s += "}";
+        jsonReply(s);
+        Serial.flush();               // the reply must leave at the old rate
+        Serial.updateBaudRate(baud);
+        g_baud_prev = g_baud;
+        g_baud = baud;
+        g_baud_pending = baud != g_baud_prev;
+        g_baud_since_ms = millis();
+      }
     }
     else if(cmd=="recover"){
       radioForceIdle();
@@ -346,12 +600,16 @@ void loop(){
       }
     }
     else if(cmd=="set_config"){
+      String mod = valS(line,"mod", g_mod.c_str());
+      double br  = valD(line,"br_kbps",g_br);
+      double dev = valD(line,"dev_khz",g_dev);
+      int    txp = valI(line,"tx_power",g_txp);
+      bool retune = g_radio_ok && mod==g_mod && br==g_br && dev==g_dev && txp==g_txp;
       g_freq = valD(line,"freq",g_freq);
-      g_mod  = valS(line,"mod", g_mod.c_str());
-      g_br   = valD(line,"br_kbps",g_br);
-      g_dev  = valD(line,"dev_khz",g_dev);
-      g_txp  = valI(line,"tx_power",g_txp);
-      if(applyRadioConfig()) sendOK("set_config"); else sendERR("set_config failed");
+      g_mod = mod; g_br = br; g_dev = dev; g_txp = txp;
+      if(retune){ retuneRadio(); sendOK("set_config"); }
+      else if(applyRadioConfig()) sendOK("set_config");
+      else sendERR("set_config failed");
     }
     else if(cmd=="rx_start"){
       String mode = valS(line,"mode","packet");
@@ -376,7 +634,7 @@ void loop(){
       sendOK("rx_stop");
     }
     else if(cmd=="get_rssi"){
-      sendRSSI();
+      sendRSSI((uint32_t)valI(line,"dwell_ms",0));
     }
     else if(cmd=="tx_bytes"){
       String hex = valS(line,"hex","");
@@ -388,38 +646,59 @@ void loop(){
       if(ok) sendOK("tx_bytes"); else sendERR("tx_bytes failed");
     }
     else if(cmd=="tx_raw"){
-      int b = line.indexOf('['), e = line.indexOf(']', b+1);
-      if(b<0 || e<0){ sendERR("tx_raw bad pulses"); }
-      else{
-        // Stop capture BEFORE parsing: the RX ISR and tx parsing share the
-        // raw_pulses[] buffer, so an incoming edge mid-parse would corrupt the
-        // outgoing frame. Detaching the interrupt first removes that race.
-        if(rxMode == RX_RAW) rawStop();
+      // Stop capture BEFORE parsing: the RX ISR and tx parsing share the
+      // raw_pulses[] buffer, so an incoming edge mid-parse would corrupt the
+      // outgoing frame. Detaching the interrupt first removes that race.
+      if(rxMode == RX_RAW) rawStop();
 
-        String arr = line.substring(b+1, e);
-        int cnt=0, start=0;
-        while(start < arr.length() && cnt < RAW_MAX_PULSES){
-          int c = arr.indexOf(',', start); if(c<0) c = arr.length();
-          String num = arr.substring(start, c); num.trim();
-          if(num.length()>0) raw_pulses[cnt++] = (uint32_t)num.toInt();
-          start = c+1;
-        }
-        int rep   = valI(line,"repeat",1);
-        int gap   = valI(line,"gap_ms",20);
-        String invS = valS(line,"invert","false");
-        bool invert = (invS=="true" || invS=="1");
+      int cnt = parsePulses(line);
+      int rep   = valI(line,"repeat",1);
+      int gap   = valI(line,"gap_ms",20);
+      String invS = valS(line,"invert","false");
+      bool invert = (invS=="true" || invS=="1");
 
-        bool ok = (cnt>0) && txRawDirect((const uint32_t*)raw_pulses, cnt, rep, gap, invert);
+      bool ok = (cnt>0) && txRawDirect((const uint32_t*)raw_pulses, cnt, rep, gap, invert);
 
-        if(rxMode == RX_RAW){ enterAsyncRx(); rawStart(); }
-        else if(rxMode == RX_PACKET){ enterPacketRx(); }
-        else { radioForceIdle(); }
+      restoreRxMode();
 
-        if(ok) sendOK("tx_raw"); else sendERR("tx_raw failed");
+      if(cnt < 0) sendERR("tx_raw bad pulses");
+      else if(ok) sendOK("tx_raw"); else sendERR("tx_raw failed");
+    }
+    else if(cmd=="tx_stream"){
+      String op = valS(line,"op","");
+      if(op=="begin"){
+        if(g_stream) streamEnd();
+        if(rxMode == RX_RAW) rawStop();
+        String invS = valS(line,"invert","false");
+        g_stream_invert = (invS=="true" || invS=="1");
+        g_stream_level = g_stream_invert ? HIGH : LOW;
+        if(txEnter(g_stream_invert)){
+          g_stream = true;
+          g_stream_hold_until = micros() + 400;
+          sendOK("tx_stream");
+        }else{
+          restoreRxMode();
+          sendERR("tx_stream failed");
+        }
+      }else if(op=="chunk"){
+        int cnt = g_stream ? parsePulses(line) : 0;
+        if(!g_stream) sendERR("tx_stream not started");
+        else if(cnt <= 0) sendERR("tx_stream bad pulses");
+        else{
+          uint32_t late = streamChunk((const uint32_t*)raw_pulses, cnt);
+          String s = "{\"event\":\"ok\",\"of\":\"tx_stream\",\"late_us\":"; s += String(late); s += "}";
+          jsonReply(s);
+        }
+      }else if(op=="end"){
+        if(g_stream) streamEnd();
+        sendOK("tx_stream");
+      }else{
+        sendERR("Unknown tx_stream op");
       }
     }
     else{
       sendERR("Unknown cmd");
     }
+    g_req_id = -1;
   }
 }
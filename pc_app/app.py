@@ -4,10 +4,21 @@
 
 # requires: PyQt6, pyserial
 # IshtarRF
-import sys, json, time, threading, queue, os, re
+import sys, sqlite3, collections, logging, queue, bisect, itertools, threading, time
+from array import array
 from pathlib import Path
 from PyQt6 import QtWidgets, QtCore, QtGui
-import serial, serial.tools.list_ports
+
+from ishtarrf import protocol
+from ishtarrf.analysis import analyze_pulses, summarize
+from ishtarrf.batch import BatchReplay, library_jobs
+from ishtarrf.importer import BulkImport
+from ishtarrf.metrics import Metrics, window
+from ishtarrf.recorder import Player, Recorder, RecordingReader
+from ishtarrf.scanner import DEFAULT_STEP_KHZ, NO_READING, BandScanner
+from ishtarrf.transforms import DEFAULT_STEPS, Pipeline
+from ishtarrf import (DEFAULT_BAUD, FAST_BAUD, DeviceManager, PulseTrain, SignalIndex, StreamReplay,
+                      flipper_preset_name, list_serial_ports, write_pulse_train)
 
 APP_DIR = Path(__file__).resolve().parent
 SIG_DIR = APP_DIR / "signals"
@@ -18,89 +29,103 @@ APP_NAME = "IshtarRF"
 APP_DIR = Path(__file__).resolve().parent
 
 
+LOG_FILE = APP_DIR / "logs" / "ishtarrf.log"
+REC_DIR = APP_DIR / "recordings"
+
 APP_ICON = "IshtarRF-logo.ico"
 APP_LOGO = "IshtarRF-logo.png"
 
-# ----------------------------- IshtarRF .sub helpers -----------------------------
-
-def pulses_to_signed_list(pulses_us, start_negative=False):
-    signed = []
-    s = -1 if start_negative else 1
-    for i, d in enumerate(pulses_us):
-        v = int(max(1, int(d)))
-        signed.append(v * (s if (i % 2 == 0) else -s))
-    return signed
-
-def flipper_preset_name(mod="OOK", rx_bw_khz=270.0):
-    if str(mod).upper() == "OOK":
-        return "FuriHalSubGhzPresetOok270Async"
-    return "FuriHalSubGhzPreset2FSKDev"
-
-def export_flipper_sub(path, freq_mhz, pulses_us, start_negative=False, preset=None, repeat=None):
-    freq_hz = int(round(float(freq_mhz) * 1_000_000))
-    if not preset:
-        preset = flipper_preset_name()
-    signed = pulses_to_signed_list(pulses_us, start_negative=start_negative)
-
-    def chunks(lst, n):
-        for i in range(0, len(lst), n):
-            yield lst[i:i+n]
-
-    lines = []
-    lines.append("Filetype: IshtarRF SubGhz RAW File")
-    lines.append("Version: 1")
-    lines.append(f"Frequency: {freq_hz}")
-    lines.append(f"Preset: {preset}")
-    lines.append("Protocol: RAW")
-    if repeat is not None:
-        lines.append(f"Repeat: {int(repeat)}")
-
-    wrap = 64
-    signed_strs = [str(x) for x in signed]
-    first = True
-    for chunk in chunks(signed_strs, wrap):
-        if first:
-            lines.append("RAW_Data: " + " ".join(chunk))
-            first = False
-        else:
-            lines.append(" " + " ".join(chunk))
-
-    content = "\n".join(lines) + "\n"
-    Path(path).write_text(content, encoding="utf-8")
-
-def parse_flipper_sub(path: Path):
-    text = Path(path).read_text(encoding="utf-8", errors="ignore")
-    freq_hz = None
-    # frequency
-    m = re.search(r"^\s*Frequency:\s*([0-9]+)", text, re.MULTILINE)
-    if m:
-        try: freq_hz = int(m.group(1))
-        except: freq_hz = None
-
-    # RAW_Data capture (from the first 'RAW_Data:' to file end)
-    raw_pos = text.find("RAW_Data")
-    pulses_signed = []
-    if raw_pos != -1:
-        tail = text[raw_pos:]
-        # Get all signed integers after 'RAW_Data'
-        nums = re.findall(r"[-]?\d+", tail)
-        # In typical .sub, the first integers after RAW_Data: are pulses directly.
-        pulses_signed = [int(n) for n in nums]
-
-    if pulses_signed:
-        start_negative = pulses_signed[0] < 0
-        abs_us = [abs(x) for x in pulses_signed]
-        return {"frequency_hz": freq_hz, "pulses_us": abs_us, "start_negative": start_negative}
-    return {"frequency_hz": freq_hz, "pulses_us": [], "start_negative": False}
+# ----------------------------- Signal library index -----------------------------
+
+class SignalListModel(QtCore.QAbstractListModel):
+    """Flat list model over SignalIndex.query() rows."""
+    NameRole = QtCore.Qt.ItemDataRole.UserRole
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index_db = index
+        self.rows = []
+        self.filter_text = ""
+        self.sort_key = "name"
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        name, freq_hz, count, dur_us = self.rows[index.row()]
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            freq = f"{freq_hz / 1_000_000:.3f} MHz" if freq_hz else "? MHz"
+            return f"{name}  —  {freq}  ·  {count} pulses"
+        if role == QtCore.Qt.ItemDataRole.ToolTipRole:
+            return f"{name}\n{count} pulses, {dur_us / 1000:.1f} ms"
+        if role == self.NameRole:
+            return name
+        return None
+
+    def reload(self):
+        self.beginResetModel()
+        self.rows = self.index_db.query(self.filter_text, self.sort_key)
+        self.endResetModel()
+
+    def set_filter(self, text):
+        self.filter_text = text.strip()
+        self.reload()
+
+    def set_sort(self, key):
+        self.sort_key = key
+        self.reload()
 
 # ----------------------------- Serial worker -----------------------------
 
-def list_serial_ports():
-    ports = []
-    for p in serial.tools.list_ports.comports():
-        label = f"{p.device} — {p.description}"
-        ports.append((label, p.device))
-    return ports
+class PortWatcher(QtCore.QObject):
+    """Polls the serial port list on a background thread; emits `changed` when it differs.
+
+    comports() can take a while with many USB devices, so it never runs on
+    the GUI thread. Polling also catches boards being plugged in or pulled.
+    """
+    POLL_S = 2.0
+    changed = QtCore.pyqtSignal(list)     # [(label, device)]
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._force = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def rescan(self):
+        """Poll now and emit even if nothing changed."""
+        self._force = True
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        last = error = None
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                ports = list_serial_ports()
+            except Exception as e:
+                if str(e) != error:
+                    error = str(e)
+                    self.failed.emit(error)
+            else:
+                error = None
+                if self._force or ports != last:
+                    self._force = False
+                    last = ports
+                    self.changed.emit(ports)
+            self._wake.wait(self.POLL_S)
+
 class ThemeManager:
     COLORS = {
         "indigo": "#0F174F",
@@ -118,7 +143,7 @@ class ThemeManager:
         QGroupBox {{ border:1px solid {COLORS['indigo_border']}; border-radius:8px; margin-top:10px; }}
         QGroupBox::title {{ subcontrol-origin: margin; left:10px; padding:0 6px; color:{COLORS['accent']}; font-weight:600; }}
         QLabel {{ color:{COLORS['text_light']}; }}
-        QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox, QPlainTextEdit, QListWidget {{
+        QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox, QPlainTextEdit, QListWidget, QListView {{
             background:#121642; color:#E6E9F2; border:1px solid {COLORS['indigo_border']}; border-radius:6px;
             selection-background-color:{COLORS['accent']}; selection-color:#101010;
         }}
@@ -140,7 +165,7 @@ class ThemeManager:
         QWidget { background:#121212; color:#EDEDED; font-size:13px; }
         QGroupBox { border:1px solid #2A2A2A; border-radius:8px; margin-top:10px; }
         QGroupBox::title { subcontrol-origin: margin; left:10px; padding:0 6px; color:#EDEDED; font-weight:600; }
-        QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox, QPlainTextEdit, QListWidget {
+        QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox, QPlainTextEdit, QListWidget, QListView {
             background:#1E1E1E; color:#F2F2F2; border:1px solid #2A2A2A; border-radius:6px;
             selection-background-color:#3A86FF; selection-color:#000;
         }
@@ -159,7 +184,7 @@ class ThemeManager:
         QWidget {{ background:#FFFFFF; color:#0B0E14; font-size:13px; }}
         QGroupBox {{ border:1px solid #D9DDE7; border-radius:8px; margin-top:10px; }}
         QGroupBox::title {{ subcontrol-origin: margin; left:10px; padding:0 6px; color:{COLORS['indigo']}; font-weight:600; }}
-        QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox, QPlainTextEdit, QListWidget {{
+        QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox, QPlainTextEdit, QListWidget, QListView {{
             background:#F5F7FB; color:#0B0E14; border:1px solid #D9DDE7; border-radius:6px;
             selection-background-color:{COLORS['indigo']}; selection-color:#FFFFFF;
         }}
@@ -180,8 +205,11 @@ class ThemeManager:
     def apply(theme_key: str, app: QtWidgets.QApplication | None = None):
         app = app or QtWidgets.QApplication.instance()
         app.setStyleSheet(ThemeManager.qss[theme_key])
+        # Nothing in the app plots; only restyle matplotlib if something already loaded it.
+        mpl = sys.modules.get("matplotlib")
+        if mpl is None:
+            return
         try:
-            import matplotlib as mpl
             if theme_key == "light":
                 base = ThemeManager.COLORS["indigo"]
                 mpl.rcParams.update({
@@ -229,74 +257,608 @@ class ThemeManager:
         QtCore.QSettings().setValue("theme", key)
 
 class SerialWorker(QtCore.QObject):
+    """Qt adapter over DeviceManager: events of every device arrive as `received` signals.
+
+    Commands take a device id; None means all connected devices. `metrics`
+    covers the GUI side of the pipeline (each link keeps its own).
+    """
     received = QtCore.pyqtSignal(dict)
-    connected = QtCore.pyqtSignal(bool, str)
+    connected = QtCore.pyqtSignal(bool, str)     # ok, device id (or the error)
+    disconnected = QtCore.pyqtSignal(str)
+    baud_changed = QtCore.pyqtSignal(str, int, int, str)   # device id, baud asked, baud in use, error or ""
     def __init__(self):
         super().__init__()
-        self.ser = None
-        self.rx_thread = None
-        self.tx_q = queue.Queue()
-        self._stop = threading.Event()
-
-    def open(self, port, baud=115200):
+        self.devices = DeviceManager(on_event=self._on_event)
+        self.recorder = None
+        self.metrics = Metrics()
+        self.metrics.gauge("qt_backlog", self._backlog)
+
+    def _backlog(self):
+        # Device events emitted but not yet handled by the GUI thread.
+        c = self.metrics.counters
+        return c.get("events_emitted", 0) - c.get("events_handled", 0)
+
+    def _on_event(self, obj):
+        # Recorded on the reader thread, so a busy GUI cannot lose bursts.
+        rec = self.recorder
+        if rec:
+            rec.record(obj)
+        self.metrics.inc("events_emitted")
+        self.received.emit(obj)
+
+    def open(self, port, baud=DEFAULT_BAUD):
         try:
-            self.close()
-            self.ser = serial.Serial(port, baudrate=baud, timeout=0.1)
-            self._stop.clear()
-            self.rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
-            self.rx_thread.start()
-            self.connected.emit(True, port)
+            self.connected.emit(True, self.devices.open(port, baud))
         except Exception as e:
             self.connected.emit(False, str(e))
 
-    def close(self):
-        self._stop.set()
-        if self.rx_thread and self.rx_thread.is_alive():
-            self.rx_thread.join(timeout=0.5)
-        if self.ser:
-            try: self.ser.close()
-            except: pass
-        self.ser = None
-
-    def _rx_loop(self):
-        buf = b""
-        while not self._stop.is_set() and self.ser:
-            try:
-                data = self.ser.read(1024)
-                if data:
-                    buf += data
-                    while b"\n" in buf:
-                        line, buf = buf.split(b"\n", 1)
-                        line=line.strip()
-                        if not line: continue
-                        try:
-                            obj = json.loads(line.decode("utf-8", errors="ignore"))
-                            self.received.emit(obj)
-                        except json.JSONDecodeError:
-                            self.received.emit({"event":"error","msg":"Bad JSON line from device","raw":line.decode(errors="ignore")})
-                else:
-                    time.sleep(0.01)
-            except Exception as e:
-                self.received.emit({"event":"error","msg":f"Serial read error: {e}"})
-                break
+    def set_baud(self, device_id, baud):
+        """Negotiate `baud` on one device in the background; the outcome arrives as baud_changed."""
+        try:
+            fut = self.devices.set_baud(device_id, baud)
+        except ConnectionError:
+            return
+        link = self.devices.link(device_id)
+        fut.add_done_callback(lambda f: self._on_baud_done(device_id, baud, link, f))
+
+    def _on_baud_done(self, device_id, baud, link, fut):
+        e = fut.exception()
+        self.baud_changed.emit(device_id, baud, link.baud or 0, (str(e) or type(e).__name__) if e else "")
 
-    @QtCore.pyqtSlot(dict)
-    def send(self, obj):
-        if not self.ser:
+    def close(self, device_id=None):
+        for d in self.devices.ids if device_id is None else [device_id]:
+            self.devices.close(d)
+            self.disconnected.emit(d)
+
+    def send(self, obj, device_id=None):
+        """Queue `obj` without blocking; returns a Future for the reply
+        ({id: Future} when sent to all devices, None if not connected).
+
+        Device errors and timeouts also arrive as `received` error events.
+        """
+        try:
+            if device_id is None:
+                return self.devices.broadcast(obj)
+            return self.devices.send(obj, device_id)
+        except ConnectionError:
+            self.received.emit({"event":"error","msg":"Not connected"})
+            return None
+
+    def stream(self, pulses, invert=False, device_id=None):
+        """Replay a train of any length via tx_stream on one or all devices.
+
+        Each device's final report arrives as a `received` stream_done event.
+        """
+        ids = self.devices.ids if device_id is None else [device_id]
+        ids = [d for d in ids if d in self.devices]
+        if not ids:
             self.received.emit({"event":"error","msg":"Not connected"})
             return
+        for d in ids:
+            replay = StreamReplay(self.devices.link(d), pulses, invert)
+            replay.start().add_done_callback(lambda fut, d=d: self._on_stream_done(d, fut))
+
+    def transmit(self, train, repeat=1, gap_ms=20, device_id=None):
+        """Send a PulseTrain with tx_raw, or tx_stream when it is too long for one command."""
+        if len(train) > protocol.RAW_MAX_PULSES:
+            self.stream(train, train.start_negative, device_id)
+            return
+        self.send(protocol.tx_raw(train, repeat, gap_ms, train.start_negative), device_id)
+
+    def _on_stream_done(self, device_id, fut):
+        if fut.exception():
+            self.received.emit({"event":"error","msg":f"tx_stream failed: {fut.exception()}",
+                                "device":device_id})
+        else:
+            self.received.emit({"event":"stream_done", **fut.result(), "device":device_id})
+
+class ScanWorker(QtCore.QObject):
+    """Runs BandScanner sweeps on a background thread until stopped.
+
+    Each sweep's result arrives as `swept`; `stopped` carries an error
+    message, or "" when the scan ended normally.
+    """
+    swept = QtCore.pyqtSignal(dict)
+    stopped = QtCore.pyqtSignal(str)
+
+    def __init__(self, scanner):
+        super().__init__()
+        self.scanner = scanner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
         try:
-            line = (json.dumps(obj) + "\n").encode("utf-8")
-            self.ser.write(line)
-            self.ser.flush()
+            while not self._stop.is_set():
+                self.swept.emit(self.scanner.scan())
         except Exception as e:
-            self.received.emit({"event":"error","msg":f"Serial write error: {e}"})
+            self.stopped.emit(str(e) or type(e).__name__)
+            return
+        self.stopped.emit("")
+
+class AnalysisWorker(QtCore.QObject):
+    """Analyzes and library-matches RX captures on a background thread.
+
+    Only the newest capture waits: captures arriving while one is being
+    worked on replace each other rather than queue, so steady RX cannot
+    back up and the GUI thread never pays for the analysis or the SQLite
+    lookup. Results arrive as `analyzed(tag, analysis summary, [(name,
+    score)], error or "")`.
+    """
+    analyzed = QtCore.pyqtSignal(str, str, list, str)
+
+    def __init__(self, sig_dir):
+        super().__init__()
+        self.sig_dir = sig_dir
+        self._cv = threading.Condition()
+        self._next = None           # (train, tag) waiting
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop and wait for a capture being worked on, so nothing is emitted after."""
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+
+    def submit(self, train, tag=""):
+        with self._cv:
+            self._next = (train, tag)
+            self._cv.notify()
+
+    def _run(self):
+        index = None        # sqlite connections are per thread: this one is ours
+        try:
+            while True:
+                with self._cv:
+                    while self._next is None and not self._stop:
+                        self._cv.wait()
+                    if self._stop:
+                        return
+                    (train, tag), self._next = self._next, None
+                summary = summarize(analyze_pulses(train, train.start_negative))
+                matches, error = [], ""
+                try:
+                    index = index or SignalIndex(self.sig_dir)
+                    matches = index.match(train)
+                except (OSError, sqlite3.Error) as e:
+                    error = str(e)
+                if self._stop:
+                    return
+                try:
+                    self.analyzed.emit(tag, summary, matches, error)
+                except RuntimeError:
+                    return  # window torn down (e.g. at exit) mid-analysis
+        finally:
+            if index:
+                index.close()
+
+# ----------------------------- Waveform view -----------------------------
+
+class PulseView(QtWidgets.QWidget):
+    """Level-of-detail square-wave view of a pulse train.
+
+    Edge times are kept as one cumulative array('q'). A frame resolves each
+    pixel column with a bisect into that array (any edge inside -> both
+    levels, otherwise the level of the covering pulse), so drawing costs
+    O(width · log n) however many pulses are loaded. Wheel zooms around the
+    cursor, drag pans, double-click resets.
+    """
+    MIN_SPAN_US = 20
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(110)
+        self.edges = array("q", [0])
+        self.start_high = True
+        self.t0, self.t1 = 0, 1
+        self._drag = None
+
+    def set_pulses(self, pulses, start_negative=False):
+        self.edges = array("q", itertools.accumulate(pulses, initial=0))
+        self.start_high = not start_negative
+        self.reset_view()
+
+    def reset_view(self):
+        self.t0, self.t1 = 0, max(1, self.edges[-1])
+        self.update()
+
+    def _plot_rect(self):
+        return QtCore.QRectF(self.rect()).adjusted(8, 22, -8, -8)
+
+    def _set_span(self, t0, t1):
+        total = max(1, self.edges[-1])
+        span = min(max(t1 - t0, self.MIN_SPAN_US), total)
+        t0 = min(max(t0, 0), total - span)
+        self.t0, self.t1 = t0, t0 + span
+        self.update()
+
+    def wheelEvent(self, e):
+        r = self._plot_rect()
+        frac = min(max((e.position().x() - r.left()) / max(1.0, r.width()), 0.0), 1.0)
+        anchor = self.t0 + (self.t1 - self.t0) * frac
+        span = (self.t1 - self.t0) * (0.8 if e.angleDelta().y() > 0 else 1.25)
+        self._set_span(anchor - span * frac, anchor + span * (1 - frac))
+
+    def mousePressEvent(self, e):
+        self._drag = (e.position().x(), self.t0, self.t1)
+
+    def mouseMoveEvent(self, e):
+        if self._drag:
+            x0, t0, t1 = self._drag
+            dt = (x0 - e.position().x()) * (t1 - t0) / max(1.0, self._plot_rect().width())
+            self._set_span(t0 + dt, t1 + dt)
+
+    def mouseReleaseEvent(self, e):
+        self._drag = None
+
+    def mouseDoubleClickEvent(self, e):
+        self.reset_view()
+
+    def paintEvent(self, e):
+        p = QtGui.QPainter(self)
+        fg = self.palette().color(QtGui.QPalette.ColorRole.WindowText)
+        p.setPen(fg)
+        n = len(self.edges) - 1
+        if n <= 0:
+            p.drawText(self.rect(), QtCore.Qt.AlignmentFlag.AlignCenter, "No signal")
+            return
+        r = self._plot_rect()
+        w = max(1, int(r.width()))
+        t0, span = self.t0, self.t1 - self.t0
+        edges = self.edges
+        # r_at[x]: number of edges at or before the left boundary of column x.
+        r_at = [bisect.bisect_right(edges, t0 + span * x / w) for x in range(w + 1)]
+        i0, i1 = max(0, r_at[0] - 1), min(n, r_at[-1])
+        p.drawText(QtCore.QRectF(self.rect()).adjusted(8, 2, -8, 0),
+                   QtCore.Qt.AlignmentFlag.AlignLeft,
+                   f"{t0 / 1000:.3f} – {self.t1 / 1000:.3f} ms   ·   {i1 - i0} of {n} pulses")
+
+        y_hi, y_lo = r.top() + 4, r.bottom() - 4
+        # Column state: 0 = low, 1 = high, 2 = edge(s) inside (both levels).
+        runs = []
+        for x in range(w):
+            i = r_at[x] - 1
+            if i < 0 or i >= n:
+                state = None
+            elif r_at[x + 1] > r_at[x]:
+                state = 2
+            else:
+                state = 1 if (i % 2 == 0) == self.start_high else 0
+            if runs and runs[-1][0] == state:
+                runs[-1][2] = x + 1
+            else:
+                runs.append([state, x, x + 1])
+
+        pen = QtGui.QPen(QtGui.QColor(ThemeManager.COLORS["accent"]))
+        pen.setWidthF(1.2)
+        p.setPen(pen)
+        p.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing, False)
+        path = QtGui.QPainterPath()
+        prev_y = None
+        for state, xa, xb in runs:
+            left, right = r.left() + xa, r.left() + xb
+            if state is None:
+                prev_y = None
+            elif state == 2:
+                p.fillRect(QtCore.QRectF(left, y_hi, right - left, y_lo - y_hi), pen.color())
+                prev_y = None
+            else:
+                y = y_hi if state else y_lo
+                if prev_y is None:
+                    path.moveTo(left, y)
+                else:
+                    path.lineTo(left, y)
+                path.lineTo(right, y)
+                prev_y = y
+        p.drawPath(path)
+
+class WaterfallView(QtWidgets.QWidget):
+    """Heatmap of an RssiWaterfall: frequency across, sweeps down (newest last).
+
+    The ring's int8 dBm bytes go through one bytes.translate() into palette
+    indexes and are drawn as a single indexed QImage, so a frame costs the
+    same however many bins a sweep has.
+    """
+    FLOOR_DBM, TOP_DBM = -110, -30
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(110)
+        self.waterfall = None
+        lut = bytearray(256)
+        for b in range(256):
+            dbm = b - 256 if b >= 128 else b
+            if dbm != NO_READING:
+                lut[b] = 1 + round(254 * min(max((dbm - self.FLOOR_DBM) / (self.TOP_DBM - self.FLOOR_DBM), 0), 1))
+        self._lut = bytes(lut)
+        # black -> blue -> red -> yellow
+        stops = [(0, (0, 0, 0)), (85, (20, 40, 200)), (170, (220, 30, 40)), (255, (255, 230, 60))]
+        self._colors = []
+        for i in range(256):
+            (a, ca), (b, cb) = next((s0, s1) for s0, s1 in zip(stops, stops[1:]) if i <= s1[0])
+            f = (i - a) / (b - a)
+            self._colors.append(QtGui.qRgb(*(round(x + (y - x) * f) for x, y in zip(ca, cb))))
+
+    def set_waterfall(self, waterfall):
+        self.waterfall = waterfall
+        self.update()
+
+    def paintEvent(self, e):
+        p = QtGui.QPainter(self)
+        p.setPen(self.palette().color(QtGui.QPalette.ColorRole.WindowText))
+        wf = self.waterfall
+        if not wf or not len(wf):
+            p.drawText(self.rect(), QtCore.Qt.AlignmentFlag.AlignCenter, "No sweep")
+            return
+        n = len(wf.freqs)
+        data = wf.ordered_bytes().translate(self._lut)
+        img = QtGui.QImage(data, n, len(wf), n, QtGui.QImage.Format.Format_Indexed8)
+        img.setColorTable(self._colors)
+        r = QtCore.QRectF(self.rect()).adjusted(8, 22, -8, -8)
+        p.drawImage(r, img)
+        p.drawText(QtCore.QRectF(self.rect()).adjusted(8, 2, -8, 0), QtCore.Qt.AlignmentFlag.AlignLeft,
+                   f"{wf.freqs[0]:.3f} – {wf.freqs[-1]:.3f} MHz   ·   {len(wf)} sweeps   ·   "
+                   f"{self.FLOOR_DBM}…{self.TOP_DBM} dBm")
+
+# ----------------------------- Event log -----------------------------
+
+class EventLog(QtCore.QObject):
+    """Batched, bounded log pipeline in front of a QPlainTextEdit.
+
+    add() only queues; a timer flushes the queue once per frame with a single
+    appendPlainText. Consecutive identical lines are coalesced ("×N"), the
+    last MAX_LINES entries are kept for re-filtering, and the full history can
+    be spilled to a rotating file from a background thread.
+    """
+    FLUSH_MS = 16
+    MAX_LINES = 5000
+    RX_KINDS = {"rx_raw", "rx_bytes"}
+    FILTERS = {
+        "all":    lambda level, kind: True,
+        "errors": lambda level, kind: level == logging.ERROR,
+        "rx":     lambda level, kind: kind in EventLog.RX_KINDS,
+        "no_rx":  lambda level, kind: kind not in EventLog.RX_KINDS,
+    }
+
+    def __init__(self, view, parent=None, metrics=None):
+        super().__init__(parent)
+        self.view = view
+        self.metrics = metrics
+        self.view.setMaximumBlockCount(self.MAX_LINES)
+        self.history = collections.deque(maxlen=self.MAX_LINES)   # [level, kind, text, count]
+        self.pending = []
+        self.accept = self.FILTERS["all"]
+        self.file_logger = None
+        self._listener = None
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(self.FLUSH_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def add(self, text, kind="app"):
+        level = logging.ERROR if text.startswith("[!]") else logging.INFO
+        last = self.pending[-1] if self.pending else None
+        if last and last[2] == text and last[1] == kind:
+            last[3] += 1
+        else:
+            self.pending.append([level, kind, text, 1])
+        if not self.timer.isActive():
+            self.timer.start()
+
+    @staticmethod
+    def _render(entry):
+        return entry[2] if entry[3] == 1 else f"{entry[2]}  (×{entry[3]})"
+
+    def flush(self):
+        batch, self.pending = self.pending, []
+        if not batch:
+            self.timer.stop()
+            return
+        t0 = time.perf_counter()
+        if self.file_logger:
+            for level, kind, text, count in batch:
+                self.file_logger.log(level, "%s%s", text, f" (x{count})" if count > 1 else "")
+        self.history.extend(batch)
+        shown = [self._render(e) for e in batch if self.accept(e[0], e[1])]
+        if shown:
+            self.view.appendPlainText("\n".join(shown[-self.MAX_LINES:]))
+        if self.metrics:
+            self.metrics.observe("log_flush_seconds", time.perf_counter() - t0)
+
+    def set_filter(self, key):
+        self.flush()
+        self.accept = self.FILTERS.get(key, self.FILTERS["all"])
+        shown = [self._render(e) for e in self.history if self.accept(e[0], e[1])]
+        self.view.setPlainText("\n".join(shown))
+        self.view.moveCursor(QtGui.QTextCursor.MoveOperation.End)
+
+    def clear(self):
+        self.pending.clear()
+        self.history.clear()
+        self.view.clear()
+
+    def set_file_logging(self, path):
+        """Spill every entry to a rotating file at `path`; None turns it off."""
+        if self._listener:
+            self._listener.stop()
+            for h in self._listener.handlers:
+                h.close()
+            self._listener = self.file_logger = None
+        if not path:
+            return
+        import logging.handlers     # only needed once file logging is on
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=5 * 1024 * 1024, backupCount=5,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        q = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(q, handler)
+        self._listener.start()
+        self.file_logger = logging.getLogger("ishtarrf.eventlog")
+        self.file_logger.propagate = False
+        self.file_logger.setLevel(logging.INFO)
+        self.file_logger.handlers[:] = [logging.handlers.QueueHandler(q)]
+
+def _fmt_latency(s):
+    if s is None:
+        return "—"
+    if s == float("inf"):
+        return "> 5 s"
+    if s < 1e-3:
+        return f"{s * 1e6:.0f} µs"
+    return f"{s * 1000:.1f} ms" if s < 1 else f"{s:.2f} s"
+
+class StatsPanel(QtWidgets.QGroupBox):
+    """Live pipeline metrics, refreshed once a second while shown.
+
+    One row per device from its SerialLink metrics, and a line for the GUI.
+    A saturated link shows as link load near 100% with the GUI keeping up;
+    host-side lag shows as a growing backlog and dispatch latency.
+    Latencies are histogram bucket bounds over the last interval.
+    """
+    REFRESH_MS = 1000
+    COLUMNS = ("Device", "RX B/s", "TX B/s", "Link load", "Lines/s", "Decode p99",
+               "Handler p99", "Reply p50", "Reply p99", "TX queue", "Errors")
+
+    def __init__(self, devices, ui_metrics, parent=None):
+        super().__init__("Live Stats", parent)
+        self.devices = devices
+        self.ui_metrics = ui_metrics
+        self.prev = {}
+        self.table = QtWidgets.QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.Stretch)
+        self.table.setMaximumHeight(110)
+        self.ui_lbl = QtWidgets.QLabel("GUI: —")
+        v = QtWidgets.QVBoxLayout(self)
+        v.addWidget(self.table)
+        v.addWidget(self.ui_lbl)
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(self.REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+
+    def _collect(self):
+        snaps = {labels["device"]: snap for labels, snap in self.devices.metrics()}
+        snaps[None] = self.ui_metrics.snapshot()
+        return snaps
+
+    def showEvent(self, event):
+        self.prev = self._collect()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        cur = self._collect()
+        windows = {k: window(self.prev[k], snap) for k, snap in cur.items() if k in self.prev}
+        self.prev = cur
+        rows = [(d, w) for d, w in windows.items() if d is not None]
+        self.table.setRowCount(len(rows))
+        for r, (device, w) in enumerate(rows):
+            rates, lat, counters = w["rates"], w["latency"], cur[device]["counters"]
+            load = w.get("link_load")
+            cells = (device, f"{rates.get('rx_bytes', 0):,.0f}", f"{rates.get('tx_bytes', 0):,.0f}",
+                     "—" if load is None else f"{load:.0%}", f"{rates.get('rx_lines', 0):,.1f}",
+                     _fmt_latency(lat.get("decode_seconds", {}).get("p99")),
+                     _fmt_latency(lat.get("handler_seconds", {}).get("p99")),
+                     _fmt_latency(lat.get("reply_seconds", {}).get("p50")),
+                     _fmt_latency(lat.get("reply_seconds", {}).get("p99")),
+                     str(w["gauges"].get("tx_queue", 0)),
+                     str(counters.get("rx_errors", 0) + counters.get("timeouts", 0)))
+            for c, text in enumerate(cells):
+                self.table.setItem(r, c, QtWidgets.QTableWidgetItem(text))
+        ui = windows.get(None)
+        if ui:
+            lat = ui["latency"]
+            self.ui_lbl.setText(
+                f"GUI: {ui['rates'].get('events_handled', 0):,.1f} events/s · "
+                f"backlog {ui['gauges'].get('qt_backlog', 0)} · "
+                f"dispatch p50 {_fmt_latency(lat.get('dispatch_seconds', {}).get('p50'))} "
+                f"p99 {_fmt_latency(lat.get('dispatch_seconds', {}).get('p99'))} · "
+                f"handler p99 {_fmt_latency(lat.get('handler_seconds', {}).get('p99'))} · "
+                f"log flush p99 {_fmt_latency(lat.get('log_flush_seconds', {}).get('p99'))}")
 
 # ----------------------------- Main Window -----------------------------
 
 class MainWindow(QtWidgets.QMainWindow):
+    playback_event = QtCore.pyqtSignal(dict)
+    playback_done = QtCore.pyqtSignal(int)
+    library_progress = QtCore.pyqtSignal(int, bool)   # rows indexed so far, finished
+    library_failed = QtCore.pyqtSignal(str)
+    duplicates_found = QtCore.pyqtSignal(list, str)   # groups, error
+    import_progress = QtCore.pyqtSignal(dict, int, int)   # file record, done, total
+    import_done = QtCore.pyqtSignal(dict)
+    batch_progress = QtCore.pyqtSignal(dict, int, int)   # job record, done, total
+    batch_done = QtCore.pyqtSignal(dict)
+
     def clear_log(self):
-        self.log.clear()
+        self.event_log.clear()
+
+    def _on_log_file_toggled(self, on):
+        QtCore.QSettings().setValue("log_to_file", on)
+        self.event_log.set_file_logging(LOG_FILE if on else None)
+
+    def _stop_recording(self):
+        rec, self.serial.recorder = self.serial.recorder, None
+        if rec:
+            rec.close()
+            self.log_add(f"[Record] stopped: {rec.stats['events']} events, "
+                         f"{rec.stats['bytes'] / 1e6:.1f} MB, {rec.stats['dropped']} dropped")
+
+    def _on_record_toggled(self, on):
+        QtCore.QSettings().setValue("record_rx", on)
+        self._stop_recording()
+        if on:
+            rec = Recorder(REC_DIR)
+            try:
+                rec.start()
+            except OSError as e:
+                self.log_add(f"[!] Recording failed: {e}")
+                self.record_chk.setChecked(False)
+                return
+            self.serial.recorder = rec
+            self.log_add(f"[Record] RX events -> {REC_DIR}")
+
+    def toggle_playback(self):
+        if self.player:
+            self.player.stop()
+            return
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Play recording from segment", str(REC_DIR),
+                                                        "Recording segments (rec-*.jsonl)")
+        if not path:
+            return
+        path = Path(path)
+        try:
+            start = int(path.stem.split("-", 1)[1]) / 1000
+        except (IndexError, ValueError):
+            self.log_add(f"[!] Not a recording segment: {path.name}")
+            return
+        self.player = Player(RecordingReader(path.parent), self.playback_event.emit,
+                             self.play_speed.currentData(), start, on_done=self.playback_done.emit)
+        self.player.start()
+        self.play_btn.setText("Stop")
+        self.log_add(f"[Playback] from {path.name} at {self.play_speed.currentText()}")
+
+    def on_playback_done(self, count):
+        self.player = None
+        self.play_btn.setText("Play…")
+        self.log_add(f"[Playback] done, {count} events")
 
     def _on_theme_changed(self):
         key = self.theme_cb.currentData()
@@ -320,10 +882,26 @@ class MainWindow(QtWidgets.QMainWindow):
         self.refresh_btn = QtWidgets.QPushButton("Refresh")
         self.connect_btn = QtWidgets.QPushButton("Connect")
         self.status_lbl = QtWidgets.QLabel("Disconnected")
+        self.device_cb = QtWidgets.QComboBox()
+        self.device_cb.addItem("All devices", userData=None)
+        self.device_cb.setToolTip("Device that commands are sent to")
         top_layout.addWidget(QtWidgets.QLabel("Port:"))
         top_layout.addWidget(self.port_cb, 2)
+        self.baud_cb = QtWidgets.QComboBox()
+        for rate in protocol.LINK_BAUDS:
+            self.baud_cb.addItem(str(rate), userData=rate)
+        self.baud_cb.setToolTip(f"Link speed. Devices start at {DEFAULT_BAUD} baud; a faster rate is "
+                                f"negotiated after connecting and falls back if the USB bridge cannot carry it. "
+                                f"Remembered per port.")
+        top_layout.addWidget(self.baud_cb)
         top_layout.addWidget(self.refresh_btn)
         top_layout.addWidget(self.connect_btn)
+        top_layout.addWidget(QtWidgets.QLabel("Target:"))
+        top_layout.addWidget(self.device_cb)
+        self.stats_btn = QtWidgets.QPushButton("Stats")
+        self.stats_btn.setCheckable(True)
+        self.stats_btn.setToolTip("Show live link and GUI metrics")
+        top_layout.addWidget(self.stats_btn)
         top_layout.addStretch()
         top_layout.addWidget(self.status_lbl)
         self.logo_lbl = QtWidgets.QLabel()
@@ -393,26 +971,85 @@ class MainWindow(QtWidgets.QMainWindow):
         h3.addWidget(self.tx_raw_btn)
         v.addLayout(h3)
 
+        # Clean up the current signal
+        h4 = QtWidgets.QHBoxLayout()
+        self.clean_steps = QtWidgets.QLineEdit(QtCore.QSettings().value("clean_steps", DEFAULT_STEPS))
+        self.clean_steps.setToolTip("Transforms in order: glitch[=µs], trim[=gap µs], quantize[=tolerance], "
+                                    "merge, resample[=tick µs]")
+        self.clean_btn = QtWidgets.QPushButton("Clean")
+        self.clean_btn.setToolTip("Apply the transforms to the current signal (Save/TX RAW use the result)")
+        h4.addWidget(QtWidgets.QLabel("Clean:"))
+        h4.addWidget(self.clean_steps, 3)
+        h4.addWidget(self.clean_btn)
+        v.addLayout(h4)
+
         # ---- Signals list & log
-        self.signals_list = QtWidgets.QListWidget()
+        self.sig_index = SignalIndex(SIG_DIR)
+        self.signals_model = SignalListModel(self.sig_index, self)
+        self.signals_list = QtWidgets.QListView()
+        self.signals_list.setModel(self.signals_model)
+        self.signals_list.setUniformItemSizes(True)
+        self.signals_list.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.signals_list.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.sig_filter = QtWidgets.QLineEdit()
+        self.sig_filter.setPlaceholderText("Filter by name or MHz…")
+        self.sig_filter.setClearButtonEnabled(True)
+        self.sig_sort = QtWidgets.QComboBox()
+        self.sig_sort.addItem("Name", userData="name")
+        self.sig_sort.addItem("Frequency", userData="frequency")
         self.load_btn = QtWidgets.QPushButton("Load Selected")
+        self.batch_btn = QtWidgets.QPushButton("Replay Selected")
+        self.batch_btn.setToolTip("Transmit the selected signals back to back, grouped by frequency "
+                                  "(Repeat and Gap from the TX RAW row)")
         self.save_btn = QtWidgets.QPushButton("Save as .sub")
+        self.dedup_btn = QtWidgets.QPushButton("Find Duplicates")
+        self.import_btn = QtWidgets.QPushButton("Import…")
+        self.import_btn.setToolTip("Validate and copy a folder of .sub files (e.g. a Flipper/Bruce SD card) into the library")
         self.start_low_chk = QtWidgets.QCheckBox("Start with LOW (-)")
 
         self.log = QtWidgets.QPlainTextEdit(); self.log.setReadOnly(True)
+        self.event_log = EventLog(self.log, self, self.serial.metrics)
+        self.log_filter = QtWidgets.QComboBox()
+        self.log_filter.addItem("All", userData="all")
+        self.log_filter.addItem("Errors", userData="errors")
+        self.log_filter.addItem("RX only", userData="rx")
+        self.log_filter.addItem("Hide RX", userData="no_rx")
+        self.log_file_chk = QtWidgets.QCheckBox("Log to file")
+        self.log_file_chk.setToolTip(str(LOG_FILE))
+        self.record_chk = QtWidgets.QCheckBox("Record RX")
+        self.record_chk.setToolTip(f"Append every RX event to {REC_DIR}")
+        self.play_speed = QtWidgets.QComboBox()
+        for label, speed in (("1×", 1.0), ("10×", 10.0), ("100×", 100.0), ("Max", 0.0)):
+            self.play_speed.addItem(label, userData=speed)
+        self.play_btn = QtWidgets.QPushButton("Play…")
+        self.play_btn.setToolTip("Re-emit a recording into the log and views")
 
         right = QtWidgets.QWidget()
         right_v = QtWidgets.QVBoxLayout(right)
         right_v.addWidget(QtWidgets.QLabel("Saved Signals (.sub)"))
+        hfl = QtWidgets.QHBoxLayout()
+        hfl.addWidget(self.sig_filter, 3)
+        hfl.addWidget(QtWidgets.QLabel("Sort:"))
+        hfl.addWidget(self.sig_sort)
+        right_v.addLayout(hfl)
         right_v.addWidget(self.signals_list, 2)
         hlr = QtWidgets.QHBoxLayout()
         hlr.addWidget(self.load_btn)
+        hlr.addWidget(self.batch_btn)
         hlr.addWidget(self.save_btn)
+        hlr.addWidget(self.dedup_btn)
+        hlr.addWidget(self.import_btn)
         right_v.addLayout(hlr)
         right_v.addWidget(self.start_low_chk)
         right_v.addWidget(QtWidgets.QLabel("Event Log"))
 
         clr_row = QtWidgets.QHBoxLayout()
+        clr_row.addWidget(QtWidgets.QLabel("Show:"))
+        clr_row.addWidget(self.log_filter)
+        clr_row.addWidget(self.log_file_chk)
+        clr_row.addWidget(self.record_chk)
+        clr_row.addWidget(self.play_speed)
+        clr_row.addWidget(self.play_btn)
         clr_row.addStretch()
         self.clear_log_btn = QtWidgets.QPushButton("Clear Log")
         self.clear_log_btn.setToolTip("مسح السجل (Ctrl+L)")
@@ -427,87 +1064,267 @@ class MainWindow(QtWidgets.QMainWindow):
         grid.addWidget(cfg, 0, 0)
         grid.addWidget(io_box, 1, 0)
         grid.addWidget(right, 0, 1, 2, 1)
+        self.view_tabs = QtWidgets.QTabWidget()
+        self.wave = PulseView()
+        self.view_tabs.addTab(self.wave, "Waveform")
+        self.view_tabs.setTabToolTip(0, "wheel: zoom · drag: pan · double-click: reset")
+        scan_tab = QtWidgets.QWidget()
+        scan_v = QtWidgets.QVBoxLayout(scan_tab)
+        hs = QtWidgets.QHBoxLayout()
+        self.scan_start = QtWidgets.QDoubleSpinBox(); self.scan_start.setDecimals(3); self.scan_start.setRange(300.000, 928.000); self.scan_start.setValue(300.000)
+        self.scan_stop  = QtWidgets.QDoubleSpinBox(); self.scan_stop.setDecimals(3); self.scan_stop.setRange(300.000, 928.000); self.scan_stop.setValue(928.000)
+        self.scan_step  = QtWidgets.QSpinBox(); self.scan_step.setRange(5, 2000); self.scan_step.setValue(DEFAULT_STEP_KHZ)
+        self.scan_dwell = QtWidgets.QSpinBox(); self.scan_dwell.setRange(0, 200)
+        self.scan_btn = QtWidgets.QPushButton("Start Scan")
+        self.scan_csv_btn = QtWidgets.QPushButton("Export CSV")
+        hs.addWidget(QtWidgets.QLabel("MHz:")); hs.addWidget(self.scan_start)
+        hs.addWidget(QtWidgets.QLabel("–")); hs.addWidget(self.scan_stop)
+        hs.addWidget(QtWidgets.QLabel("Step kHz:")); hs.addWidget(self.scan_step)
+        hs.addWidget(QtWidgets.QLabel("Dwell ms:")); hs.addWidget(self.scan_dwell)
+        hs.addStretch()
+        hs.addWidget(self.scan_btn)
+        hs.addWidget(self.scan_csv_btn)
+        scan_v.addLayout(hs)
+        self.scan_peaks = QtWidgets.QLabel("Peaks: –")
+        scan_v.addWidget(self.scan_peaks)
+        self.waterfall_view = WaterfallView()
+        scan_v.addWidget(self.waterfall_view, 1)
+        self.view_tabs.addTab(scan_tab, "Band Scan")
+        grid.addWidget(self.view_tabs, 2, 0, 1, 2)
 
         # ---- Main layout
         wrapper = QtWidgets.QWidget()
         vmain = QtWidgets.QVBoxLayout(wrapper)
         vmain.addWidget(top)
         vmain.addWidget(center, 1)
+        self.stats_panel = StatsPanel(self.serial.devices, self.serial.metrics)
+        self.stats_panel.hide()
+        vmain.addWidget(self.stats_panel)
         self.setCentralWidget(wrapper)
 
         # Connections
         self.refresh_btn.clicked.connect(self.refresh_ports)
         self.connect_btn.clicked.connect(self.toggle_connect)
+        self.port_cb.currentIndexChanged.connect(self._update_connection_ui)
+        self.port_cb.currentIndexChanged.connect(self._show_port_baud)
+        self.baud_cb.activated.connect(self._on_baud_chosen)
         self.apply_btn.clicked.connect(self.apply_config)
         self.rx_start.clicked.connect(self.do_rx_start)
-        self.rx_stop.clicked.connect(lambda: self.serial.send({"cmd":"rx_stop"}))
-        self.get_rssi.clicked.connect(lambda: self.serial.send({"cmd":"get_rssi"}))
+        self.rx_stop.clicked.connect(lambda: self.serial.send(protocol.rx_stop(), self.target()))
+        self.get_rssi.clicked.connect(lambda: self.serial.send(protocol.get_rssi(), self.target()))
         self.tx_btn.clicked.connect(self.do_tx_hex)
         self.tx_raw_btn.clicked.connect(self.do_tx_raw)
+        self.tx_raw.textEdited.connect(self._drop_tx_train)
+        self.clean_btn.clicked.connect(self.clean_current)
+        self.clean_steps.returnPressed.connect(self.clean_current)
+        self.scan_btn.clicked.connect(self.toggle_scan)
+        self.scan_csv_btn.clicked.connect(self.export_scan_csv)
         self.load_btn.clicked.connect(self.load_selected)
+        self.batch_btn.clicked.connect(self.toggle_batch)
         self.save_btn.clicked.connect(self.save_current_as_sub)
+        self.dedup_btn.clicked.connect(self.report_duplicates)
+        self.import_btn.clicked.connect(self.toggle_import)
+        self.signals_list.doubleClicked.connect(self.load_selected)
+        self.sig_filter.textChanged.connect(self.signals_model.set_filter)
+        self.sig_sort.currentIndexChanged.connect(lambda: self.signals_model.set_sort(self.sig_sort.currentData()))
         self.clear_log_btn.clicked.connect(self.clear_log)
+        self.log_filter.currentIndexChanged.connect(lambda: self.event_log.set_filter(self.log_filter.currentData()))
+        self.log_file_chk.toggled.connect(self._on_log_file_toggled)
+        self.record_chk.toggled.connect(self._on_record_toggled)
+        self.play_btn.clicked.connect(self.toggle_playback)
+        self.stats_btn.toggled.connect(self._on_stats_toggled)
+        self.playback_event.connect(self.on_device_msg)
+        self.playback_done.connect(self.on_playback_done)
         QtGui.QShortcut(QtGui.QKeySequence("Ctrl+L"), self, activated=self.clear_log)
 
         self.serial.received.connect(self.on_device_msg)
         self.serial.connected.connect(self.on_connected)
+        self.serial.disconnected.connect(self.on_disconnected)
+        self.serial.baud_changed.connect(self.on_baud_changed)
+        self.library_progress.connect(self.on_library_progress)
+        self.library_failed.connect(lambda msg: self.log_add(f"[!] Signal index refresh failed: {msg}"))
+        self.duplicates_found.connect(self.on_duplicates_found)
+        self.import_progress.connect(self.on_import_progress)
+        self.import_done.connect(self.on_import_done)
+        self.batch_progress.connect(self.on_batch_progress)
+        self.batch_done.connect(self.on_batch_done)
 
         self._port_map = []
+        self._watched_ports = None      # devices from the last PortWatcher scan
+        self._library_thread = None
+        self.import_job = None
+        self.batch_job = None
         self.current_rx = None
-        self.refresh_ports()
+        self.tx_train = None        # what TX RAW sends; the line edit only shows a preview
+        self.scan_worker = None
+        self.player = None
+        self.analysis_worker = AnalysisWorker(SIG_DIR)
+        self.analysis_worker.analyzed.connect(self.on_analyzed)
+        self.analysis_worker.start()
+        # Ports and library fill in from background threads once the window is up.
+        self.port_watcher = PortWatcher()
+        self.port_watcher.changed.connect(self.on_ports_changed)
+        self.port_watcher.failed.connect(lambda msg: self.log_add(f"[!] Port scan failed: {msg}"))
+        self.port_watcher.start()
         self.load_signals_list()
         cur_theme = ThemeManager.current()
         ThemeManager.apply(cur_theme)
         idx = self.theme_cb.findData(cur_theme)
         if idx >= 0:
             self.theme_cb.setCurrentIndex(idx)
-
-    def log_add(self, text):
-        self.log.appendPlainText(text)
+        self.log_file_chk.setChecked(QtCore.QSettings().value("log_to_file", False, type=bool))
+        self.record_chk.setChecked(QtCore.QSettings().value("record_rx", False, type=bool))
+        self.stats_btn.setChecked(QtCore.QSettings().value("show_stats", False, type=bool))
+
+    def closeEvent(self, event):
+        self.port_watcher.stop()
+        self.analysis_worker.stop()
+        if self.import_job:
+            self.import_job.cancel()
+        if self.batch_job:
+            self.batch_job.cancel()
+        if self.scan_worker:
+            self.scan_worker.stop()
+        if self.player:
+            self.player.stop()
+        self.serial.close()
+        self._stop_recording()
+        self.event_log.flush()
+        self.event_log.set_file_logging(None)
+        super().closeEvent(event)
+
+    def log_add(self, text, kind="app"):
+        self.event_log.add(text, kind)
 
     def refresh_ports(self):
+        self.port_watcher.rescan()
+
+    def on_ports_changed(self, ports):
+        keep = self._selected_port()
+        self.port_cb.blockSignals(True)
         self.port_cb.clear()
         self._port_map = []
-        for label, dev in list_serial_ports():
+        for label, dev in ports:
             self.port_cb.addItem(label)
             self._port_map.append(dev)
+        if keep in self._port_map:
+            self.port_cb.setCurrentIndex(self._port_map.index(keep))
+        self.port_cb.blockSignals(False)
+        now = set(self._port_map)
+        if self._watched_ports is not None:
+            for dev in sorted(now - self._watched_ports):
+                self.log_add(f"[Ports] + {dev}")
+            for dev in sorted(self._watched_ports - now):
+                self.log_add(f"[Ports] - {dev}")
+                # Unplugged while open: drop the link instead of waiting for read errors.
+                device_id = self.serial.devices.find(dev)
+                if device_id is not None:
+                    self.serial.close(device_id)
+        self._watched_ports = now
+        self._update_connection_ui()
+        self._show_port_baud()
+
+    def target(self):
+        return self.device_cb.currentData()
+
+    def _selected_port(self):
+        i = self.port_cb.currentIndex()
+        return self._port_map[i] if 0 <= i < len(self._port_map) else None
+
+    @staticmethod
+    def _port_bauds():
+        return dict(QtCore.QSettings().value("link_baud", {}) or {})
+
+    def _port_baud(self, port):
+        try:
+            baud = int(self._port_bauds().get(port, FAST_BAUD))
+        except (TypeError, ValueError):
+            return FAST_BAUD
+        return baud if baud > 0 else FAST_BAUD
+
+    def _show_port_baud(self):
+        port = self._selected_port()
+        device_id = self.serial.devices.find(port) if port else None
+        baud = self.serial.devices.link(device_id).baud if device_id else self._port_baud(port)
+        i = self.baud_cb.findData(baud)
+        if i >= 0:
+            self.baud_cb.setCurrentIndex(i)
+
+    def _on_baud_chosen(self):
+        port = self._selected_port()
+        if port is None:
+            return
+        baud = self.baud_cb.currentData()
+        bauds = self._port_bauds()
+        bauds[port] = baud
+        QtCore.QSettings().setValue("link_baud", bauds)
+        device_id = self.serial.devices.find(port)
+        if device_id and self.serial.devices.link(device_id).baud != baud:
+            self.serial.set_baud(device_id, baud)
+
+    def on_baud_changed(self, device_id, asked, baud, error):
+        if device_id not in self.serial.devices:
+            return
+        port = self.serial.devices.port(device_id)
+        if error or baud <= 0:
+            # Keep the rate the user chose: a failure may be transient (board
+            # still booting, noisy first ping), so the next connect tries again.
+            self.log_add(f"[!] {device_id}: {asked} baud failed: {error or 'link closed'}")
+        else:
+            self.log_add(f"[Link] {device_id} at {baud} baud")
+            # Remember what works, so the next connect goes straight to it.
+            bauds = self._port_bauds()
+            bauds[port] = baud
+            QtCore.QSettings().setValue("link_baud", bauds)
+        if port == self._selected_port():
+            self._show_port_baud()
+
+    def _update_connection_ui(self):
+        ids = self.serial.devices.ids
+        self.status_lbl.setText(f"Connected: {', '.join(ids)}" if ids else "Disconnected")
+        port = self._selected_port()
+        self.connect_btn.setText("Disconnect" if port and self.serial.devices.find(port) else "Connect")
 
     def toggle_connect(self):
-        if self.serial.ser:
-            self.serial.close()
-            self.status_lbl.setText("Disconnected")
-            self.connect_btn.setText("Connect")
+        # Connect/disconnect the selected port; other open devices stay up.
+        port = self._selected_port()
+        if port is None:
+            self.log_add("No serial ports.")
+            return
+        device_id = self.serial.devices.find(port)
+        if device_id:
+            self.serial.close(device_id)
         else:
-            if self.port_cb.count()==0:
-                self.log_add("No serial ports.")
-                return
-            port = self._port_map[self.port_cb.currentIndex()]
             self.serial.open(port)
 
     def on_connected(self, ok, info):
         if ok:
-            self.status_lbl.setText(f"Connected: {info}")
-            self.connect_btn.setText("Disconnect")
-            self.log_add(f"[+] Connected to {info}")
-            self.serial.send({"cmd":"ping"})
+            self.device_cb.addItem(info, userData=info)
+            port = self.serial.devices.port(info)
+            self.log_add(f"[+] Connected to {port} as {info}")
+            self.serial.send(protocol.ping(), info)
+            baud = self._port_baud(port)
+            if baud != DEFAULT_BAUD:
+                self.serial.set_baud(info, baud)
         else:
-            self.status_lbl.setText("Disconnected")
             self.log_add(f"[!] Connect failed: {info}")
+        self._update_connection_ui()
+
+    def on_disconnected(self, device_id):
+        idx = self.device_cb.findData(device_id)
+        if idx > 0:
+            self.device_cb.removeItem(idx)
+        self.log_add(f"[-] Disconnected {device_id}")
+        self._update_connection_ui()
 
     def apply_config(self):
-        obj = {
-            "cmd":"set_config",
-            "freq": float(self.freq.value()),
-            "mod":  self.mod.currentText(),
-            "br_kbps": float(self.br.value()),
-            "dev_khz": float(self.dev.value()),
-            "tx_power": int(self.txp.value())
-        }
-        self.serial.send(obj)
+        self.serial.send(protocol.set_config(self.freq.value(), self.mod.currentText(),
+                                             self.br.value(), self.dev.value(), self.txp.value()),
+                         self.target())
 
     def do_rx_start(self):
         mode = self.rx_mode.currentText()
-        self.serial.send({"cmd": "rx_start", "mode": mode, "timeout_ms": 40 if mode == "raw_ook" else 0})
+        self.serial.send(protocol.rx_start(mode), self.target())
 
     def do_tx_hex(self):
         hexs = self.tx_hex.text().replace(" ","")
@@ -516,65 +1333,385 @@ class MainWindow(QtWidgets.QMainWindow):
         except:
             self.log_add("[!] Invalid HEX.")
             return
-        self.serial.send({"cmd":"tx_bytes","hex":hexs})
+        self.serial.send(protocol.tx_bytes(hexs), self.target())
+
+    def _set_tx_train(self, train):
+        self.tx_train = train
+        self.tx_raw.setText(train.preview())
+        self.tx_raw.setCursorPosition(0)
+
+    def _drop_tx_train(self, _text):
+        # Typed pulses replace the captured/loaded train.
+        self.tx_train = None
 
     def do_tx_raw(self):
-        try:
-            pulses = [int(x.strip()) for x in self.tx_raw.text().split(",") if x.strip()]
-        except:
+        train = self.tx_train
+        if train is None:
+            try:
+                train = PulseTrain.parse(self.tx_raw.text(), start_negative=self.start_low_chk.isChecked())
+            except ValueError:
+                self.log_add("[!] Invalid pulses list.")
+                return
+        if not train:
             self.log_add("[!] Invalid pulses list.")
             return
-        obj = {"cmd":"tx_raw","pulses_us":pulses,"repeat":int(self.tx_rep.value()),"gap_ms":int(self.tx_gap.value())}
-        self.serial.send(obj)
+        self.serial.transmit(train, self.tx_rep.value(), self.tx_gap.value(), self.target())
+
+    def clean_current(self):
+        if not self.current_rx or self.current_rx.get("type") != "raw":
+            self.log_add("[!] No RAW signal to clean; capture or load one first.")
+            return
+        try:
+            pipeline = Pipeline.parse(self.clean_steps.text())
+        except ValueError as e:
+            self.log_add(f"[!] Clean: {e}")
+            return
+        if not pipeline:
+            return
+        train = self.current_rx["train"]
+        out = pipeline.apply(train)
+        if not out:
+            self.log_add(f"[!] Clean ({pipeline}) left no pulses; signal unchanged.")
+            return
+        QtCore.QSettings().setValue("clean_steps", self.clean_steps.text())
+        self.current_rx = {**self.current_rx, "train": out}
+        self._set_tx_train(out)
+        self.start_low_chk.setChecked(out.start_negative)
+        self.wave.set_pulses(out, out.start_negative)
+        self.log_add(f"[Clean] {pipeline}: {len(train)} → {len(out)} pulses, "
+                     f"{train.duration_us / 1000:.1f} → {out.duration_us / 1000:.1f} ms")
+        self.log_add(f"[Analysis] {summarize(analyze_pulses(out, out.start_negative))}")
+
+    def _on_stats_toggled(self, on):
+        self.stats_panel.setVisible(on)
+        QtCore.QSettings().setValue("show_stats", on)
 
     def on_device_msg(self, obj):
+        if "t" not in obj or obj.get("playback"):
+            self._handle_device_msg(obj)      # local notices, stream reports, playback
+            return
+        m = self.serial.metrics
+        m.observe("dispatch_seconds", time.time() - obj["t"])
+        t0 = time.perf_counter()
+        try:
+            self._handle_device_msg(obj)
+        finally:
+            m.observe("handler_seconds", time.perf_counter() - t0)
+            m.inc("events_handled")
+
+    def _handle_device_msg(self, obj):
         et = obj.get("event")
+        # With several boards attached, say which one spoke.
+        dev = obj.get("device")
+        tag = f"[{dev}] " if dev and len(self.serial.devices) > 1 else ""
+        if obj.get("playback"):
+            tag = f"[▶{' ' + dev if dev else ''}] "
+        log = lambda text, kind=et: self.log_add(tag + text, kind)
         if et == "error":
-            self.log_add(f"[!] {obj.get('msg')}")
+            log(f"[!] {obj.get('msg')}")
         elif et == "ok":
-            self.log_add(f"[OK] {obj.get('of')}")
+            if "late_us" in obj:
+                return      # per-chunk tx_stream ack; summarized by stream_done
+            log(f"[OK] {obj.get('of')}")
+        elif et == "stream_done":
+            log(f"[OK] tx_stream {obj['pulses']} pulses in {obj['chunks']} chunks, "
+                f"{obj['elapsed_ms'] / 1000:.1f} s, underrun {obj['late_us_total']} µs", "ok")
         elif et == "rssi":
-            self.log_add(f"[RSSI] {obj.get('value_dbm')} dBm")
+            log(f"[RSSI] {obj.get('value_dbm')} dBm")
         elif et == "rx_bytes":
-            self.current_rx = {"type":"bytes", "hex":obj.get("hex"), "meta":{"rssi_dbm":obj.get("rssi_dbm")}}
-            self.log_add(f"[RX bytes] {obj.get('hex')} @ {obj.get('rssi_dbm')} dBm")
+            self.current_rx = {"type":"bytes", "hex":obj.get("hex"), "meta":self._rx_meta(obj)}
+            log(f"[RX bytes] {obj.get('hex')} @ {obj.get('rssi_dbm')} dBm")
         elif et == "rx_raw":
-            pulses = obj.get("pulses_us", [])
-            self.current_rx = {"type":"raw", "pulses_us":pulses, "meta":{"rssi_dbm":obj.get("rssi_dbm"), "dur_ms":obj.get("dur_ms")}}
-            self.tx_raw.setText(",".join(str(x) for x in pulses))
-            self.log_add(f"[RX raw] pulses={len(pulses)} @ {obj.get('rssi_dbm')} dBm dur={obj.get('dur_ms')} ms")
+            config = obj.get("config") or {}
+            freq = config.get("freq")
+            pulses = PulseTrain(obj.get("pulses_us", ()), self.start_low_chk.isChecked(),
+                                round(float(freq) * 1_000_000) if freq else None,
+                                flipper_preset_name(config["mod"], 270.0) if config.get("mod") else None)
+            self.current_rx = {"type":"raw", "train":pulses,
+                               "meta":{**self._rx_meta(obj), "dur_ms":obj.get("dur_ms")}}
+            self._set_tx_train(pulses)
+            self.wave.set_pulses(pulses, pulses.start_negative)
+            log(f"[RX raw] pulses={len(pulses)} @ {obj.get('rssi_dbm')} dBm dur={obj.get('dur_ms')} ms")
+            self.analysis_worker.submit(pulses, tag)
         elif et == "pong":
-            self.log_add("[pong]")
+            caps = obj.get("caps")
+            log(f"[pong] caps: {', '.join(caps)}" if caps else "[pong]")
         else:
-            self.log_add(f"[DEV] {obj}")
+            log(f"[DEV] {obj}")
+
+    @staticmethod
+    def _rx_meta(obj):
+        return {"rssi_dbm":obj.get("rssi_dbm"), "device":obj.get("device"), "config":obj.get("config")}
+
+    # ---------------------- band scan ----------------------
+
+    def toggle_scan(self):
+        if self.scan_worker:
+            self.scan_worker.stop()
+            self.scan_btn.setEnabled(False)     # re-enabled once the sweep in flight ends
+            return
+        devices = self.serial.devices
+        ids = [d for d in ([self.target()] if self.target() else devices.ids) if d in devices]
+        if not ids:
+            self.log_add("[!] Not connected")
+            return
+        config = protocol.set_config(self.scan_start.value(), self.mod.currentText(),
+                                     self.br.value(), self.dev.value(), self.txp.value())
+        try:
+            scanner = BandScanner([devices.link(d) for d in ids], self.scan_start.value(),
+                                  self.scan_stop.value(), self.scan_step.value(),
+                                  self.scan_dwell.value(), config=config)
+        except ValueError as e:
+            self.log_add(f"[!] Scan: {e}")
+            return
+        self.waterfall_view.set_waterfall(scanner.waterfall)
+        self.scan_worker = ScanWorker(scanner)
+        self.scan_worker.swept.connect(self.on_swept)
+        self.scan_worker.stopped.connect(self.on_scan_stopped)
+        self.scan_worker.start()
+        self.scan_btn.setText("Stop Scan")
+        self.log_add(f"[Scan] {len(scanner.freqs)} steps on {', '.join(ids)}")
+
+    def on_swept(self, result):
+        self.waterfall_view.update()
+        peaks = ", ".join(f"{p['freq_mhz']:.3f} MHz {p['rssi_dbm']} dBm" for p in result["peaks"][:6])
+        self.scan_peaks.setText(f"Peaks: {peaks or '–'}   (floor {result['floor_dbm']} dBm, "
+                                f"{result['elapsed_ms'] / 1000:.1f} s/sweep)")
+
+    def on_scan_stopped(self, error):
+        self.scan_worker = None
+        self.scan_btn.setText("Start Scan")
+        self.scan_btn.setEnabled(True)
+        if error:
+            self.log_add(f"[!] Scan stopped: {error}")
+        self.log_add(f"[Scan] {self.scan_peaks.text()}")
+        # The sweep left the radio on its last step; put the form's config back.
+        if self.serial.devices.ids:
+            self.apply_config()
+
+    def export_scan_csv(self):
+        wf = self.waterfall_view.waterfall
+        if not wf or not len(wf):
+            self.log_add("[!] No sweep to export.")
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export sweeps", "scan.csv", "CSV (*.csv)")
+        if not path:
+            return
+        try:
+            wf.to_csv(path)
+            self.log_add(f"[+] Saved {len(wf)} sweeps to {path}")
+        except OSError as e:
+            self.log_add(f"[!] Export failed: {e}")
 
     # ---------------------- .sub ONLY: list/load/save ----------------------
 
     def load_signals_list(self):
-        self.signals_list.clear()
-        for f in sorted(SIG_DIR.glob("*.sub")):
-            self.signals_list.addItem(f.name)
+        """Show the indexed rows now and re-index the directory in the background."""
+        self.signals_model.reload()
+        if self._library_thread and self._library_thread.is_alive():
+            return
+        self._library_thread = threading.Thread(target=self._refresh_library, daemon=True)
+        self._library_thread.start()
+
+    def _refresh_library(self):
+        # Worker thread: sqlite connections are per thread, so use our own index.
+        try:
+            index = SignalIndex(SIG_DIR)
+            try:
+                done = index.refresh(on_batch=lambda n: self.library_progress.emit(n, False))
+            finally:
+                index.close()
+        except (OSError, ValueError, OverflowError, sqlite3.Error) as e:
+            self.library_failed.emit(str(e))
+            return
+        self.library_progress.emit(done, True)
+
+    def on_library_progress(self, rows, finished):
+        if rows:
+            self.signals_model.reload()
+        if finished and rows:
+            self.log_add(f"[Library] {rows} signal(s) indexed")
+
+    IMPORT_PROGRESS_S = 0.5
+    IMPORT_MAX_REJECTS = 20     # rejected files listed in the log; the journal has them all
+
+    def toggle_import(self):
+        if self.import_job:
+            self.import_job.cancel()
+            self.import_btn.setEnabled(False)
+            return
+        src = QtWidgets.QFileDialog.getExistingDirectory(self, "Import .sub files from")
+        if not src:
+            return
+        self.import_job = BulkImport(src, SIG_DIR, on_progress=self._import_progress)
+        self._import_t = 0.0
+        self._import_rejects = 0
+        self.import_btn.setText("Stop Import")
+        self.log_add(f"[Import] {src} → {SIG_DIR.name}/")
+        threading.Thread(target=self._run_import, args=(self.import_job,), daemon=True).start()
+
+    def _run_import(self, job):
+        # Worker thread; the files themselves are handled by BulkImport's process pool.
+        try:
+            summary = job.run()
+        except (OSError, sqlite3.Error) as e:
+            summary = {"failed": str(e)}
+        self.import_done.emit(summary)
+
+    def _import_progress(self, rec, done, total):
+        # Import thread: pass on rejects, and progress at most every IMPORT_PROGRESS_S.
+        now = time.monotonic()
+        if rec["status"] != "imported" or done == total or now - self._import_t >= self.IMPORT_PROGRESS_S:
+            self._import_t = now
+            self.import_progress.emit(rec, done, total)
+
+    def on_import_progress(self, rec, done, total):
+        if self.import_job and self.import_btn.isEnabled():
+            self.import_btn.setText(f"Stop Import ({done}/{total})")
+        if rec["status"] != "imported":
+            self._import_rejects += 1
+            if self._import_rejects <= self.IMPORT_MAX_REJECTS:
+                self.log_add(f"[Import] skipped {Path(rec['src']).name}: {rec.get('reason')}")
+        else:
+            self.signals_model.reload()
+
+    def on_import_done(self, summary):
+        self.import_job = None
+        self.import_btn.setText("Import…")
+        self.import_btn.setEnabled(True)
+        self.signals_model.reload()
+        if "failed" in summary:
+            self.log_add(f"[!] Import failed: {summary['failed']}")
+            return
+        more = self._import_rejects - self.IMPORT_MAX_REJECTS
+        self.log_add(f"[Import] {summary['imported']} imported, {summary['invalid']} invalid, "
+                     f"{summary['error']} errors, {summary['already_done']} already done "
+                     f"in {summary['elapsed_s']:.1f} s" + (" (stopped)" if summary["cancelled"] else "")
+                     + (f"; {more} more skipped files in {SIG_DIR.name}/.import.jsonl" if more > 0 else ""))
+
+    BATCH_MAX_ERRORS = 20       # failed jobs listed in the log
+
+    def toggle_batch(self):
+        if self.batch_job:
+            self.batch_job.cancel()
+            self.batch_btn.setEnabled(False)
+            return
+        names = [i.data(SignalListModel.NameRole) for i in self.signals_list.selectionModel().selectedRows()]
+        if not names:
+            self.log_add("[!] Select the signals to replay (Ctrl/Shift+click for several).")
+            return
+        if not len(self.serial.devices):
+            self.log_add("[!] Not connected")
+            return
+        target = self.target()
+        self.batch_job = BatchReplay(self.serial.devices, (), None if target is None else [target],
+                                     self.br.value(), self.dev.value(), self.txp.value(),
+                                     on_job=self._batch_progress)
+        policy = {"repeat": self.tx_rep.value(), "gap_ms": self.tx_gap.value(), "mod": self.mod.currentText()}
+        self._batch_t = 0.0
+        self._batch_errors = 0
+        self.batch_btn.setText("Stop Replay")
+        self.log_add(f"[Batch] replaying {len(names)} signal(s)")
+        threading.Thread(target=self._run_batch, args=(self.batch_job, names, policy), daemon=True).start()
+
+    def _run_batch(self, job, names, policy):
+        # Worker thread: sqlite connections are per thread, so load through our own index.
+        try:
+            index = SignalIndex(SIG_DIR)
+            try:
+                job.jobs = library_jobs(index, names, **policy)
+            finally:
+                index.close()
+            summary = job.run()
+        except (OSError, ValueError, sqlite3.Error, ConnectionError) as e:
+            summary = {"failed": str(e)}
+        self.batch_done.emit(summary)
+
+    def _batch_progress(self, rec, done, total):
+        # Batch thread: pass on failures, and progress at most every IMPORT_PROGRESS_S.
+        now = time.monotonic()
+        if "error" in rec or done == total or now - self._batch_t >= self.IMPORT_PROGRESS_S:
+            self._batch_t = now
+            self.batch_progress.emit(rec, done, total)
+
+    def on_batch_progress(self, rec, done, total):
+        if self.batch_job and self.batch_btn.isEnabled():
+            self.batch_btn.setText(f"Stop Replay ({done}/{total})")
+        if "error" in rec:
+            self._batch_errors += 1
+            if self._batch_errors <= self.BATCH_MAX_ERRORS:
+                self.log_add(f"[!] {rec['name']}: {rec['error']}")
+
+    def on_batch_done(self, summary):
+        self.batch_job = None
+        self.batch_btn.setText("Replay Selected")
+        self.batch_btn.setEnabled(True)
+        if "jobs" not in summary:
+            self.log_add(f"[!] Replay failed: {summary['failed']}")
+            return
+        self.log_add(f"[Batch] {summary['done']}/{summary['jobs']} sent in {summary['elapsed_ms'] / 1000:.1f} s "
+                     f"({summary['groups']} frequency group(s), {summary['configs'] + summary['retunes']} "
+                     f"config change(s)), on air {summary['duty']:.0%} of the time"
+                     + (f"; {summary['errors']} failed" if summary["errors"] else "")
+                     + (" (stopped)" if summary["cancelled"] else ""))
+        if "failed" in summary:
+            self.log_add(f"[!] Replay stopped: {summary['failed']}")
+
+    def on_analyzed(self, tag, summary, matches, error):
+        self.log_add(f"{tag}[Analysis] {summary}", "rx_raw")
+        if error:
+            self.log_add(f"[!] Signal match failed: {error}")
+        elif matches:
+            self.log_add(tag + "[Match] " + ", ".join(f"{n} {s:.0%}" for n, s in matches), "rx_raw")
+
+    def report_duplicates(self):
+        self.dedup_btn.setEnabled(False)
+        threading.Thread(target=self._find_duplicates, daemon=True).start()
+
+    def _find_duplicates(self):
+        # Worker thread: bring the index up to date first, on its own connection.
+        try:
+            index = SignalIndex(SIG_DIR)
+            try:
+                index.refresh()
+                groups = index.duplicates()
+            finally:
+                index.close()
+        except (OSError, sqlite3.Error) as e:
+            self.duplicates_found.emit([], str(e))
+            return
+        self.duplicates_found.emit(groups, "")
+
+    def on_duplicates_found(self, groups, error):
+        self.dedup_btn.setEnabled(True)
+        if error:
+            self.log_add(f"[!] Duplicate search failed: {error}")
+            return
+        self.log_add(f"[Duplicates] {len(groups)} group(s) of near-identical signals")
+        for g in groups:
+            self.log_add(f"  {g['score']:.0%}: {', '.join(g['files'])}")
 
     def load_selected(self):
-        item = self.signals_list.currentItem()
-        if not item: return
-        path = SIG_DIR / item.text()
+        idx = self.signals_list.currentIndex()
+        if not idx.isValid(): return
+        path = SIG_DIR / idx.data(SignalListModel.NameRole)
         try:
-            sub = parse_flipper_sub(path)
-            pulses = sub.get("pulses_us", [])
-            if not pulses:
+            train = PulseTrain.from_sub(self.sig_index.load(path.name))
+            if not train:
                 self.log_add(f"[!] Failed to parse {path.name}")
                 return
             # set pulses for TX
-            self.tx_raw.setText(",".join(str(x) for x in pulses))
+            self._set_tx_train(train)
             # set freq from file if present (Hz → MHz)
-            if sub.get("frequency_hz"):
-                self.freq.setValue(round(sub["frequency_hz"]/1_000_000, 3))
+            if train.frequency_hz:
+                self.freq.setValue(round(train.frequency_mhz, 3))
             # assume OOK for RAW
             self.mod.setCurrentText("OOK")
-            self.current_rx = {"type":"raw", "pulses_us":pulses, "meta":{}}
-            self.start_low_chk.setChecked(sub.get("start_negative", False))
-            self.log_add(f"[Loaded .sub] {path.name}  pulses={len(pulses)}")
+            self.current_rx = {"type":"raw", "train":train, "meta":{}}
+            self.start_low_chk.setChecked(train.start_negative)
+            self.wave.set_pulses(train, train.start_negative)
+            self.log_add(f"[Loaded .sub] {path.name}  pulses={len(train)}")
+            self.log_add(f"[Analysis] {summarize(analyze_pulses(train, train.start_negative))}")
         except Exception as e:
             self.log_add(f"[!] Load failed: {e}")
 
@@ -590,18 +1727,26 @@ class MainWindow(QtWidgets.QMainWindow):
         safe = "".join(c for c in name if c.isalnum() or c in ("-","_"))
         path = SIG_DIR / f"{safe}.sub"
         try:
-            pulses = self.current_rx.get("pulses_us", [])
-            start_neg = self.start_low_chk.isChecked()
-            preset = flipper_preset_name(self.mod.currentText(), 270.0)
-            export_flipper_sub(path, float(self.freq.value()), pulses, start_negative=start_neg, preset=preset, repeat=None)
+            train = self.current_rx["train"]
+            # The capturing device's config is on the train; fall back to the form.
+            save = PulseTrain(train.durations, self.start_low_chk.isChecked(),
+                              train.frequency_hz or round(self.freq.value() * 1_000_000),
+                              train.preset or flipper_preset_name(self.mod.currentText(), 270.0))
+            write_pulse_train(path, save)
             self.log_add(f"[+] Saved {path.name} (.sub)")
-            self.load_signals_list()
+            self.sig_index.update_file(path)
+            self.signals_model.reload()
         except Exception as e:
             self.log_add(f"[!] Save .sub failed: {e}")
 
 # ----------------------------- main -----------------------------
 
 def main():
+    if getattr(sys, "frozen", False):
+        # Bulk import uses a process pool; in the packaged .exe its workers
+        # must run the pool task instead of starting another window.
+        import multiprocessing
+        multiprocessing.freeze_support()
     QtCore.QCoreApplication.setOrganizationName("IshtarRF")
     QtCore.QCoreApplication.setApplicationName("IshtarRF")
     app = QtWidgets.QApplication(sys.argv)
@@ -0,0 +1,368 @@
+# IshtarRF micro-benchmarks
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Usage: python bench.py [pulses ...]                  legacy vs. current comparisons
+#        python bench.py --suite [--save | --check] [pulses ...]
+#
+# --suite times the capture hot paths (.sub codec, capture analysis,
+# SerialLink's reader loop over a fake port, MainWindow.on_device_msg) from 1k
+# to 1M pulses and compares each case's best time with bench_baseline.json;
+# --check exits 1 when a case is more than --threshold slower, --save records
+# a new baseline.
+# Baselines are per machine: re-save on the bench box after a known change.
+import argparse, io, json, os, platform, re, statistics, sys, tempfile, time, random, tracemalloc
+from array import array
+from functools import partial
+from pathlib import Path
+
+from ishtarrf import (LineFramer, PulseTrain, SerialLink, SignalIndex, encode_pulses_vlq, export_flipper_sub,
+                      parse_flipper_sub, protocol)
+from ishtarrf.analysis import analyze_pulses
+from ishtarrf.subfile import pulses_to_signed_list
+from ishtarrf.transforms import DEFAULT_STEPS, Pipeline
+
+BASELINE = Path(__file__).resolve().parent / "bench_baseline.json"
+SUITE_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_THRESHOLD = 0.25      # a case regresses when its best time grows by more than this
+CASE_BUDGET_S = 1.0           # keep repeating a case for about this long
+CASE_MAX_RUNS = 200
+
+# ----------------------------- helpers -----------------------------
+
+def synth_pulses(n, seed=1):
+    rnd = random.Random(seed)
+    widths = (350, 700, 1050, 1400)
+    return [rnd.choice(widths) + rnd.randint(-40, 40) for _ in range(n)]
+
+def timed(fn, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, out
+
+def legacy_parse_flipper_sub(path):
+    # The original whole-file regex parser, kept here as the comparison point.
+    text = Path(path).read_text(encoding="utf-8", errors="ignore")
+    freq_hz = None
+    m = re.search(r"^\s*Frequency:\s*([0-9]+)", text, re.MULTILINE)
+    if m:
+        freq_hz = int(m.group(1))
+    raw_pos = text.find("RAW_Data")
+    pulses_signed = []
+    if raw_pos != -1:
+        pulses_signed = [int(n) for n in re.findall(r"[-]?\d+", text[raw_pos:])]
+    if pulses_signed:
+        return {"frequency_hz": freq_hz, "pulses_us": [abs(x) for x in pulses_signed],
+                "start_negative": pulses_signed[0] < 0}
+    return {"frequency_hz": freq_hz, "pulses_us": [], "start_negative": False}
+
+def legacy_export_flipper_sub(path, freq_mhz, pulses_us):
+    # The original build-everything-then-write exporter.
+    signed_strs = [str(x) for x in pulses_to_signed_list(pulses_us)]
+    lines = ["Filetype: IshtarRF SubGhz RAW File", "Version: 1",
+             f"Frequency: {int(round(freq_mhz * 1_000_000))}",
+             "Preset: FuriHalSubGhzPresetOok270Async", "Protocol: RAW"]
+    for i in range(0, len(signed_strs), 64):
+        lines.append(("RAW_Data: " if i == 0 else " ") + " ".join(signed_strs[i:i + 64]))
+    Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def peak_alloc(fn, *args):
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+class FakeSerial(io.RawIOBase):
+    """Replays a byte stream in fixed-size driver chunks, like a USB-UART."""
+    def __init__(self, data, chunk=1024):
+        self.data = memoryview(data)
+        self.pos = 0
+        self.chunk = chunk
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk, len(self.data) - self.pos)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self.chunk, len(self.data) - self.pos)
+        b[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+def synth_stream(total_bytes, pulses_per_line=10_000):
+    line = (json.dumps({"event": "rx_raw", "pulses_us": synth_pulses(pulses_per_line),
+                        "rssi_dbm": -60, "dur_ms": 900}) + "\r\n").encode()
+    return line * max(1, total_bytes // len(line))
+
+def legacy_frame_lines(ser, decode=json.loads):
+    # The original `buf += data` / `split(b"\n", 1)` loop from SerialWorker.
+    buf, count = b"", 0
+    while True:
+        data = ser.read(1024)
+        if not data:
+            return count
+        buf += data
+        while b"\n" in buf:
+            line, buf = buf.split(b"\n", 1)
+            decode(line.strip().decode("utf-8", errors="ignore"))
+            count += 1
+
+def framer_lines(ser, decode=json.loads):
+    framer, count = LineFramer(), 0
+    while framer.read_from(ser, min(max(ser.in_waiting, 1), 65536)):
+        for frame in framer.frames():
+            decode(str(frame, "utf-8", "ignore").strip())
+            count += 1
+    return count
+
+def legacy_capture_to_tx(pulses):
+    # The original GUI path: list into the TX line edit as text, parsed back for tx_raw.
+    text = ",".join(str(x) for x in list(pulses))
+    sent = [int(x.strip()) for x in text.split(",") if x.strip()]
+    return protocol.tx_raw(sent), text
+
+def train_capture_to_tx(pulses):
+    train = PulseTrain(pulses)
+    return protocol.tx_raw(train, invert=train.start_negative), train.preview()
+
+# ----------------------------- benchmarks -----------------------------
+
+def bench_parse(n, tmp):
+    path = Path(tmp) / f"bench_{n}.sub"
+    export_flipper_sub(path, 433.92, synth_pulses(n))
+    size_kb = path.stat().st_size / 1024
+    t_old, old = timed(legacy_parse_flipper_sub, path)
+    t_new, new = timed(parse_flipper_sub, path)
+    assert list(new["pulses_us"]) == old["pulses_us"], "parsers disagree"
+    print(f"parse_flipper_sub  n={n:>8}  {size_kb:9.1f} KiB  "
+          f"regex {t_old*1000:8.1f} ms  stream {t_new*1000:8.1f} ms  x{t_old/t_new:4.1f}")
+
+def bench_export(n, tmp):
+    pulses = synth_pulses(n)
+    old_p, new_p = Path(tmp) / f"old_{n}.sub", Path(tmp) / f"new_{n}.sub"
+    t_old, _ = timed(legacy_export_flipper_sub, old_p, 433.92, pulses)
+    t_new, _ = timed(export_flipper_sub, new_p, 433.92, pulses)
+    assert old_p.read_bytes() == new_p.read_bytes(), "exporters disagree"
+    m_old = peak_alloc(legacy_export_flipper_sub, old_p, 433.92, pulses)
+    m_new = peak_alloc(export_flipper_sub, new_p, 433.92, pulses)
+    print(f"export_flipper_sub n={n:>8}  legacy {t_old*1000:8.1f} ms {m_old/1024:9.0f} KiB peak  "
+          f"stream {t_new*1000:8.1f} ms {m_new/1024:6.0f} KiB peak")
+
+def bench_cache(n, tmp):
+    sig_dir = Path(tmp) / "lib"
+    sig_dir.mkdir(exist_ok=True)
+    export_flipper_sub(sig_dir / f"bench_{n}.sub", 433.92, synth_pulses(n))
+    index = SignalIndex(sig_dir)
+    index.refresh()
+    t_parse, parsed = timed(parse_flipper_sub, sig_dir / f"bench_{n}.sub")
+    t_load, loaded = timed(index.load, f"bench_{n}.sub")
+    assert list(loaded["pulses_us"]) == list(parsed["pulses_us"]), "cache disagrees"
+    index.close()
+    print(f"cached load        n={n:>8}  parse {t_parse*1000:8.1f} ms  mmap {t_load*1000:8.3f} ms  "
+          f"x{t_parse/t_load:6.0f}")
+
+def bench_pulsetrain(n):
+    pulses = array("i", synth_pulses(n))      # as the transport decodes rx_raw
+    t_old, (old, _) = timed(legacy_capture_to_tx, pulses)
+    t_new, (new, _) = timed(train_capture_to_tx, pulses)
+    assert old["pulses_us"] == list(new["pulses_us"]), "TX paths disagree"
+    m_old = peak_alloc(legacy_capture_to_tx, pulses)
+    m_new = peak_alloc(train_capture_to_tx, pulses)
+    print(f"capture -> TX      n={n:>8}  text   {t_old*1000:8.1f} ms {m_old/1024:9.0f} KiB peak  "
+          f"train  {t_new*1000:8.3f} ms {m_new/1024:6.1f} KiB peak")
+
+def bench_framing(mb, decode, pulses_per_line=10_000):
+    data = synth_stream(mb * 1024 * 1024, pulses_per_line)
+    t_old, n_old = timed(lambda: legacy_frame_lines(FakeSerial(data), decode), repeat=1)
+    t_new, n_new = timed(lambda: framer_lines(FakeSerial(data), decode), repeat=1)
+    assert n_old == n_new, "framers disagree"
+    mib = len(data) / (1024 * 1024)
+    label = "framing+json" if decode is json.loads else "framing only"
+    print(f"{label:<18} {mib:5.1f} MiB  lines={n_new:>5} x {len(data)//n_new//1024:>4} KiB  "
+          f"legacy {mib/t_old:7.1f} MiB/s  framer {mib/t_new:7.1f} MiB/s  x{t_old/t_new:4.1f}")
+
+# ----------------------------- regression suite -----------------------------
+
+class EofSerial(FakeSerial):
+    """FakeSerial that stops a SerialLink's reader loop once the stream is consumed."""
+    def __init__(self, data, on_eof, chunk=4096):
+        super().__init__(data, chunk)
+        self.on_eof = on_eof
+
+    def readinto(self, b):
+        n = super().readinto(b)
+        if not n:
+            self.on_eof()
+        return n
+
+def rx_stream(n, vlq=False, pulses_per_line=10_000):
+    """Device lines carrying `n` pulses in total, as rx_raw events."""
+    out = bytearray()
+    while n > 0:
+        k = min(n, pulses_per_line)
+        pulses = synth_pulses(k, seed=n)
+        obj = {"event": "rx_raw", "rssi_dbm": -60, "dur_ms": sum(pulses) // 1000}
+        obj.update(encode_pulses_vlq(pulses) if vlq else {"pulses_us": pulses})
+        out += (json.dumps(obj, separators=(",", ":")) + "\r\n").encode()
+        n -= k
+    return bytes(out)
+
+def rx_loop(data):
+    # SerialLink's own reader thread body, run inline over the fake port.
+    events = []
+    link = SerialLink(on_event=events.append)
+    link.ser = EofSerial(data, link._stop.set)
+    link._rx_loop()
+    assert events and all(e.get("event") == "rx_raw" for e in events), events[:1]
+    return len(events)
+
+def dispatch_window(tmp):
+    """A MainWindow over a small scratch library, or None without PyQt6."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6 import QtCore, QtWidgets
+        import app
+    except ImportError:
+        return None
+    QtCore.QCoreApplication.setOrganizationName("IshtarRF-bench")   # keep the user's settings out
+    QtCore.QCoreApplication.setApplicationName("IshtarRF-bench")
+    qapp = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    lib = Path(tmp) / "dispatch_lib"
+    lib.mkdir(exist_ok=True)
+    for i in range(8):
+        export_flipper_sub(lib / f"lib_{i}.sub", 433.92, synth_pulses(400, seed=100 + i))
+    app.SIG_DIR = lib
+    w = app.MainWindow()
+    w._bench_app = qapp
+    return w
+
+def dispatch(w, n):
+    # One capture through the GUI handler: waveform, log and the hand-off to
+    # AnalysisWorker (the analysis itself is timed by the analyze/ cases).
+    w.on_device_msg({"event": "rx_raw", "pulses_us": array("i", synth_pulses(n)), "rssi_dbm": -60,
+                     "dur_ms": 0, "device": "bench", "config": {"freq": 433.92, "mod": "OOK"},
+                     "t": time.time()})
+    w.event_log.flush()
+
+def suite_cases(tmp, sizes, with_gui=True):
+    """Yield (name, fn) pairs; each call of fn is one timed run."""
+    tmp = Path(tmp)
+    for n in sizes:
+        pulses = synth_pulses(n)
+        sub = tmp / f"suite_{n}.sub"
+        export_flipper_sub(sub, 433.92, pulses)
+        yield f"signed_list/{n}", partial(pulses_to_signed_list, pulses)
+        yield f"transform/{n}", partial(Pipeline.parse(DEFAULT_STEPS).apply, PulseTrain(pulses))
+        yield f"export_sub/{n}", partial(export_flipper_sub, tmp / f"suite_out_{n}.sub", 433.92, pulses)
+        yield f"parse_sub/{n}", partial(parse_flipper_sub, sub)
+        yield f"analyze/{n}", partial(analyze_pulses, pulses)
+        yield f"rx_loop_json/{n}", partial(rx_loop, rx_stream(n))
+        yield f"rx_loop_vlq/{n}", partial(rx_loop, rx_stream(n, vlq=True))
+    if not with_gui:
+        return
+    w = dispatch_window(tmp)
+    if w is None:
+        print("(PyQt6 not available: skipping dispatch cases)", file=sys.stderr)
+        return
+    try:
+        for n in sizes:
+            yield f"dispatch/{n}", partial(dispatch, w, n)
+    finally:
+        w.close()
+
+def run_case(fn):
+    """Best and median seconds over up to CASE_MAX_RUNS runs within CASE_BUDGET_S (after one warm-up)."""
+    fn()
+    times, t_end = [], time.perf_counter() + CASE_BUDGET_S
+    while len(times) < CASE_MAX_RUNS and (len(times) < 3 or time.perf_counter() < t_end):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"best": min(times), "median": statistics.median(times), "runs": len(times)}
+
+def machine():
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "platform": platform.platform(), "processor": platform.processor() or platform.machine()}
+
+def run_suite(args):
+    saved = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+    baseline = saved.get("cases", {})
+    if saved and saved.get("machine") != machine():
+        print(f"note: baseline was recorded on {saved.get('machine')}", file=sys.stderr)
+    if args.threshold is None:
+        args.threshold = saved.get("threshold", DEFAULT_THRESHOLD)
+    results, regressions = {}, []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fn in suite_cases(tmp, args.sizes or SUITE_SIZES, not args.no_gui):
+            if args.only and args.only not in name:
+                continue
+            r = results[name] = run_case(fn)
+            base = baseline.get(name)
+            if base and r["best"] > base["best"] * (1 + args.threshold):
+                # Confirm before flagging: one noisy stretch should not fail a check.
+                again = run_case(fn)
+                if again["best"] < r["best"]:
+                    r = results[name] = again
+            line = f"{name:<22} {r['best']*1000:10.3f} ms  (median {r['median']*1000:10.3f}, {r['runs']:>2} runs)"
+            if base:
+                change = r["best"] / base["best"] - 1
+                flag = "REGRESSED" if change > args.threshold else "faster" if change < -args.threshold else "ok"
+                line += f"  base {base['best']*1000:10.3f} ms  {change:+7.1%}  {flag}"
+                if flag == "REGRESSED":
+                    regressions.append(name)
+            print(line, flush=True)
+    if args.save:
+        cases = {**baseline, **results} if args.only else results
+        args.baseline.write_text(json.dumps({"machine": machine(), "saved": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                             "threshold": args.threshold, "cases": cases},
+                                            indent=1, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"baseline saved to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}", file=sys.stderr)
+        return 1 if args.check else 0
+    return 0
+
+def run_comparisons(sizes):
+    sizes = sizes or [1_000, 100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            bench_parse(n, tmp)
+        for n in sizes:
+            bench_export(n, tmp)
+        for n in sizes:
+            bench_cache(n, tmp)
+    for n in sizes:
+        bench_pulsetrain(n)
+    for decode in (len, json.loads):
+        for mb in (1, 4, 16):
+            bench_framing(mb, decode)
+        bench_framing(16, decode, pulses_per_line=150_000)
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="IshtarRF micro-benchmarks")
+    ap.add_argument("sizes", nargs="*", type=int, help="pulse counts")
+    ap.add_argument("--suite", action="store_true", help="run the regression suite against the baseline")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--save", action="store_true", help="store this run as the baseline")
+    ap.add_argument("--check", action="store_true", help="exit 1 if any case regressed")
+    ap.add_argument("--threshold", type=float, default=None,
+                    help="allowed slowdown, 0.25 = 25%% (default: the baseline's)")
+    ap.add_argument("--only", help="run only cases whose name contains this")
+    ap.add_argument("--no-gui", action="store_true", help="skip the on_device_msg cases")
+    args = ap.parse_args(argv)
+    if args.suite:
+        return run_suite(args)
+    run_comparisons(args.sizes)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,422 @@
+# IshtarRF device emulator
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Emulates an ESP32 + CC1101 running IshtarRF.ino on a Linux pseudo-terminal.
+#   python emulator.py serve [options]     prints the pty path; connect the app to it
+#   python emulator.py loadtest [options]  drives SerialWorker against it and reports
+#                                          throughput/latency (exit 1 below --min-rate)
+import argparse, json, os, pty, random, sys, threading, time, tty
+from collections import Counter
+
+from ishtarrf import DEFAULT_BAUD, HOST_CAPS, PULSES_VLQ, LineFramer, decode_pulses_vlq, encode_pulses_vlq
+from ishtarrf.protocol import BAUD_CONFIRM_S, LINK_BAUDS
+
+class DeviceEmulator:
+    """Firmware look-alike speaking the JSON line protocol over a pty.
+
+    While RX is active (or with `always_rx`) it emits `rate` rx_raw / rx_bytes
+    events per second, optionally corrupting a fraction of lines and adding
+    periodic bursts. Every generated event carries `emu_t` (time.monotonic()
+    at emit) so the host side can measure delivery latency. get_rssi reads a
+    noise floor plus the `carriers` ((MHz, dBm) pairs) near the tuned frequency.
+    set_baud switches the `baud` throttle; rates above `max_baud` garble the
+    line both ways until the switch reverts, like a USB bridge that cannot
+    keep up.
+    """
+    CARRIERS = ((315.0, -55), (433.92, -40), (868.35, -62))
+    def __init__(self, rate=10.0, pulses=400, packet_len=8, malformed=0.0, burst=0,
+                 burst_every=0.0, baud=0, caps=True, ids=True, always_rx=False, seed=None,
+                 carriers=CARRIERS, max_baud=0):
+        self.rate = rate
+        self.pulses = pulses
+        self.packet_len = packet_len
+        self.malformed = malformed
+        self.burst = burst
+        self.burst_every = burst_every
+        self.baud = baud
+        self.start_baud = baud
+        self.max_baud = max_baud
+        self.link_baud = DEFAULT_BAUD
+        self.garbled = False        # at a rate above max_baud
+        self._baud_gen = 0          # bumped per switch; a stale revert timer does nothing
+        self._baud_pending = False
+        self.caps = caps
+        self.ids = ids
+        self.always_rx = always_rx
+        self.carriers = carriers
+        self.rnd = random.Random(seed)
+        self.config = {"freq": 315.0, "mod": "OOK", "br_kbps": 3.3, "dev_khz": 30.0, "tx_power": 0}
+        self.rx_mode = None
+        self.vlq = False
+        self.req_id = None
+        self.stream_until = None    # end of the held last pulse while a tx_stream is open
+        self.stats = Counter()
+        self.master = self.slave = None
+        self._stop = threading.Event()
+        self._wlock = threading.Lock()
+        self._threads = []
+
+    # ---- lifecycle
+    def start(self):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self._stop.clear()
+        for target in (self._cmd_loop, self._traffic_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        self.write_obj({"event": "pong"})
+        return os.ttyname(self.slave)
+
+    def stop(self):
+        self._stop.set()
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                try: os.close(fd)
+                except OSError: pass
+        self.master = self.slave = None
+
+    # ---- output
+    def write(self, data):
+        with self._wlock:
+            if self.master is None:
+                return
+            if self.baud:
+                # 8N1: ten bit times per byte on a real UART.
+                time.sleep(len(data) * 10 / self.baud)
+            if self.garbled:
+                data = bytes(self.rnd.choice(b"{}:,\"abc0123") for _ in data)
+            os.write(self.master, data)
+            self.stats["bytes_out"] += len(data)
+            self.stats["lines_out"] += 1
+
+    def write_obj(self, obj):
+        self.write((json.dumps(obj, separators=(",", ":")) + "\r\n").encode())
+
+    def reply(self, obj):
+        # Like sendOK/sendERR in the firmware: echo the command's "id".
+        if self.req_id is not None:
+            obj["id"] = self.req_id
+        self.write_obj(obj)
+
+    def ok(self, of):
+        self.reply({"event": "ok", "of": of})
+
+    def err(self, msg):
+        self.reply({"event": "error", "msg": msg})
+
+    # ---- command handling (mirrors loop() in IshtarRF.ino)
+    def _cmd_loop(self):
+        framer = LineFramer()
+        while not self._stop.is_set():
+            try:
+                data = os.read(self.master, 65536)
+            except OSError:
+                return
+            if not data:
+                return
+            framer.feed(data)
+            for frame in framer.frames():
+                line = str(frame, "utf-8", "ignore").strip()
+                if line:
+                    self.stats["cmds_in"] += 1
+                    self.handle(line)
+
+    def handle(self, line):
+        if self.garbled:
+            self.stats["garbled_in"] += 1
+            return
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError:
+            obj = {}
+        if not isinstance(obj, dict):
+            obj = {}
+        cmd = obj.get("cmd", "")
+        self.req_id = obj.get("id") if self.ids and isinstance(obj.get("id"), int) else None
+        try:
+            self._dispatch(cmd, obj)
+        finally:
+            self.req_id = None
+
+    def _dispatch(self, cmd, obj):
+        if cmd == "ping":
+            self._baud_pending = False
+            self.vlq = self.caps and PULSES_VLQ in (obj.get("caps") or ())
+            self.reply({"event": "pong", "caps": [PULSES_VLQ]} if self.vlq else {"event": "pong"})
+        elif cmd == "set_baud":
+            self._set_baud(obj)
+        elif cmd == "recover":
+            self.ok("recover")
+        elif cmd == "set_config":
+            for k in self.config:
+                if k in obj:
+                    self.config[k] = obj[k]
+            self.ok("set_config")
+        elif cmd == "rx_start":
+            mode = obj.get("mode", "packet")
+            if mode in ("packet", "raw_ook"):
+                self.rx_mode = mode
+                self.ok("rx_start")
+            else:
+                self.err("Unknown rx mode")
+        elif cmd == "rx_stop":
+            self.rx_mode = None
+            self.ok("rx_stop")
+        elif cmd == "get_rssi":
+            dwell = min(int(obj.get("dwell_ms", 0)), 200)
+            if dwell:
+                time.sleep(dwell / 1000)
+            self.reply({"event": "rssi", "value_dbm": self._rssi()})
+        elif cmd == "tx_bytes":
+            hexs = str(obj.get("hex", ""))
+            try:
+                ok = 0 < len(bytes.fromhex(hexs)) <= 61 and len(hexs) % 2 == 0
+            except ValueError:
+                ok = False
+            self.ok("tx_bytes") if ok else self.err("tx_bytes failed")
+        elif cmd == "tx_raw":
+            self._tx_raw(obj)
+        elif cmd == "tx_stream":
+            self._tx_stream(obj)
+        else:
+            self.err("Unknown cmd")
+
+    def _set_baud(self, obj):
+        baud = obj.get("baud")
+        if baud not in LINK_BAUDS:
+            self.err("Unsupported baud")
+            return
+        self.reply({"event": "ok", "of": "set_baud", "baud": baud})
+        prev = self.link_baud
+        self._switch(baud)
+        self._baud_pending = baud != prev
+        if self._baud_pending:
+            t = threading.Timer(BAUD_CONFIRM_S, self._baud_timeout, (self._baud_gen, prev))
+            t.daemon = True
+            t.start()
+
+    def _switch(self, baud):
+        self._baud_gen += 1
+        self.link_baud = baud
+        if self.start_baud:
+            self.baud = baud
+        self.garbled = bool(self.max_baud) and baud > self.max_baud
+        self.stats["baud_switches"] += 1
+
+    def _baud_timeout(self, gen, prev):
+        # No confirming ping: back to the previous rate, as the firmware does.
+        if self._baud_pending and gen == self._baud_gen:
+            self._baud_pending = False
+            self._switch(prev)
+
+    def _rssi(self):
+        # 270 kHz RX filter: about 1 dB down per 5 kHz of detuning.
+        freq = float(self.config["freq"])
+        level = self.rnd.randint(-102, -94)
+        for f, dbm in self.carriers:
+            level = max(level, round(dbm - abs(freq - f) * 200))
+        return level
+
+    @staticmethod
+    def _pulses(obj):
+        if PULSES_VLQ in obj:
+            return decode_pulses_vlq(obj)
+        return [int(x) for x in obj["pulses_us"]][:10000]
+
+    def _tx_raw(self, obj):
+        try:
+            pulses = self._pulses(obj)
+        except (KeyError, TypeError, ValueError):
+            self.err("tx_raw bad pulses")
+            return
+        if not pulses:
+            self.err("tx_raw failed")
+            return
+        repeat = max(1, int(obj.get("repeat", 1)))
+        self.stats["tx_pulses"] += len(pulses) * repeat
+        # The firmware transmits synchronously and reads nothing meanwhile;
+        # it waits gap_ms between copies only.
+        time.sleep(sum(pulses) / 1e6 * repeat + int(obj.get("gap_ms", 20)) / 1000 * (repeat - 1))
+        self.ok("tx_raw")
+
+    # ---- generated RX traffic
+    def _traffic_loop(self):
+        next_burst = time.monotonic() + self.burst_every if self.burst_every else None
+        period = 1.0 / self.rate if self.rate > 0 else None
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            mode = "raw_ook" if self.always_rx and not self.rx_mode else self.rx_mode
+            if not mode or not period:
+                time.sleep(0.02)
+                next_t = time.monotonic()
+                continue
+            n = 1
+            if next_burst and time.monotonic() >= next_burst:
+                n += self.burst
+                next_burst += self.burst_every
+            try:
+                for _ in range(n):
+                    self._emit_rx(mode)
+            except OSError:
+                return
+            next_t += period
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.monotonic()
+
+    def _emit_rx(self, mode):
+        rnd = self.rnd
+        rssi = rnd.randint(-95, -35)
+        if mode == "packet":
+            obj = {"event": "rx_bytes", "hex": rnd.randbytes(self.packet_len).hex().upper(), "rssi_dbm": rssi}
+        else:
+            widths = (350, 700, 1050)
+            pulses = [rnd.choice(widths) + rnd.randint(-30, 30) for _ in range(self.pulses)]
+            obj = {"event": "rx_raw", "rssi_dbm": rssi, "dur_ms": sum(pulses) // 1000}
+            if self.vlq:
+                obj.update(encode_pulses_vlq(pulses))
+            else:
+                obj["pulses_us"] = pulses
+        obj["emu_t"] = time.monotonic()
+        line = json.dumps(obj, separators=(",", ":")).encode()
+        if self.malformed and rnd.random() < self.malformed:
+            line = line[:rnd.randint(1, max(1, len(line) - 1))]
+            self.stats["malformed"] += 1
+        self.stats[obj["event"]] += 1
+        self.write(line + b"\r\n")
+
+    def _stream_wait(self):
+        left = self.stream_until - time.monotonic()
+        if left > 0:
+            time.sleep(left)
+
+    def _tx_stream(self, obj):
+        # Mirrors streamChunk(): the last pulse of a chunk is held while the
+        # next command is read; late_us is how far past that hold it started.
+        op = obj.get("op")
+        if op == "begin":
+            self.stream_until = time.monotonic() + 0.0004
+            self.ok("tx_stream")
+        elif op == "chunk":
+            if self.stream_until is None:
+                self.err("tx_stream not started")
+                return
+            try:
+                pulses = self._pulses(obj)
+            except (KeyError, TypeError, ValueError):
+                pulses = []
+            if not pulses:
+                self.err("tx_stream bad pulses")
+                return
+            late = time.monotonic() - self.stream_until
+            self._stream_wait()
+            time.sleep(sum(pulses[:-1]) / 1e6)
+            self.stream_until = time.monotonic() + pulses[-1] / 1e6
+            self.stats["tx_pulses"] += len(pulses)
+            self.stats["stream_chunks"] += 1
+            self.reply({"event": "ok", "of": "tx_stream", "late_us": max(0, int(late * 1e6))})
+        elif op == "end":
+            if self.stream_until is not None:
+                self._stream_wait()
+                self.stream_until = None
+            self.ok("tx_stream")
+        else:
+            self.err("Unknown tx_stream op")
+
+# ----------------------------- CLI -----------------------------
+
+def _emulator_from(args):
+    return DeviceEmulator(rate=args.rate, pulses=args.pulses, packet_len=args.packet_len,
+                          malformed=args.malformed, burst=args.burst, burst_every=args.burst_every,
+                          baud=args.baud, caps=not args.no_caps, ids=not args.no_ids, always_rx=args.always_rx, seed=args.seed,
+                          max_baud=args.max_baud)
+
+def serve(args):
+    emu = _emulator_from(args)
+    print(emu.start(), flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emu.stop()
+        print(dict(emu.stats), file=sys.stderr)
+
+def load_test(args):
+    from PyQt6 import QtCore
+    from app import SerialWorker
+
+    qapp = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    emu = _emulator_from(args)
+    path = emu.start()
+    worker = SerialWorker()
+    events, latency = Counter(), []
+
+    def on_msg(obj):
+        events[obj.get("event")] += 1
+        if "emu_t" in obj:
+            latency.append(time.monotonic() - obj["emu_t"])
+
+    # Default (queued) connection, like MainWindow: latency includes Qt dispatch.
+    worker.received.connect(on_msg)
+    worker.open(path)
+    worker.send({"cmd": "ping", "caps": [] if args.json else list(HOST_CAPS)})
+    worker.send({"cmd": "rx_start", "mode": args.mode, "timeout_ms": 40})
+    t0 = time.monotonic()
+    QtCore.QTimer.singleShot(int(args.seconds * 1000), qapp.quit)
+    qapp.exec()
+    elapsed = time.monotonic() - t0
+    worker.close()
+    emu.stop()
+
+    rx = events["rx_raw"] + events["rx_bytes"]
+    print(f"duration      {elapsed:8.2f} s")
+    print(f"sent          {emu.stats['rx_raw'] + emu.stats['rx_bytes']:8d} rx events "
+          f"({emu.stats['malformed']} malformed), {emu.stats['bytes_out'] / 1024:.0f} KiB")
+    print(f"received      {rx:8d} rx events, {events['error']} errors, {rx / elapsed:.1f} ev/s, "
+          f"{emu.stats['bytes_out'] / 1024 / elapsed:.0f} KiB/s")
+    if latency:
+        latency.sort()
+        p50, p99 = latency[len(latency) // 2], latency[int(len(latency) * 0.99)]
+        print(f"latency       p50 {p50*1000:.2f} ms  p99 {p99*1000:.2f} ms  max {latency[-1]*1000:.2f} ms")
+    if args.min_rate and rx / elapsed < args.min_rate:
+        print(f"FAIL: {rx / elapsed:.1f} ev/s < --min-rate {args.min_rate}", file=sys.stderr)
+        return 1
+    return 0
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="IshtarRF ESP32/CC1101 device emulator")
+    sub = ap.add_subparsers(dest="command", required=True)
+    for name in ("serve", "loadtest"):
+        p = sub.add_parser(name)
+        p.add_argument("--rate", type=float, default=10.0, help="rx events per second")
+        p.add_argument("--pulses", type=int, default=400, help="pulses per rx_raw event")
+        p.add_argument("--packet-len", type=int, default=8, help="bytes per rx_bytes event")
+        p.add_argument("--malformed", type=float, default=0.0, help="fraction of truncated lines")
+        p.add_argument("--burst", type=int, default=0, help="extra events per burst")
+        p.add_argument("--burst-every", type=float, default=0.0, help="seconds between bursts")
+        p.add_argument("--baud", type=int, default=0, help="throttle output like a UART (0 = unthrottled)")
+        p.add_argument("--max-baud", type=int, default=0,
+                       help="set_baud above this garbles the link until it reverts (0 = any rate works)")
+        p.add_argument("--no-caps", action="store_true", help="behave like firmware without pulses_vlq")
+        p.add_argument("--no-ids", action="store_true", help="do not echo command ids (older firmware)")
+        p.add_argument("--always-rx", action="store_true", help="emit rx_raw even before rx_start")
+        p.add_argument("--seed", type=int, default=None)
+    lt = sub.choices["loadtest"]
+    lt.add_argument("--seconds", type=float, default=5.0)
+    lt.add_argument("--mode", choices=("raw_ook", "packet"), default="raw_ook")
+    lt.add_argument("--json", action="store_true", help="do not negotiate pulses_vlq")
+    lt.add_argument("--min-rate", type=float, default=0.0, help="fail below this many rx events/s")
+    args = ap.parse_args(argv)
+    if args.command == "serve":
+        serve(args)
+        return 0
+    return load_test(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+# IshtarRF core library
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Headless core shared by the desktop app and the `python -m ishtarrf` CLI.
+# Nothing here imports Qt; pyserial is only imported when a port is opened.
+from .batch import BatchReplay, ReplayJob
+from .codec import HOST_CAPS, PULSES_VLQ, decode_pulses_vlq, encode_pulses_vlq
+from .devices import DeviceManager
+from .framing import LineFramer
+from .library import SignalIndex
+from .metrics import Metrics, MetricsExporter
+from .pulses import PulseTrain
+from .replay import StreamReplay
+from .subfile import (SUB_HEADER_KEYS, export_flipper_sub, flipper_preset_name,
+                      parse_flipper_sub, pulses_to_signed_list, read_pulse_train, write_pulse_train)
+from .transforms import Pipeline
+from .transport import DEFAULT_BAUD, FAST_BAUD, DeviceError, SerialLink, list_serial_ports
+
+__all__ = [
+    "BatchReplay", "ReplayJob",
+    "HOST_CAPS", "PULSES_VLQ", "decode_pulses_vlq", "encode_pulses_vlq",
+    "DeviceManager",
+    "LineFramer",
+    "SignalIndex",
+    "Metrics", "MetricsExporter",
+    "PulseTrain",
+    "StreamReplay",
+    "SUB_HEADER_KEYS", "export_flipper_sub", "flipper_preset_name", "parse_flipper_sub",
+    "pulses_to_signed_list", "read_pulse_train", "write_pulse_train",
+    "Pipeline",
+    "DEFAULT_BAUD", "FAST_BAUD", "DeviceError", "SerialLink", "list_serial_ports",
+]
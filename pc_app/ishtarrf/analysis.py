@@ -0,0 +1,177 @@
+# IshtarRF pulse-train analysis
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Triage of a RAW capture: cluster durations into symbol widths,
+# split frames at long gaps, find repeated frames and guess the line coding
+# (PWM, PPM or Manchester) to produce a bitstring. Work is done on the
+# duration histogram and with C-level map/bisect/Counter passes so a whole
+# library can be processed in batch (see analyze_files).
+import bisect
+from collections import Counter
+from functools import partial
+
+from .subfile import parse_flipper_sub
+
+FRAME_GAP_US = 8000      # firmware RAW_IDLE_TIMEOUT_US
+MIN_FRAME_PULSES = 8
+
+def cluster_durations(pulses, tolerance=0.25, max_symbols=6, gap_us=FRAME_GAP_US):
+    """Group pulse widths into symbol clusters; returns [(center_us, count)] by width.
+
+    Seeds clusters from the sorted histogram (a new cluster starts once a
+    width exceeds the cluster minimum by more than the jitter `tolerance`
+    allows), then refines the centers with weighted 1-D k-means.
+    """
+    hist = sorted((d, c) for d, c in Counter(pulses).items() if 0 < d < gap_us)
+    if not hist:
+        return []
+    spread = (1 + tolerance) / (1 - tolerance)
+    groups = [[hist[0]]]
+    for d, c in hist[1:]:
+        if d > groups[-1][0][0] * spread:
+            groups.append([])
+        groups[-1].append((d, c))
+    groups.sort(key=lambda g: -sum(c for _, c in g))
+    centers = sorted(sum(d * c for d, c in g) / sum(c for _, c in g) for g in groups[:max_symbols])
+
+    for _ in range(10):
+        mids = [(a + b) / 2 for a, b in zip(centers, centers[1:])]
+        acc = [[0, 0] for _ in centers]
+        for d, c in hist:
+            a = acc[bisect.bisect_right(mids, d)]
+            a[0] += d * c
+            a[1] += c
+        new = [s / n if n else ctr for (s, n), ctr in zip(acc, centers)]
+        if new == centers:
+            break
+        centers = new
+
+    # A stray seed (noise before the burst) can split one symbol in two;
+    # fold together neighbours the jitter tolerance cannot tell apart.
+    out = []
+    for s, n in acc:
+        if not n:
+            continue
+        if out and s / n < out[-1][0] / out[-1][1] * spread:
+            out[-1][0] += s
+            out[-1][1] += n
+        else:
+            out.append([s, n])
+    return [(round(s / n), n) for s, n in out]
+
+def split_frames(pulses, gap_us=FRAME_GAP_US, min_pulses=MIN_FRAME_PULSES):
+    """Return (start, end) index ranges between pulses of at least `gap_us`."""
+    cuts = [i for i, d in enumerate(pulses) if d >= gap_us]
+    frames, start = [], 0
+    for i in cuts + [len(pulses)]:
+        if i - start >= min_pulses:
+            frames.append((start, i))
+        start = i + 1
+    return frames
+
+def _dominant(symbols, share=0.05):
+    """The one or two symbols covering the sequence, sorted by width (else [])."""
+    top = [(s, n) for s, n in Counter(symbols).most_common(3) if n >= share * len(symbols)]
+    if len(top) > 2 or sum(n for _, n in top) < 0.95 * len(symbols):
+        return []
+    return sorted(s for s, _ in top)
+
+def _decode_frame(symbols, widths, first_high):
+    """Guess the line coding of one frame; returns (coding, bits)."""
+    # Split into the high and low pulses, starting at the first high pulse.
+    off = 0 if first_high else 1
+    highs, lows = symbols[off::2], symbols[off + 1::2]
+    if not highs or not lows:
+        return "unknown", ""
+    hs, ls = _dominant(highs), _dominant(lows)
+
+    # PWM: each bit is one short and one long pulse; the high width carries it.
+    # The trailing low of the last bit is usually swallowed by the frame gap.
+    if len(hs) == 2 and hs == ls and sum(h != l for h, l in zip(highs, lows)) >= 0.9 * len(lows):
+        return "pwm", "".join("1" if h == hs[1] else "0" for h in highs)
+
+    # Manchester: widths are T and 2T; expand into half-bits and pair them up.
+    both = _dominant(symbols)
+    if len(both) == 2 and 1.6 <= widths[both[1]] / widths[both[0]] <= 2.4:
+        halves = []
+        level = 1 if first_high else 0
+        for s in symbols[off:]:
+            halves.extend((level,) * (2 if s == both[1] else 1))
+            level ^= 1
+        for start in (0, 1):
+            hp = list(zip(halves[start::2], halves[start + 1::2]))
+            if hp and sum(a != b for a, b in hp) >= 0.9 * len(hp):
+                return "manchester", "".join("1" if a else "0" for a, _ in hp)
+
+    # PPM / pulse-distance: constant high pulse, the low after it carries the bit.
+    if len(hs) == 1 and len(ls) == 2:
+        return "ppm", "".join("1" if l == ls[1] else "0" for l in lows)
+    return "unknown", ""
+
+def analyze_pulses(pulses, start_negative=False, gap_us=FRAME_GAP_US, tolerance=0.25):
+    """Cluster, segment, de-duplicate and decode one pulse train.
+
+    Returns a dict with ``symbols`` ([width_us, count] pairs), ``frames``
+    (start/end/coding/bits per frame), ``repeat_count`` of the most common
+    frame and its ``coding`` and ``bits``.
+    """
+    clusters = cluster_durations(pulses, tolerance, gap_us=gap_us)
+    widths = [c for c, _ in clusters]
+    mids = [(a + b) / 2 for a, b in zip(widths, widths[1:])]
+    symbolize = partial(bisect.bisect_right, mids)
+    frames = []
+    for a, b in split_frames(pulses, gap_us):
+        symbols = bytes(map(symbolize, pulses[a:b]))
+        first_high = (a % 2 == 0) != bool(start_negative)
+        coding, bits = _decode_frame(symbols, widths, first_high) if len(widths) >= 2 else ("unknown", "")
+        frames.append({"start": a, "end": b, "coding": coding, "bits": bits, "_key": bits or symbols})
+
+    result = {
+        "pulse_count": len(pulses),
+        "duration_us": sum(pulses),
+        "symbols": [[w, n] for w, n in clusters],
+        "frames": frames,
+        "repeat_count": 0,
+        "coding": "unknown",
+        "bits": "",
+    }
+    if frames:
+        key, count = Counter(f["_key"] for f in frames).most_common(1)[0]
+        best = next(f for f in frames if f["_key"] == key)
+        result.update(repeat_count=count, coding=best["coding"], bits=best["bits"])
+    for f in frames:
+        del f["_key"]
+    return result
+
+def summarize(result):
+    """One-line human summary of an analyze_pulses() result."""
+    widths = "/".join(str(w) for w, _ in result["symbols"]) or "-"
+    s = f"symbols {widths} µs, {len(result['frames'])} frames"
+    if result["repeat_count"]:
+        s += f", best ×{result['repeat_count']} {result['coding'].upper()}"
+        if result["bits"]:
+            bits = result["bits"]
+            s += f" {len(bits)} bits: {bits if len(bits) <= 64 else bits[:64] + '…'}"
+    return s
+
+def analyze_file(path, gap_us=FRAME_GAP_US):
+    """analyze_pulses() of one .sub, or {"file", "error"} when it cannot be read."""
+    try:
+        sub = parse_flipper_sub(path)
+    except (OSError, ValueError) as e:
+        return {"file": str(path), "error": str(e)}
+    result = analyze_pulses(sub["pulses_us"], sub["start_negative"], gap_us)
+    result["file"] = str(path)
+    result["frequency_hz"] = sub["frequency_hz"]
+    return result
+
+def analyze_files(paths, workers=None, gap_us=FRAME_GAP_US):
+    """Analyze many .sub files in a process pool; yields results in input order."""
+    paths = list(paths)
+    if workers == 1 or len(paths) < 2:
+        yield from (analyze_file(p, gap_us) for p in paths)
+        return
+    from concurrent.futures import ProcessPoolExecutor   # pulls in multiprocessing: import on first use
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(partial(analyze_file, gap_us=gap_us), paths, chunksize=16)
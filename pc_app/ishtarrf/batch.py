@@ -0,0 +1,313 @@
+# IshtarRF batch replay
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Replays a campaign of saved signals (.sub files or library entries) back to
+# back. Jobs are grouped by radio config, modulation first and then
+# frequency, so a group costs one set_config (or a frequency-only retune
+# when nothing else changes) instead of one per signal. Every tx_raw line is
+# built before the first one goes out, with its pulses already VLQ-encoded
+# for links that negotiated it. Two jobs are kept in flight per device, as
+# with StreamReplay's chunks: one on air, the next waiting in the UART
+# buffer, and each ack releases another, so the radio only idles while a
+# group's config is confirmed. Trains too long for tx_raw go through
+# StreamReplay on their own.
+import threading, time
+from collections import deque
+
+from . import protocol
+from .codec import PULSES_VLQ, encode_pulses_vlq
+from .pulses import PulseTrain
+from .replay import StreamReplay
+from .subfile import parse_flipper_sub, preset_mod
+from .transport import DEFAULT_TIMEOUT, DeviceError
+
+IN_FLIGHT = 2
+DEFAULT_FREQ_MHZ = 433.92
+
+class ReplayJob:
+    """One signal of a campaign: its PulseTrain, repeat policy and radio config.
+
+    The firmware sends `repeat` copies, `gap_ms` apart, for a single tx_raw.
+    `freq_mhz` overrides the train's frequency (default 433.92 MHz); `mod`
+    is used when the train's preset names no modulation.
+    """
+    __slots__ = ("name", "train", "repeat", "gap_ms", "freq_mhz", "mod", "air_s")
+
+    def __init__(self, name, train, repeat=1, gap_ms=20, freq_mhz=None, mod="OOK"):
+        self.name = str(name)
+        self.train = train
+        self.repeat = max(1, int(repeat or 1))
+        self.gap_ms = max(0, int(gap_ms))
+        self.freq_mhz = float(freq_mhz or train.frequency_mhz or DEFAULT_FREQ_MHZ)
+        self.mod = preset_mod(train.preset) or mod
+        # The firmware only waits gap_ms between copies, not after the last.
+        self.air_s = train.duration_us / 1e6 * self.repeat + self.gap_ms * (self.repeat - 1) / 1000
+
+    def __repr__(self):
+        return f"<ReplayJob {self.name} {self.freq_mhz:.3f} MHz {self.mod} ×{self.repeat}>"
+
+    @property
+    def key(self):
+        """(modulation, MHz): jobs with equal keys share one set_config."""
+        return (self.mod, round(self.freq_mhz, 6))
+
+    @property
+    def streamed(self):
+        return len(self.train) > protocol.RAW_MAX_PULSES
+
+def _job(name, sub, repeat, gap_ms, freq_mhz, mod):
+    train = PulseTrain.from_sub(sub)
+    if not train:
+        raise ValueError(f"{name}: no RAW_Data")
+    # No repeat given: the .sub's own Repeat, if it has one.
+    return ReplayJob(name, train, repeat or sub.get("repeat"), gap_ms, freq_mhz, mod)
+
+def load_jobs(paths, repeat=None, gap_ms=20, freq_mhz=None, mod="OOK"):
+    """ReplayJobs for .sub files, in order; raises OSError or ValueError (no RAW_Data)."""
+    return [_job(str(p), parse_flipper_sub(p), repeat, gap_ms, freq_mhz, mod) for p in paths]
+
+def library_jobs(index, names, repeat=None, gap_ms=20, freq_mhz=None, mod="OOK"):
+    """ReplayJobs for signals of a SignalIndex, e.g. the names of query() rows."""
+    return [_job(name, index.load(name), repeat, gap_ms, freq_mhz, mod) for name in names]
+
+def plan_groups(jobs, first=None, keep_order=False):
+    """[(key, [job index])], one group per config, by modulation and then frequency.
+
+    The group whose key is `first` (e.g. the device's current config) goes
+    first. With `keep_order` the jobs stay in the given order and only runs
+    of the same config share a group.
+    """
+    if keep_order:
+        groups = []
+        for k, job in enumerate(jobs):
+            if groups and groups[-1][0] == job.key:
+                groups[-1][1].append(k)
+            else:
+                groups.append((job.key, [k]))
+        return groups
+    by_key = {}
+    for k, job in enumerate(jobs):
+        by_key.setdefault(job.key, []).append(k)
+    return sorted(by_key.items(), key=lambda g: (g[0] != first, g[0]))
+
+class BatchReplay:
+    """One campaign of ReplayJobs over a DeviceManager; run() blocks and returns a summary dict.
+
+    Each job goes to every device in `device_ids` (default: all open ones).
+    `on_job(record, done, total)` is called on the calling thread once
+    every device has acked a job. The record includes "sent_ms" and
+    "done_ms", counted from the start of the run, and "took_ms", the device
+    time the job used. A device error fails only its job (or its group, for a
+    refused config); a timeout or a lost link ends the run. cancel() stops
+    once the jobs in flight are done, cutting a streamed one short.
+    `pause_ms` waits between jobs, which means one job in flight at a time.
+    """
+    def __init__(self, devices, jobs, device_ids=None, br_kbps=2.4, dev_khz=30.0, tx_power=0,
+                 pause_ms=0, keep_order=False, on_job=None):
+        self.devices = devices
+        self.jobs = jobs
+        self.device_ids = device_ids
+        self.radio = {"br_kbps": br_kbps, "dev_khz": dev_khz, "tx_power": tx_power}
+        self.pause_ms = pause_ms
+        self.keep_order = keep_order
+        self.on_job = on_job or (lambda rec, done, total: None)
+        self._cancel = threading.Event()
+        self._streams = ()
+
+    def cancel(self):
+        self._cancel.set()
+        for replay in self._streams:
+            replay.cancel()
+
+    def _encode(self, vlq):
+        """The tx_raw command of every job, ready to send; None for streamed jobs."""
+        out = []
+        for job in self.jobs:
+            if job.streamed:
+                out.append(None)
+                continue
+            cmd = protocol.tx_raw(job.train.tolist(), job.repeat, job.gap_ms, job.train.start_negative)
+            if vlq:
+                cmd.update(encode_pulses_vlq(cmd.pop("pulses_us")))
+            out.append(cmd)
+        return out
+
+    @staticmethod
+    def _settings(cmd):
+        return {k: v for k, v in cmd.items() if k != "cmd"}
+
+    def _retune_cmd(self, device_id, want):
+        """What brings `device_id` to the set_config `want`: None, a frequency-only retune, or `want`."""
+        have = self._have.get(device_id)
+        settings = self._settings(want)
+        if have == settings:
+            return None
+        if have and all(have.get(k) == v for k, v in settings.items() if k != "freq"):
+            return protocol.set_frequency(want["freq"])
+        return want
+
+    # ---- job lifecycle (calling thread)
+    def _ms(self, t):
+        return round((t - self._t0) * 1000, 1)
+
+    def _record(self, k, sent, errors=(), air_s=None, pulses=None, **extra):
+        """Report job `k`; `air_s` and `pulses` default to the whole job (a stopped stream sends less)."""
+        job = self.jobs[k]
+        now = time.monotonic()
+        air_s = job.air_s if air_s is None else air_s
+        pulses = len(job.train) * job.repeat if pulses is None else pulses
+        rec = {"job": k, "name": job.name, "freq_mhz": job.freq_mhz, "mod": job.mod,
+               "pulses": len(job.train), "repeat": job.repeat, "air_ms": round(air_s * 1000, 1),
+               "sent_ms": self._ms(sent), "done_ms": self._ms(now),
+               "took_ms": round((now - max(sent, self._last_done)) * 1000, 1), **extra}
+        self._last_done = now
+        if errors:
+            rec["error"] = "; ".join(errors)
+            self.counts["errors"] += 1
+        else:
+            self.counts["done"] += 1
+            self.counts["pulses"] += pulses
+            self.counts["air_s"] += air_s
+        self._finished += 1
+        self.on_job(rec, self._finished, len(self.jobs))
+        if self.pause_ms:
+            self._cancel.wait(self.pause_ms / 1000)
+
+    def _errors(self, futures):
+        """Wait for every device's reply; device errors as messages, anything else raises."""
+        errors = []
+        for d, fut in futures.items():
+            try:
+                fut.result()
+            except DeviceError as e:
+                errors.append(f"{d}: {e}" if len(futures) > 1 else str(e))
+        return errors
+
+    def _complete(self, entry):
+        k, futures, sent = entry
+        self._record(k, sent, self._errors(futures))
+
+    def _drain(self, in_flight):
+        while in_flight:
+            self._complete(in_flight.popleft())
+
+    def _configure(self, key, group, in_flight):
+        """Bring every device to `key`'s config; False (the group's jobs failed) if one refused."""
+        mod, freq = key
+        want = protocol.set_config(freq, mod, **self.radio)
+        # The config queues behind the jobs in flight, so allow for their airtime.
+        ahead = sum(self.jobs[k].air_s for k, _, _ in in_flight)
+        futures = {}
+        for d in self.ids:
+            cmd = self._retune_cmd(d, want)
+            if cmd is None:
+                continue
+            futures[d] = self.devices.send(cmd, d, DEFAULT_TIMEOUT + ahead)
+            self.counts["configs" if cmd is want else "retunes"] += 1
+            self._have[d] = self._settings(want)
+        if not futures:
+            return True
+        self._drain(in_flight)
+        t = time.monotonic()
+        errors = self._errors(futures)
+        self._config_s += time.monotonic() - t
+        self._last_done = time.monotonic()
+        if not errors:
+            return True
+        for d in futures:
+            self._have[d] = None      # unknown: send a full set_config next time
+        for k in group:
+            self._record(k, self._last_done, [f"set_config: {e}" for e in errors])
+        return False
+
+    def _send(self, k, in_flight):
+        job = self.jobs[k]
+        ahead = sum(self.jobs[j].air_s for j, _, _ in in_flight)
+        futures = {}
+        for d in self.ids:
+            cmd = self._lines[d][k]
+            # send() adds busy_seconds(), which cannot see pre-encoded pulses.
+            timeout = DEFAULT_TIMEOUT + ahead + job.air_s - protocol.busy_seconds(cmd)
+            # Quiet: the job records report the outcome, not one event per ack.
+            futures[d] = self.devices.send(cmd, d, timeout, quiet=True)
+        return k, futures, time.monotonic()
+
+    def _stream(self, k):
+        job = self.jobs[k]
+        sent = time.monotonic()
+        errors, late, air_s, pulses = [], 0, 0.0, 0
+        for i in range(job.repeat):
+            if i:
+                if self._cancel.wait(job.gap_ms / 1000):
+                    break
+                air_s += job.gap_ms / 1000
+            replays = {d: StreamReplay(self.devices.link(d), job.train, job.train.start_negative)
+                       for d in self.ids}
+            self._streams = list(replays.values())
+            if self._cancel.is_set():
+                break
+            runs = {d: replay.start() for d, replay in replays.items()}
+            errors += self._errors(runs)
+            reports = [f.result() for f in runs.values() if not f.exception()]
+            if reports:
+                # The devices stream in parallel: count the copy once.
+                air_s += max(r["air_ms"] for r in reports) / 1000
+                pulses += max(r["pulses"] for r in reports)
+                late = max([late] + [r["late_us_max"] for r in reports])
+        self._record(k, sent, errors, air_s, pulses, streamed=True, late_us_max=late)
+
+    def run(self):
+        self._t0 = self._last_done = t0 = time.monotonic()
+        self.jobs = list(self.jobs)
+        ids = self.device_ids or self.devices.ids
+        self.ids = [d for d in ids if d in self.devices]
+        if not self.ids:
+            raise ConnectionError("Not connected")
+        # Pre-encode once per payload form in use: VLQ and/or plain JSON.
+        vlq = {d: PULSES_VLQ in self.devices.link(d).caps for d in self.ids}
+        lines = {form: self._encode(form) for form in set(vlq.values())}
+        self._lines = {d: lines[vlq[d]] for d in self.ids}
+        encode_s = time.monotonic() - t0
+        self._have = {d: self.devices.config(d) for d in self.ids}
+        current = self._have[self.ids[0]] or {}
+        first = (current.get("mod"), round(float(current["freq"]), 6)) if "freq" in current else None
+        groups = plan_groups(self.jobs, first, self.keep_order)
+        self.counts = {"done": 0, "errors": 0, "configs": 0, "retunes": 0, "pulses": 0, "air_s": 0.0}
+        self._config_s = 0.0
+        self._finished = 0
+        depth = 1 if self.pause_ms else IN_FLIGHT
+        in_flight = deque()
+        failed = None
+        try:
+            for key, group in groups:
+                if self._cancel.is_set():
+                    break
+                if not self._configure(key, group, in_flight):
+                    continue
+                for k in group:
+                    if self._cancel.is_set():
+                        break
+                    if self.jobs[k].streamed:
+                        self._drain(in_flight)
+                        self._stream(k)
+                        continue
+                    while len(in_flight) >= depth:
+                        self._complete(in_flight.popleft())
+                    in_flight.append(self._send(k, in_flight))
+            self._drain(in_flight)
+        except (TimeoutError, ConnectionError) as e:
+            failed = str(e) or type(e).__name__
+        elapsed = time.monotonic() - t0
+        c = self.counts
+        summary = {"jobs": len(self.jobs), "done": c["done"], "errors": c["errors"], "groups": len(groups),
+                   "configs": c["configs"], "retunes": c["retunes"], "pulses": c["pulses"],
+                   "air_ms": round(c["air_s"] * 1000, 1), "config_ms": round(self._config_s * 1000, 1),
+                   "encode_ms": round(encode_s * 1000, 1), "elapsed_ms": round(elapsed * 1000, 1),
+                   # Share of the run the radio spent transmitting.
+                   "duty": round(c["air_s"] / elapsed, 3) if elapsed else None,
+                   "jobs_per_s": round(c["done"] / elapsed, 2) if elapsed else None,
+                   "cancelled": self._cancel.is_set() and self._finished < len(self.jobs)}
+        if failed:
+            summary["failed"] = failed
+        return summary
@@ -0,0 +1,73 @@
+# IshtarRF binary pulse cache
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Content-addressed sidecar files holding a parsed .sub: a small header and
+# the durations as packed native int32, so a load is an mmap instead of a
+# re-tokenize. Entries are named by the SHA-1 of the .sub contents (see
+# SignalIndex, which tracks that digest against mtime/size) and are never
+# rewritten in place: a changed .sub simply gets a new entry.
+import mmap, os, struct, sys
+from array import array
+from pathlib import Path
+
+CACHE_DIR = ".cache"
+_MAGIC = b"IRFC"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBHqqqHH")   # magic, version, flags, -, freq, repeat, count, len(preset), len(protocol)
+_F_START_NEGATIVE = 1
+_F_BIG_ENDIAN = 2
+_NATIVE = _F_BIG_ENDIAN if sys.byteorder == "big" else 0
+
+def cache_path(cache_dir, digest):
+    return Path(cache_dir) / f"{digest}.pulses"
+
+def write_pulse_cache(path, sub):
+    """Write a parse_flipper_sub() result to `path` (atomically, via a temp file)."""
+    path = Path(path)
+    pulses = sub["pulses_us"]
+    if getattr(pulses, "typecode", None) != "i" and getattr(pulses, "format", None) != "i":
+        pulses = array("i", pulses)
+    preset = (sub.get("preset") or "").encode("utf-8")
+    protocol = (sub.get("protocol") or "").encode("utf-8")
+    flags = _NATIVE | (_F_START_NEGATIVE if sub.get("start_negative") else 0)
+    head = _HEADER.pack(_MAGIC, _VERSION, flags, 0,
+                        -1 if sub.get("frequency_hz") is None else sub["frequency_hz"],
+                        -1 if sub.get("repeat") is None else sub["repeat"],
+                        len(pulses), len(preset), len(protocol)) + preset + protocol
+    head += bytes(-len(head) % 4)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(head)
+        f.write(pulses)
+    os.replace(tmp, path)
+
+def read_pulse_cache(path):
+    """Map a cache entry; returns a parse_flipper_sub()-style dict or None.
+
+    ``pulses_us`` is a read-only int32 memoryview over the mapping, so the
+    durations are paged in lazily and never copied.
+    """
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < _HEADER.size:
+        return None
+    magic, version, flags, _, freq, repeat, count, n_preset, n_proto = _HEADER.unpack_from(mm)
+    off = _HEADER.size + n_preset + n_proto
+    off += -off % 4
+    if (magic != _MAGIC or version != _VERSION or flags & _F_BIG_ENDIAN != _NATIVE
+            or len(mm) != off + 4 * count):
+        return None
+    mid = _HEADER.size + n_preset
+    return {
+        "frequency_hz": None if freq < 0 else freq,
+        "preset": mm[_HEADER.size:mid].decode("utf-8", "replace") or None,
+        "protocol": mm[mid:mid + n_proto].decode("utf-8", "replace") or None,
+        "repeat": None if repeat < 0 else repeat,
+        "pulses_us": memoryview(mm)[off:].cast("i"),
+        "start_negative": bool(flags & _F_START_NEGATIVE),
+    }
@@ -0,0 +1,540 @@
+# IshtarRF command line
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Usage (from pc_app/):  python -m ishtarrf {capture,record,replay,batch,rssi,scan,play,analyze,clean,match,dedup,import,convert} --help
+import argparse, json, queue, sys, threading, time
+from datetime import datetime
+from pathlib import Path
+
+from . import protocol
+from .analysis import FRAME_GAP_US, analyze_files
+from .batch import BatchReplay, library_jobs, load_jobs
+from .devices import DeviceManager
+from .importer import BulkImport
+from .library import SignalIndex
+from .metrics import EXPORT_INTERVAL_S, MetricsExporter
+from .recorder import RX_EVENTS, SEGMENT_BYTES, SEGMENT_SECONDS, Player, Recorder, RecordingReader
+from .replay import StreamReplay
+from .scanner import DEFAULT_REFINE_KHZ, DEFAULT_STEP_KHZ, MIN_SNR_DB, BandScanner
+from .subfile import export_flipper_sub, flipper_preset_name, parse_flipper_sub
+from .transforms import DEFAULT_STEPS, clean_files
+from .transport import DEFAULT_BAUD, FAST_BAUD, DeviceError, SerialLink
+
+DEFAULT_SIG_DIR = Path(__file__).resolve().parent.parent / "signals"
+
+class Session:
+    """Blocking request/response wrapper around a DeviceManager for scripts.
+
+    Commands go to every open device at once; replies come back as a list in
+    device order.
+    """
+    def __init__(self, ports, baud=DEFAULT_BAUD, timeout=3.0):
+        self.events = queue.Queue()
+        self.timeout = timeout
+        self.devices = DeviceManager(on_event=self.events.put)
+        try:
+            for port in ports:
+                self.devices.open(port, baud)
+        except BaseException:
+            self.devices.close_all()
+            raise
+
+    def close(self):
+        self.devices.close_all()
+
+    def next_event(self, timeout=None):
+        try:
+            return self.events.get(timeout=self.timeout if timeout is None else timeout)
+        except queue.Empty:
+            return None
+
+    def handshake(self):
+        # Opening the port usually resets the ESP32, which announces itself
+        # with a bare pong once booted. Ping until something answers, then
+        # ping once more so the last pong is the reply carrying our caps.
+        deadline = time.monotonic() + self.timeout
+        waiting = self.devices.ids
+        while waiting:
+            futures = {d: self.devices.send(protocol.ping(), d, timeout=0.5) for d in waiting}
+            waiting = []
+            for d, fut in futures.items():
+                try:
+                    fut.result()
+                except TimeoutError:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"{d}: no answer to ping")
+                    waiting.append(d)
+        return self.command(protocol.ping())
+
+    def set_baud(self, baud):
+        """Raise every link to `baud`; a device that cannot stays at its rate, with a warning."""
+        futures = {d: self.devices.set_baud(d, baud, self.timeout) for d in self.devices.ids}
+        for d, fut in futures.items():
+            try:
+                fut.result()
+            except (DeviceError, ConnectionError, TimeoutError) as e:
+                print(f"{d}: staying at {self.devices.link(d).baud} baud: {e}", file=sys.stderr)
+
+    def command(self, obj):
+        """Send `obj` to every device and wait for the replies; raises DeviceError on an error event."""
+        return [f.result() for f in self.devices.broadcast(obj, self.timeout).values()]
+
+    def pipeline(self, *objs):
+        """Send several commands back to back; returns their replies in order."""
+        futures = [self.devices.broadcast(obj, self.timeout) for obj in objs]
+        return [[f.result() for f in fs.values()] for fs in futures]
+
+def _add_link_args(p):
+    p.add_argument("--port", required=True, action="append",
+                   help="serial port, e.g. /dev/ttyUSB0 or COM5; repeat to use several devices at once")
+    p.add_argument("--baud", type=int, default=DEFAULT_BAUD)
+    p.add_argument("--set-baud", type=int, choices=protocol.LINK_BAUDS, metavar="BAUD",
+                   help=f"after connecting, switch the link to this rate, e.g. {FAST_BAUD} "
+                        f"(falls back to --baud if it does not work)")
+    p.add_argument("--freq", type=float, default=None, help="MHz (default 433.92, or the .sub frequency)")
+    p.add_argument("--mod", choices=("OOK", "2-FSK"), default="OOK")
+    p.add_argument("--br", type=float, default=2.4, help="bitrate, kbps")
+    p.add_argument("--dev", type=float, default=30.0, help="deviation, kHz")
+    p.add_argument("--power", type=int, default=0, help="TX power, dBm")
+    p.add_argument("--metrics", help="write link metrics here: Prometheus text if it ends in .prom, else JSON lines")
+    p.add_argument("--metrics-interval", type=float, default=EXPORT_INTERVAL_S, help="seconds between metrics writes")
+
+def _config_cmd(args, freq_mhz=None):
+    freq = args.freq or freq_mhz or 433.92
+    return freq, protocol.set_config(freq, args.mod, args.br, args.dev, args.power)
+
+def _print(obj):
+    print(json.dumps(obj, default=list), flush=True)
+
+def cmd_capture(sess, args):
+    freq, config = _config_cmd(args)
+    sess.pipeline(config, protocol.rx_start(args.mode, args.timeout_ms))
+    out_dir = Path(args.out) if args.out else None
+    if out_dir:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + args.seconds if args.seconds else None
+    got = 0
+    try:
+        while args.count == 0 or got < args.count:
+            left = None if deadline is None else deadline - time.monotonic()
+            if left is not None and left <= 0:
+                break
+            obj = sess.next_event(timeout=1.0 if left is None else min(left, 1.0))
+            if obj is None:
+                continue
+            et = obj.get("event")
+            if et == "error":
+                print(f"{obj['device']}: device error: {obj.get('msg')}", file=sys.stderr)
+                continue
+            if et not in ("rx_raw", "rx_bytes"):
+                continue
+            got += 1
+            rec = {"event": et, "device": obj["device"], "t": obj["t"], "rssi_dbm": obj.get("rssi_dbm")}
+            if et == "rx_bytes":
+                rec["hex"] = obj.get("hex")
+            else:
+                pulses = obj.get("pulses_us", [])
+                rec["pulses"] = len(pulses)
+                rec["dur_ms"] = obj.get("dur_ms")
+                if out_dir:
+                    tag = f"{obj['device']}_" if len(sess.devices) > 1 else ""
+                    path = out_dir / f"{args.prefix}{tag}{time.strftime('%Y%m%d-%H%M%S')}_{got:04d}.sub"
+                    export_flipper_sub(path, freq, pulses, start_negative=args.start_low,
+                                       preset=flipper_preset_name(args.mod))
+                    rec["file"] = str(path)
+                else:
+                    rec["pulses_us"] = pulses
+            _print(rec)
+    finally:
+        sess.command(protocol.rx_stop())
+    return 0 if got or not args.count else 1
+
+def cmd_record(sess, args):
+    config = _config_cmd(args)[1]
+    rec = Recorder(args.out, kinds=None if args.all else RX_EVENTS,
+                   segment_bytes=int(args.segment_mb * (1 << 20)), segment_seconds=args.segment_min * 60)
+    rec.start()
+    sess.pipeline(config, protocol.rx_start(args.mode, args.timeout_ms))
+    deadline = time.monotonic() + args.seconds if args.seconds else None
+    next_status = time.monotonic() + args.status
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            obj = sess.next_event(timeout=0.5)
+            if obj is not None:
+                rec.record(obj)
+            if args.status and time.monotonic() >= next_status:
+                _print({"t": time.time(), **rec.stats})
+                next_status += args.status
+    finally:
+        try:
+            sess.command(protocol.rx_stop())
+        finally:
+            rec.close()
+            _print({"t": time.time(), **rec.stats, "dir": str(args.out)})
+    return 0
+
+def cmd_replay(sess, args):
+    for name in args.files:
+        try:
+            sub = parse_flipper_sub(name)
+        except (OSError, ValueError) as e:
+            print(f"{name}: {e}", file=sys.stderr)
+            return 1
+        pulses = sub["pulses_us"]
+        if not pulses:
+            print(f"{name}: no RAW_Data", file=sys.stderr)
+            return 1
+        freq_hz = sub["frequency_hz"]
+        freq, config = _config_cmd(args, freq_hz / 1_000_000 if freq_hz else None)
+        t0 = time.monotonic()
+        # Not pipelined: nothing may go on air if the config was refused.
+        # SerialLink extends the tx_raw reply timeout by the airtime.
+        sess.command(config)
+        rec = {"file": str(name), "freq_mhz": freq, "pulses": len(pulses), "repeat": args.repeat}
+        if args.stream or len(pulses) > protocol.RAW_MAX_PULSES:
+            rec["stream"] = _stream_replay(sess, pulses, sub["start_negative"], args)
+        else:
+            sess.command(protocol.tx_raw(pulses, args.repeat, args.gap_ms, sub["start_negative"]))
+        rec["elapsed_ms"] = round((time.monotonic() - t0) * 1000, 1)
+        _print(rec)
+    return 0
+
+def _stream_replay(sess, pulses, invert, args):
+    def on_chunk(d):
+        return (lambda rec: _print({"device": d, **rec})) if args.chunks else None
+    reports = []
+    for i in range(max(1, args.repeat)):
+        if i:
+            time.sleep(args.gap_ms / 1000)
+        runs = {d: StreamReplay(sess.devices.link(d), pulses, invert, on_chunk=on_chunk(d)).start()
+                for d in sess.devices.ids}
+        reports.extend({"device": d, **fut.result()} for d, fut in runs.items())
+    return reports[0] if len(reports) == 1 else reports
+
+def cmd_batch(sess, args):
+    paths = []
+    for name in args.files:
+        p = Path(name)
+        paths.extend(sorted(p.glob("*.sub")) if p.is_dir() else [p])
+    policy = {"repeat": args.repeat, "gap_ms": args.gap_ms, "freq_mhz": args.freq, "mod": args.mod}
+    try:
+        jobs = load_jobs(paths, **policy)
+        if args.query is not None:
+            index = _open_index(args)
+            try:
+                jobs += library_jobs(index, [row[0] for row in index.query(args.query)], **policy)
+            finally:
+                index.close()
+    except (OSError, ValueError) as e:
+        print(f"batch: {e}", file=sys.stderr)
+        return 1
+    if not jobs:
+        print("batch: nothing to replay; give .sub files or --query", file=sys.stderr)
+        return 2
+    def on_job(rec, done, total):
+        if args.jobs or "error" in rec:
+            _print(rec)
+    run = BatchReplay(sess.devices, jobs, br_kbps=args.br, dev_khz=args.dev, tx_power=args.power,
+                      pause_ms=args.pause_ms, keep_order=args.keep_order, on_job=on_job)
+    summary = run.run()
+    _print(summary)
+    return 1 if summary["errors"] or "failed" in summary else 0
+
+def cmd_rssi(sess, args):
+    if args.freq:
+        sess.command(_config_cmd(args)[1])
+    for i in range(args.count):
+        for obj in sess.command(protocol.get_rssi()):
+            _print({"device": obj["device"], "t": obj["t"], "value_dbm": obj.get("value_dbm")})
+        if i + 1 < args.count:
+            time.sleep(args.interval)
+    return 0
+
+def cmd_scan(sess, args):
+    # Every device shares each sweep; the steps only retune, so apply the rest first.
+    config = _config_cmd(args, args.start)[1]
+    try:
+        scanner = BandScanner([sess.devices.link(d) for d in sess.devices.ids], args.start, args.stop,
+                              args.step_khz, args.dwell_ms, args.refine_khz, args.snr_db, config,
+                              rows=args.sweeps or 256, timeout=sess.timeout)
+    except ValueError as e:
+        print(f"scan: {e}", file=sys.stderr)
+        return 1
+    try:
+        n = 0
+        while args.sweeps == 0 or n < args.sweeps:
+            n += 1
+            _print({"sweep": n, **scanner.scan()})
+    finally:
+        if args.csv and len(scanner.waterfall):
+            scanner.waterfall.to_csv(args.csv)
+    return 0
+
+def _parse_time(s):
+    """Unix seconds or an ISO 8601 local time."""
+    if s is None:
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        return datetime.fromisoformat(s).timestamp()
+
+def cmd_play(args):
+    done = threading.Event()
+    player = Player(RecordingReader(args.dir), _print, args.speed,
+                    _parse_time(args.start), _parse_time(args.end), on_done=lambda n: done.set())
+    player.start()
+    try:
+        while not done.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        player.stop()
+        return 130
+    return 0
+
+def cmd_convert(args):
+    src, dst = Path(args.src), Path(args.dst)
+    try:
+        if src.suffix.lower() == ".json":
+            obj = json.loads(src.read_text(encoding="utf-8"))
+            if not isinstance(obj, dict):
+                raise ValueError("expected a JSON object")
+            pulses = obj["pulses_us"]
+            if not isinstance(pulses, list) or not all(type(d) is int for d in pulses):
+                raise ValueError("pulses_us must be a list of integers")
+            freq_hz = obj.get("frequency_hz") or 433_920_000
+            if not isinstance(freq_hz, (int, float)):
+                raise ValueError("frequency_hz must be a number")
+            start_negative, preset = bool(obj.get("start_negative", False)), obj.get("preset")
+        else:
+            sub = parse_flipper_sub(src)
+            freq_hz = sub["frequency_hz"] or 433_920_000
+            pulses, start_negative, preset = sub["pulses_us"], sub["start_negative"], sub["preset"]
+    except KeyError as e:
+        print(f"{src}: missing {e}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"{src}: {e}", file=sys.stderr)
+        return 1
+    if dst.suffix.lower() == ".json":
+        dst.write_text(json.dumps({"frequency_hz": freq_hz, "preset": preset,
+                                   "start_negative": start_negative, "pulses_us": list(pulses)}),
+                       encoding="utf-8")
+    else:
+        export_flipper_sub(dst, freq_hz / 1_000_000, pulses, start_negative=start_negative, preset=preset)
+    return 0
+
+def cmd_analyze(args):
+    paths = []
+    for name in args.paths:
+        p = Path(name)
+        paths.extend(sorted(p.glob("*.sub")) if p.is_dir() else [p])
+    failed = 0
+    for result in analyze_files(paths, workers=args.workers, gap_us=args.gap_us):
+        failed += "error" in result
+        if not args.frames:
+            result.pop("frames", None)
+        _print(result)
+    return 1 if failed else 0
+
+def cmd_clean(args):
+    if not args.out and not args.in_place:
+        print("clean: give --out DIR or --in-place", file=sys.stderr)
+        return 2
+    paths = []
+    for name in args.paths:
+        p = Path(name)
+        paths.extend(sorted(p.glob("*.sub")) if p.is_dir() else [p])
+    failed = 0
+    try:
+        for result in clean_files(paths, args.steps, None if args.in_place else args.out, args.workers):
+            failed += "error" in result
+            _print(result)
+    except ValueError as e:
+        print(f"clean: {e}", file=sys.stderr)
+        return 2
+    return 1 if failed else 0
+
+def _open_index(args):
+    index = SignalIndex(args.dir)
+    index.refresh()
+    return index
+
+def cmd_match(args):
+    index = _open_index(args)
+    failed = 0
+    try:
+        for name in args.files:
+            try:
+                sub = parse_flipper_sub(name)
+            except (OSError, ValueError) as e:
+                print(f"{name}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            matches = index.match(sub["pulses_us"], args.threshold, args.limit)
+            _print({"file": str(name), "matches": [{"name": n, "score": s} for n, s in matches]})
+    finally:
+        index.close()
+    return 1 if failed else 0
+
+def cmd_dedup(args):
+    index = _open_index(args)
+    try:
+        for group in index.duplicates(args.threshold):
+            _print(group)
+    finally:
+        index.close()
+    return 0
+
+def cmd_import(args):
+    def on_progress(rec, done, total):
+        if args.all or rec["status"] != "imported":
+            _print(rec)
+    job = BulkImport(args.src, args.dir, workers=args.workers, restart=args.restart, on_progress=on_progress)
+    try:
+        summary = job.run()
+    except KeyboardInterrupt:
+        print("import interrupted; run it again to resume", file=sys.stderr)
+        return 130
+    _print(summary)
+    return 1 if summary["error"] else 0
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="ishtarrf", description="Headless IshtarRF capture/replay tools")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("capture", help="receive and save/print captures")
+    _add_link_args(p)
+    p.add_argument("--mode", choices=("raw_ook", "packet"), default="raw_ook")
+    p.add_argument("--timeout-ms", type=int, default=None, help="RAW idle timeout (default 40)")
+    p.add_argument("--count", type=int, default=0, help="stop after N events (0 = no limit)")
+    p.add_argument("--seconds", type=float, default=0, help="stop after S seconds (0 = no limit)")
+    p.add_argument("--out", help=f"save rx_raw as .sub here (e.g. {DEFAULT_SIG_DIR}); else print pulses")
+    p.add_argument("--prefix", default="capture_")
+    p.add_argument("--start-low", action="store_true", help="write .sub starting with LOW (-)")
+
+    p = sub.add_parser("record", help="record every RX event into a segmented recording")
+    _add_link_args(p)
+    p.add_argument("--out", required=True, help="recording directory")
+    p.add_argument("--mode", choices=("raw_ook", "packet"), default="raw_ook")
+    p.add_argument("--timeout-ms", type=int, default=None, help="RAW idle timeout (default 40)")
+    p.add_argument("--seconds", type=float, default=0, help="stop after S seconds (0 = until interrupted)")
+    p.add_argument("--segment-mb", type=float, default=SEGMENT_BYTES >> 20, help="rotate segments at this size")
+    p.add_argument("--segment-min", type=float, default=SEGMENT_SECONDS / 60, help="rotate segments at this age")
+    p.add_argument("--status", type=float, default=60, help="print stats every S seconds (0 = only at the end)")
+    p.add_argument("--all", action="store_true", help="record every device event, not only rx_raw/rx_bytes")
+
+    p = sub.add_parser("replay", help="transmit .sub files")
+    _add_link_args(p)
+    p.add_argument("files", nargs="+")
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--gap-ms", type=int, default=20)
+    p.add_argument("--stream", action="store_true",
+                   help=f"send in chunks via tx_stream (automatic above {protocol.RAW_MAX_PULSES} pulses)")
+    p.add_argument("--chunks", action="store_true", help="print per-chunk stream progress")
+
+    p = sub.add_parser("batch", help="replay many signals back to back, grouped by frequency")
+    _add_link_args(p)
+    p.add_argument("files", nargs="*", help=".sub files or directories")
+    p.add_argument("--query", help="also replay the library signals matching this name/MHz filter ('' = all)")
+    p.add_argument("--dir", default=str(DEFAULT_SIG_DIR), help="signal library directory")
+    p.add_argument("--repeat", type=int, default=None, help="copies of each signal (default: its .sub Repeat, else 1)")
+    p.add_argument("--gap-ms", type=int, default=20, help="between copies")
+    p.add_argument("--pause-ms", type=int, default=0, help="between signals (sends one at a time)")
+    p.add_argument("--keep-order", action="store_true",
+                   help="replay in the given order; only group consecutive signals with the same config")
+    p.add_argument("--jobs", action="store_true", help="print the timing of every signal, not only failures")
+
+    p = sub.add_parser("rssi", help="read RSSI")
+    _add_link_args(p)
+    p.add_argument("--count", type=int, default=1)
+    p.add_argument("--interval", type=float, default=0.5, help="seconds between reads")
+
+    p = sub.add_parser("scan", help="sweep a frequency range for active transmitters")
+    _add_link_args(p)
+    p.add_argument("--start", type=float, default=300.0, help="MHz")
+    p.add_argument("--stop", type=float, default=928.0, help="MHz")
+    p.add_argument("--step-khz", type=float, default=DEFAULT_STEP_KHZ)
+    p.add_argument("--refine-khz", type=float, default=DEFAULT_REFINE_KHZ, help="fine step around peaks (0 = off)")
+    p.add_argument("--dwell-ms", type=int, default=0, help="peak-hold time per step")
+    p.add_argument("--snr-db", type=float, default=MIN_SNR_DB, help="peak threshold above the median")
+    p.add_argument("--sweeps", type=int, default=1, help="number of sweeps (0 = until interrupted)")
+    p.add_argument("--csv", help="write the sweeps (waterfall) here")
+
+    p = sub.add_parser("analyze", help="cluster, segment and decode .sub files")
+    p.add_argument("paths", nargs="+", help=".sub files or directories")
+    p.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    p.add_argument("--gap-us", type=int, default=FRAME_GAP_US, help="frame split gap")
+    p.add_argument("--frames", action="store_true", help="include per-frame results")
+
+    p = sub.add_parser("clean", help="glitch-filter, trim, quantize or resample .sub files")
+    p.add_argument("paths", nargs="+", help=".sub files or directories")
+    p.add_argument("--steps", default=DEFAULT_STEPS,
+                   help=f"transforms in order: glitch[=us], trim[=gap us], quantize[=tolerance], merge, "
+                        f"resample[=tick us] (default {DEFAULT_STEPS})")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--out", help="write the cleaned files here")
+    g.add_argument("--in-place", action="store_true", help="replace the files")
+    p.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+
+    p = sub.add_parser("match", help="find library signals similar to .sub files")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--dir", default=str(DEFAULT_SIG_DIR), help="signal library directory")
+    p.add_argument("--threshold", type=float, default=0.5, help="minimum similarity (0..1)")
+    p.add_argument("--limit", type=int, default=5)
+
+    p = sub.add_parser("dedup", help="report groups of near-identical library signals")
+    p.add_argument("--dir", default=str(DEFAULT_SIG_DIR), help="signal library directory")
+    p.add_argument("--threshold", type=float, default=0.8, help="minimum similarity (0..1)")
+
+    p = sub.add_parser("play", help="print the events of a recording, paced like the original")
+    p.add_argument("dir", help="recording directory")
+    p.add_argument("--speed", type=float, default=0, help="time scale (1 = real time, 0 = no delays)")
+    p.add_argument("--from", dest="start", help="start time (unix seconds or ISO 8601)")
+    p.add_argument("--to", dest="end", help="end time (unix seconds or ISO 8601)")
+
+    p = sub.add_parser("import", help="validate and normalize a tree of .sub files into the library")
+    p.add_argument("src", help="folder to import, e.g. a Flipper/Bruce SD card's subghz/")
+    p.add_argument("--dir", default=str(DEFAULT_SIG_DIR), help="signal library directory")
+    p.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    p.add_argument("--restart", action="store_true", help="re-process files a previous run already handled")
+    p.add_argument("--all", action="store_true", help="print imported files too, not only rejects and errors")
+
+    p = sub.add_parser("convert", help="normalize .sub or convert .sub <-> .json")
+    p.add_argument("src")
+    p.add_argument("dst")
+    return ap
+
+COMMANDS = {"capture": cmd_capture, "record": cmd_record, "replay": cmd_replay, "batch": cmd_batch,
+            "rssi": cmd_rssi, "scan": cmd_scan}
+OFFLINE_COMMANDS = {"convert": cmd_convert, "play": cmd_play, "analyze": cmd_analyze, "clean": cmd_clean,
+                    "match": cmd_match, "dedup": cmd_dedup, "import": cmd_import}
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command in OFFLINE_COMMANDS:
+        return OFFLINE_COMMANDS[args.command](args)
+    try:
+        sess = Session(args.port, args.baud)
+    except Exception as e:
+        print(f"cannot open {', '.join(args.port)}: {e}", file=sys.stderr)
+        return 1
+    exporter = None
+    try:
+        if args.metrics:
+            exporter = MetricsExporter(sess.devices.metrics, args.metrics, args.metrics_interval)
+            exporter.start()
+        sess.handshake()
+        if args.set_baud:
+            sess.set_baud(args.set_baud)
+        return COMMANDS[args.command](sess, args)
+    except (DeviceError, TimeoutError, ConnectionError, OSError) as e:
+        print(f"{args.command} failed: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if exporter:
+            exporter.stop()
+        sess.close()
@@ -0,0 +1,49 @@
+# IshtarRF pulse payload codec
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import base64, binascii
+from array import array
+
+# Optional compact encoding for rx_raw/tx_raw pulse arrays, enabled per link
+# by the ping/pong capability exchange. Durations are unsigned LEB128 varints,
+# protected by CRC-16/CCITT-FALSE and carried as base64 in the JSON line:
+#   {"pulses_vlq": "<base64>", "n": <count>, "crc": <crc16>}
+# Devices that do not answer with the capability keep the plain JSON array.
+PULSES_VLQ = "pulses_vlq"
+HOST_CAPS = (PULSES_VLQ,)
+
+def encode_pulses_vlq(pulses_us):
+    out = bytearray()
+    for d in pulses_us:
+        v = max(0, int(d))
+        while v >= 0x80:
+            out.append((v & 0x7F) | 0x80)
+            v >>= 7
+        out.append(v)
+    return {PULSES_VLQ: base64.b64encode(out).decode("ascii"), "n": len(pulses_us),
+            "crc": binascii.crc_hqx(out, 0xFFFF)}
+
+def decode_pulses_vlq(obj):
+    """Decode a pulses_vlq payload into array('i'); raises ValueError if corrupt."""
+    try:
+        data = base64.b64decode(obj[PULSES_VLQ], validate=True)
+    except (binascii.Error, TypeError) as e:
+        raise ValueError(f"bad base64: {e}") from None
+    if binascii.crc_hqx(data, 0xFFFF) != obj.get("crc"):
+        raise ValueError("CRC mismatch")
+    out = array("i")
+    v = shift = 0
+    try:
+        for b in data:
+            v |= (b & 0x7F) << shift
+            if b & 0x80:
+                shift += 7
+            else:
+                out.append(v)
+                v = shift = 0
+    except OverflowError:
+        raise ValueError("pulse out of range") from None
+    if shift or len(out) != obj.get("n", len(out)):
+        raise ValueError("truncated payload")
+    return out
@@ -0,0 +1,129 @@
+# IshtarRF multi-device sessions
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Several boards at once, e.g. one per band. Every device is a SerialLink with
+# its own reader and writer threads, so throughput grows with the number of
+# boards; their events are merged into one stream for the log, library and
+# analysis.
+import threading, time
+from pathlib import PurePath
+
+from .transport import DEFAULT_BAUD, DEFAULT_TIMEOUT, FAST_BAUD, SerialLink
+
+class DeviceManager:
+    """A set of open SerialLinks keyed by device id, with one merged event stream.
+
+    Each event is tagged with ``device`` (its id), ``config`` (the last
+    set_config the device acknowledged, minus "cmd", or None) and ``t`` (host
+    receive time, time.time()) and then handed to `on_event`. Calls to
+    `on_event` are serialized, so the merged stream is in receive order;
+    keep the callback short (queue or emit, don't process).
+    """
+    def __init__(self, on_event=None, **link_kw):
+        self.on_event = on_event or (lambda obj: None)
+        self.link_kw = link_kw
+        self._links = {}          # id -> SerialLink, in open order
+        self._ports = {}          # id -> port
+        self._configs = {}        # id -> acknowledged config dict
+        self._lock = threading.Lock()
+        self._emit_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._links)
+
+    def __contains__(self, device_id):
+        return device_id in self._links
+
+    @property
+    def ids(self):
+        return list(self._links)
+
+    def link(self, device_id):
+        return self._links[device_id]
+
+    def port(self, device_id):
+        return self._ports[device_id]
+
+    def config(self, device_id):
+        return self._configs.get(device_id)
+
+    def metrics(self):
+        """[({"device": id}, snapshot)] of every open link's Metrics."""
+        return [({"device": d}, link.metrics.snapshot()) for d, link in list(self._links.items()) if link]
+
+    def find(self, port):
+        """Id of the device open on `port`, or None."""
+        return next((d for d, p in self._ports.items() if p == port), None)
+
+    def open(self, port, baud=DEFAULT_BAUD, device_id=None):
+        """Open `port` as another device; returns its id (default: the port's name)."""
+        if self.find(port) is not None:
+            raise ValueError(f"{port} is already open")
+        with self._lock:
+            base = device_id or PurePath(port).name or str(port)
+            device_id, n = base, 2
+            while device_id in self._links:
+                device_id, n = f"{base}#{n}", n + 1
+            self._links[device_id] = None       # reserve the id
+        link = SerialLink(on_event=lambda obj: self._emit(device_id, obj), **self.link_kw)
+        try:
+            link.open(port, baud)
+        except BaseException:
+            with self._lock:
+                del self._links[device_id]
+            raise
+        with self._lock:
+            self._links[device_id] = link
+            self._ports[device_id] = port
+        return device_id
+
+    def close(self, device_id):
+        with self._lock:
+            link = self._links.pop(device_id, None)
+            self._ports.pop(device_id, None)
+            self._configs.pop(device_id, None)
+        if link:
+            link.close()
+
+    def close_all(self):
+        for device_id in self.ids:
+            self.close(device_id)
+
+    def _emit(self, device_id, obj):
+        with self._emit_lock:
+            obj["device"] = device_id
+            obj["config"] = self._configs.get(device_id)
+            obj["t"] = time.time()
+            self.on_event(obj)
+
+    def _note_config(self, device_id, obj, fut):
+        if not fut.exception() and device_id in self._links:
+            # A frequency-only set_config retunes and keeps the rest.
+            config = dict(self._configs.get(device_id) or {})
+            config.update((k, v) for k, v in obj.items() if k != "cmd")
+            self._configs[device_id] = config
+
+    def send(self, obj, device_id, timeout=DEFAULT_TIMEOUT, quiet=False):
+        """Queue `obj` for one device; returns the SerialLink Future."""
+        link = self._links.get(device_id)
+        if link is None:
+            raise ConnectionError(f"No device {device_id}")
+        fut = link.send(obj, timeout, quiet)
+        if obj.get("cmd") == "set_config":
+            fut.add_done_callback(lambda f: self._note_config(device_id, obj, f))
+        return fut
+
+    def set_baud(self, device_id, baud=FAST_BAUD, timeout=DEFAULT_TIMEOUT):
+        """SerialLink.set_baud() on one device; returns its Future."""
+        link = self._links.get(device_id)
+        if link is None:
+            raise ConnectionError(f"No device {device_id}")
+        return link.set_baud(baud, timeout)
+
+    def broadcast(self, obj, timeout=DEFAULT_TIMEOUT):
+        """Queue `obj` for every device; returns {id: Future}."""
+        ids = [d for d in self.ids if self._links.get(d)]
+        if not ids:
+            raise ConnectionError("Not connected")
+        return {d: self.send(obj, d, timeout) for d in ids}
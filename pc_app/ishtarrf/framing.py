@@ -0,0 +1,64 @@
+# IshtarRF serial line framing
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+class LineFramer:
+    """Incremental newline framer over a single reusable bytearray.
+
+    Bytes are read straight into the buffer tail and only the newly arrived
+    region is scanned for delimiters. `frames()` yields memoryview slices that
+    stay valid until the next read/feed; consumers decode them in place.
+    """
+    def __init__(self, size=4096, max_line=1 << 20):
+        self.buf = bytearray(size)
+        self.start = 0      # first byte of the pending (incomplete) line
+        self.scan = 0       # bytes before this offset hold no delimiter
+        self.end = 0        # end of valid data
+        self.max_line = max_line
+        self.dropped = 0    # oversized lines discarded so far
+
+    def _reserve(self, n):
+        if self.end + n <= len(self.buf):
+            return
+        pending = self.end - self.start
+        if pending + n > len(self.buf):
+            # Grow into a fresh buffer: resizing in place would fail while a
+            # caller still holds a frame view of the old one.
+            grown = bytearray(max(pending + n, 2 * len(self.buf)))
+            grown[:pending] = self.buf[self.start:self.end]
+            self.buf = grown
+        elif self.start:
+            self.buf[:pending] = self.buf[self.start:self.end]
+        self.scan -= self.start
+        self.start, self.end = 0, pending
+
+    def read_from(self, ser, n):
+        """readinto() up to `n` bytes from `ser`; returns the count read."""
+        self._reserve(n)
+        with memoryview(self.buf) as mv:
+            got = ser.readinto(mv[self.end:self.end + n]) or 0
+        self.end += got
+        return got
+
+    def feed(self, data):
+        n = len(data)
+        self._reserve(n)
+        self.buf[self.end:self.end + n] = data
+        self.end += n
+
+    def frames(self):
+        buf = self.buf
+        with memoryview(buf) as mv:
+            while True:
+                i = buf.find(b"\n", self.scan, self.end)
+                if i < 0:
+                    break
+                s, self.start = self.start, i + 1
+                self.scan = self.start
+                yield mv[s:i]
+        self.scan = self.end
+        if self.end - self.start > self.max_line:
+            self.dropped += 1
+            self.start = self.scan = self.end = 0
+        elif self.start == self.end:
+            self.start = self.scan = self.end = 0
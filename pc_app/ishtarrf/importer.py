@@ -0,0 +1,179 @@
+# IshtarRF bulk import
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Brings dumps of .sub files (Flipper / Bruce SD cards, thousands of files in
+# nested folders) into a signal library. Every file is parsed, validated and
+# rewritten in normalized export_flipper_sub form by a process pool, and
+# the same workers build its SignalIndex entry, so the work scales with
+# the number of cores. Each outcome is appended to a journal in the library
+# (.import.jsonl), along with the library name planned for each source; a
+# re-run skips sources that are already imported or rejected and unchanged
+# and reuses the planned names, so an interrupted import just resumes.
+import json, re, threading, time
+from pathlib import Path
+
+from .cache import CACHE_DIR
+from .library import SignalIndex, index_entry
+from .scanner import CC1101_BANDS
+from .subfile import export_flipper_sub, parse_flipper_sub
+
+JOURNAL_NAME = ".import.jsonl"
+DONE = ("imported", "invalid")      # journal states a re-run skips
+INDEX_BATCH = 100
+CHUNKSIZE = 8
+
+def validate_sub(sub, bands=CC1101_BANDS):
+    """Why a parse_flipper_sub() result cannot go into the library, or None."""
+    protocol = sub.get("protocol")
+    if protocol and protocol.upper() != "RAW":
+        return f"protocol {protocol} is not RAW"
+    if not len(sub["pulses_us"]):
+        return "empty RAW_Data"
+    freq = sub.get("frequency_hz")
+    if not freq:
+        return "no Frequency"
+    mhz = freq / 1_000_000
+    if not any(lo <= mhz <= hi for lo, hi in bands):
+        return f"frequency {mhz:.3f} MHz is outside the CC1101 bands"
+    return None
+
+def library_name(rel):
+    """Flat library file name for a source path relative to the import root."""
+    parts = [re.sub(r"[^A-Za-z0-9_-]+", "-", p).strip("-") for p in Path(rel).with_suffix("").parts]
+    return "_".join(p for p in parts if p) + ".sub" if any(parts) else "signal.sub"
+
+def import_file(src, dst, bands=CC1101_BANDS):
+    """Pool worker: parse, validate and normalize `src` into `dst`; returns a result dict.
+
+    Imported files also carry "entry", their SignalIndex row.
+    """
+    rec = {"src": str(src), "name": Path(dst).name}
+    try:
+        sub = parse_flipper_sub(src)
+        reason = validate_sub(sub, bands)
+        if reason:
+            return {**rec, "status": "invalid", "reason": reason}
+        export_flipper_sub(dst, sub["frequency_hz"] / 1_000_000, sub["pulses_us"],
+                           start_negative=sub["start_negative"], preset=sub["preset"], repeat=sub["repeat"])
+        entry = index_entry(dst, Path(dst).parent / CACHE_DIR)
+    except (OSError, ValueError, OverflowError) as e:
+        return {**rec, "status": "error", "reason": str(e)}
+    return {**rec, "status": "imported", "pulses": entry[0][5], "frequency_hz": sub["frequency_hz"],
+            "entry": entry}
+
+class BulkImport:
+    """One import of every .sub under `src` into the library directory `dst`.
+
+    run() blocks and returns a summary dict; `on_progress(record, done,
+    total)` is called on the calling thread after each file. cancel() stops
+    at the next file; what finished is journaled and kept. `restart`
+    re-processes every source (e.g. after a validation change) but keeps the
+    library names they were given.
+    """
+    def __init__(self, src, dst, workers=None, bands=CC1101_BANDS, restart=False, on_progress=None):
+        self.src = Path(src).resolve()
+        self.dst = Path(dst).resolve()
+        self.workers = workers
+        self.bands = bands
+        self.restart = restart
+        self.on_progress = on_progress or (lambda rec, done, total: None)
+        self.journal_path = self.dst / JOURNAL_NAME
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _journal(self):
+        """{source path: last journal record}."""
+        done = {}
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        done[rec["src"]] = rec
+                    except (ValueError, KeyError, TypeError):
+                        continue        # torn last line of an interrupted run
+        except FileNotFoundError:
+            pass
+        return done
+
+    def plan(self):
+        """([(src, dst, mtime_ns, size)] still to import, number already done).
+
+        Names given to new sources are journaled ("planned") right away, so a
+        file written by a run that then died is overwritten, not duplicated.
+        """
+        journal = self._journal()
+        taken = {p.name for p in self.dst.glob("*.sub")} | {r["name"] for r in journal.values() if r.get("name")}
+        todo, planned, skipped = [], [], 0
+        for src in sorted(self.src.rglob("*")):
+            if src.suffix.lower() != ".sub" or not src.is_file():
+                continue
+            if self.dst in src.parents:
+                continue        # never re-import the library into itself
+            st = src.stat()
+            prev = journal.get(str(src))
+            if (prev and not self.restart and prev.get("status") in DONE
+                    and (prev.get("mtime_ns"), prev.get("size")) == (st.st_mtime_ns, st.st_size)):
+                skipped += 1
+                continue
+            name = prev.get("name") if prev else None
+            if not name:
+                base = library_name(src.relative_to(self.src))
+                name, n = base, 2
+                while name in taken:
+                    name, n = f"{base[:-4]}-{n}.sub", n + 1
+                taken.add(name)
+                planned.append({"src": str(src), "name": name, "status": "planned"})
+            todo.append((src, self.dst / name, st.st_mtime_ns, st.st_size))
+        if planned:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(r) + "\n" for r in planned))
+        return todo, skipped
+
+    def _results(self, todo, pool):
+        work = [(src, dst) for src, dst, _, _ in todo]
+        if pool is None:
+            return (import_file(src, dst, self.bands) for src, dst in work)
+        return pool.map(import_file, *zip(*work), [self.bands] * len(work), chunksize=CHUNKSIZE)
+
+    def run(self):
+        t0 = time.monotonic()
+        self.dst.mkdir(parents=True, exist_ok=True)
+        todo, skipped = self.plan()
+        counts = {"imported": 0, "invalid": 0, "error": 0}
+        pool = None
+        if todo and self.workers != 1 and len(todo) > CHUNKSIZE:
+            from concurrent.futures import ProcessPoolExecutor   # pulls in multiprocessing: import on first use
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+        index = SignalIndex(self.dst)
+        entries = []
+        try:
+            with open(self.journal_path, "a", encoding="utf-8") as journal:
+                for k, rec in enumerate(self._results(todo, pool)):
+                    _, _, mtime_ns, size = todo[k]
+                    entry = rec.pop("entry", None)
+                    if entry:
+                        entries.append(entry)
+                        if len(entries) >= INDEX_BATCH:
+                            index.add(entries)
+                            entries = []
+                    rec.update(mtime_ns=mtime_ns, size=size)
+                    journal.write(json.dumps(rec) + "\n")
+                    journal.flush()
+                    counts[rec["status"]] += 1
+                    self.on_progress(rec, k + 1, len(todo))
+                    if self._cancel.is_set():
+                        break
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            try:
+                index.add(entries)
+            finally:
+                index.close()
+        return {"src": str(self.src), "dir": str(self.dst), "found": len(todo) + skipped,
+                "already_done": skipped, **counts, "cancelled": self._cancel.is_set(),
+                "elapsed_s": round(time.monotonic() - t0, 2)}
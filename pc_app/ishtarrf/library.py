@@ -0,0 +1,260 @@
+# IshtarRF signal library index
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import hashlib, os, sqlite3
+from array import array
+from pathlib import Path
+
+from .cache import CACHE_DIR, cache_path, read_pulse_cache, write_pulse_cache
+from .similarity import band_keys, fingerprint, similarity
+from .subfile import parse_flipper_sub
+
+def index_entry(path, cache_dir, st=None):
+    """(signals row, fingerprint) for one .sub, writing its pulse cache entry.
+
+    Picklable and connection-free, so process-pool workers can build the
+    entries and the owner of the index only stores them (SignalIndex.add).
+    """
+    path = Path(path)
+    st = st or path.stat()
+    sub = parse_flipper_sub(path)
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha1").hexdigest()
+    try:
+        cached = cache_path(cache_dir, digest)
+        if not cached.exists():
+            write_pulse_cache(cached, sub)
+    except OSError:
+        pass
+    pulses = sub["pulses_us"]
+    return ((path.name, st.st_mtime_ns, st.st_size, sub["frequency_hz"], sub["preset"],
+             len(pulses), sum(pulses), int(sub["start_negative"]), digest),
+            fingerprint(pulses))
+
+class SignalIndex:
+    """SQLite metadata index of the .sub files in a signal directory.
+
+    Rows are keyed by file name and refreshed incrementally: a file is only
+    re-parsed when its mtime or size no longer matches the stored row. Each
+    file also gets a MinHash fingerprint with LSH band buckets, used by
+    match() and duplicates(), and a binary pulse cache entry (see cache.py)
+    named by its SHA-1, used by load().
+    """
+    DB_NAME = ".index.sqlite"
+    REFRESH_BATCH = 100
+    SCHEMA_VERSION = 1
+    SORT_COLUMNS = {"name": "name COLLATE NOCASE", "frequency": "frequency_hz, name COLLATE NOCASE"}
+
+    def __init__(self, sig_dir):
+        self.sig_dir = Path(sig_dir)
+        self.cache_dir = self.sig_dir / CACHE_DIR
+        self.db = sqlite3.connect(str(self.sig_dir / self.DB_NAME))
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS signals (
+                name TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                frequency_hz INTEGER,
+                preset TEXT,
+                pulse_count INTEGER NOT NULL,
+                duration_us INTEGER NOT NULL,
+                start_negative INTEGER NOT NULL,
+                sha1 TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS signals_freq ON signals(frequency_hz);
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                name TEXT PRIMARY KEY,
+                sig BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lsh (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                name TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lsh_bucket ON lsh(band, bucket);
+            CREATE INDEX IF NOT EXISTS lsh_name ON lsh(name);
+            CREATE TABLE IF NOT EXISTS failed (
+                name TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+        """)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            # Rows from an older layout lack fingerprints: re-index everything.
+            with self.db:
+                self.db.execute("DELETE FROM signals")
+                self.db.execute("DELETE FROM failed")
+                self.db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def close(self):
+        self.db.close()
+
+    def _row_for(self, path, st):
+        return index_entry(path, self.cache_dir, st)
+
+    def _store(self, entries, removed=(), failed=()):
+        # `failed` holds (name, mtime_ns, size) of files that no longer parse:
+        # their rows go, and the stamp keeps refresh() from retrying them.
+        removed = [*removed, *(f[0] for f in failed)]
+        names = [(n,) for n in removed] + [(row[0],) for row, _ in entries]
+        with self.db:
+            self.db.executemany("DELETE FROM signals WHERE name = ?", ((n,) for n in removed))
+            self.db.executemany("DELETE FROM failed WHERE name = ?", names)
+            self.db.executemany("INSERT INTO failed VALUES (?,?,?)", failed)
+            self.db.executemany("DELETE FROM fingerprints WHERE name = ?", names)
+            self.db.executemany("DELETE FROM lsh WHERE name = ?", names)
+            self.db.executemany("INSERT OR REPLACE INTO signals VALUES (?,?,?,?,?,?,?,?,?)",
+                                (row for row, _ in entries))
+            for row, sig in entries:
+                if sig is None:
+                    continue
+                self.db.execute("INSERT INTO fingerprints VALUES (?,?)", (row[0], sig.tobytes()))
+                self.db.executemany("INSERT INTO lsh VALUES (?,?,?)",
+                                    ((band, bucket, row[0]) for band, bucket in band_keys(sig)))
+
+    def update_file(self, path):
+        path = Path(path)
+        self._store([self._row_for(path, path.stat())])
+        self._prune_cache()
+
+    def add(self, entries):
+        """Store index_entry() results built elsewhere (e.g. by import workers)."""
+        self._store(list(entries))
+
+    def refresh(self, on_batch=None):
+        """Sync the index with the directory; returns the number of rows touched.
+
+        With `on_batch`, new rows are committed every REFRESH_BATCH files and
+        on_batch(rows so far) is called after each commit, so a first index of
+        a large library shows up piece by piece on other connections. A file
+        that fails to parse is dropped from the index and not retried until
+        its mtime or size changes.
+        """
+        known = {name: (mtime, size) for name, mtime, size
+                 in self.db.execute("SELECT name, mtime_ns, size FROM signals")}
+        failed = {name: (mtime, size) for name, mtime, size
+                  in self.db.execute("SELECT name, mtime_ns, size FROM failed")}
+        entries, bad, done = [], [], 0
+        for entry in os.scandir(self.sig_dir):
+            if not entry.name.endswith(".sub") or not entry.is_file():
+                continue
+            st = entry.stat()
+            stamp = (st.st_mtime_ns, st.st_size)
+            if known.pop(entry.name, None) == stamp or failed.pop(entry.name, None) == stamp:
+                continue
+            try:
+                entries.append(self._row_for(Path(entry.path), st))
+            except (OSError, ValueError, OverflowError):
+                bad.append((entry.name, *stamp))    # unreadable or malformed: index the rest
+                continue
+            if on_batch and len(entries) >= self.REFRESH_BATCH:
+                self._store(entries)
+                done += len(entries)
+                entries = []
+                on_batch(done)
+        self._store(entries, [*known, *failed], bad)
+        done += len(entries) + len(known) + len(bad)
+        if done:
+            self._prune_cache()
+        return done
+
+    def _prune_cache(self):
+        live = {d for d, in self.db.execute("SELECT sha1 FROM signals")}
+        try:
+            stale = [e.path for e in os.scandir(self.cache_dir) if e.name.partition(".")[0] not in live]
+        except OSError:
+            return
+        for p in stale:
+            try:
+                os.remove(p)
+            except OSError:    # still mapped (Windows) or already gone
+                pass
+
+    def _cached(self, name, st):
+        row = self.db.execute("SELECT mtime_ns, size, sha1 FROM signals WHERE name = ?", (name,)).fetchone()
+        if row and row[:2] == (st.st_mtime_ns, st.st_size):
+            return read_pulse_cache(cache_path(self.cache_dir, row[2]))
+        return None
+
+    def load(self, name):
+        """parse_flipper_sub() result for `name`, memory-mapped from the cache when current."""
+        path = self.sig_dir / name
+        st = path.stat()
+        sub = self._cached(name, st)
+        if sub is None:
+            # Changed on disk or never cached: re-index, which writes the entry.
+            self.update_file(path)
+            sub = self._cached(name, st)
+        return sub if sub is not None else parse_flipper_sub(path)
+
+    def query(self, text="", sort="name"):
+        """Return (name, frequency_hz, pulse_count, duration_us) rows matching `text`.
+
+        `text` is matched against the file name and the frequency in MHz.
+        """
+        order = self.SORT_COLUMNS.get(sort, self.SORT_COLUMNS["name"])
+        sql = "SELECT name, frequency_hz, pulse_count, duration_us FROM signals"
+        args = ()
+        if text:
+            pat = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            sql += (" WHERE name LIKE ? ESCAPE '\\'"
+                    " OR printf('%.3f', frequency_hz / 1000000.0) LIKE ? ESCAPE '\\'")
+            args = (pat, pat)
+        return self.db.execute(f"{sql} ORDER BY {order}", args).fetchall()
+
+    def _signature(self, name):
+        row = self.db.execute("SELECT sig FROM fingerprints WHERE name = ?", (name,)).fetchone()
+        return array("I", row[0]) if row else None
+
+    def match(self, pulses, threshold=0.5, limit=5):
+        """Saved signals similar to `pulses`: [(name, score)], best first.
+
+        Only files sharing an LSH bucket with the capture are compared.
+        """
+        sig = fingerprint(pulses)
+        if sig is None:
+            return []
+        names = set()
+        for key in band_keys(sig):
+            names.update(n for n, in self.db.execute(
+                "SELECT name FROM lsh WHERE band = ? AND bucket = ?", key))
+        scored = ((n, similarity(sig, self._signature(n))) for n in names)
+        hits = sorted((s for s in scored if s[1] >= threshold), key=lambda s: (-s[1], s[0]))
+        return hits[:limit]
+
+    def duplicates(self, threshold=0.8):
+        """Groups of near-identical files: [{"files": [...], "score": min pairwise score}]."""
+        sigs, parent, score = {}, {}, {}
+
+        def root(n):
+            while parent.get(n, n) != n:
+                n = parent[n]
+            return n
+
+        buckets = self.db.execute("SELECT group_concat(name, char(0)) FROM lsh"
+                                  " GROUP BY band, bucket HAVING count(*) > 1")
+        seen = set()
+        for members, in buckets:
+            members = sorted(members.split("\0"))
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    if (a, b) in seen:
+                        continue
+                    seen.add((a, b))
+                    for n in (a, b):
+                        if n not in sigs:
+                            sigs[n] = self._signature(n)
+                    s = similarity(sigs[a], sigs[b])
+                    if s < threshold:
+                        continue
+                    ra, rb = root(a), root(b)
+                    if ra != rb:
+                        parent[rb] = ra
+                        score[ra] = min(score.get(ra, 1.0), score.pop(rb, 1.0))
+                    score[ra] = min(score.get(ra, 1.0), s)
+        groups = {}
+        for n in parent:
+            groups.setdefault(root(n), set()).add(n)
+        return sorted(({"files": sorted(g | {r}), "score": score[r]} for r, g in groups.items()),
+                      key=lambda g: g["files"])
@@ -0,0 +1,207 @@
+# IshtarRF metrics
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Counters, gauges and latency histograms for the hot paths: the serial
+# reader and writer threads and the GUI's event dispatch. Histograms have
+# fixed buckets, so observe() is a bisect and an increment and no samples
+# are kept. Snapshots are plain dicts; window() turns two of them into rates
+# and per-interval quantiles, and the exporters write them as a Prometheus
+# text file (for node_exporter's textfile collector) or as JSON lines.
+import json, os, threading, time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+# Bucket upper bounds, seconds; one more bucket catches everything slower.
+LATENCY_BUCKETS = (25e-6, 50e-6, 100e-6, 250e-6, 500e-6, 1e-3, 2.5e-3, 5e-3, 10e-3,
+                   25e-3, 50e-3, 100e-3, 250e-3, 500e-3, 1.0, 2.5, 5.0)
+EXPORT_INTERVAL_S = 5.0
+PROM_PREFIX = "ishtarrf_"
+
+class Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self):
+        self.counts = array("Q", [0]) * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+
+class Metrics:
+    """Named counters, gauges and latency histograms; safe to update from any thread.
+
+    A gauge is either set() or registered as a function that snapshot()
+    calls, which keeps queue depths etc. off the hot path.
+    """
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._gauge_fns = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        self.gauges[name] = value
+
+    def gauge(self, name, fn):
+        self._gauge_fns[name] = fn
+
+    def observe(self, name, seconds):
+        with self._lock:
+            h = self.histograms.get(name)
+            if h is None:
+                h = self.histograms[name] = Histogram()
+            h.observe(seconds)
+
+    def snapshot(self):
+        """{"t", "counters", "gauges", "histograms": {name: (bucket counts, sum)}}."""
+        gauges = dict(self.gauges)
+        for name, fn in list(self._gauge_fns.items()):
+            gauges[name] = fn()
+        with self._lock:
+            return {"t": time.time(), "counters": dict(self.counters), "gauges": gauges,
+                    "histograms": {k: (h.counts.tolist(), h.sum) for k, h in self.histograms.items()}}
+
+def quantile(counts, q):
+    """Upper bound of the bucket holding the q-quantile; inf past the last bucket, None if empty."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank, seen = q * total, 0
+    for i, c in enumerate(counts):
+        seen += c
+        if c and seen >= rank:
+            return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float("inf")
+    return float("inf")
+
+def window(prev, cur):
+    """What happened between two snapshots of the same Metrics.
+
+    Returns {"seconds", "rates" (counters per second), "gauges", "latency"
+    ({name: {"count", "mean", "p50", "p99"}} for the interval)} plus
+    "link_load", the busier direction's share of the line rate, when a
+    "baud" gauge is present.
+    """
+    dt = max(1e-9, cur["t"] - prev["t"])
+    pc = prev["counters"]
+    rates = {k: (v - pc.get(k, 0)) / dt for k, v in cur["counters"].items()}
+    latency = {}
+    for name, (counts, total) in cur["histograms"].items():
+        p_counts, p_total = prev["histograms"].get(name, ((), 0.0))
+        d = [c - (p_counts[i] if i < len(p_counts) else 0) for i, c in enumerate(counts)]
+        n = sum(d)
+        latency[name] = {"count": n, "mean": (total - p_total) / n if n else None,
+                         "p50": quantile(d, 0.5), "p99": quantile(d, 0.99)}
+    out = {"seconds": dt, "rates": rates, "gauges": cur["gauges"], "latency": latency}
+    baud = cur["gauges"].get("baud")
+    if baud:
+        # 8N1: ten bits on the wire per byte.
+        out["link_load"] = max(rates.get("rx_bytes", 0), rates.get("tx_bytes", 0)) * 10 / baud
+    return out
+
+# ---- export
+
+def _labels(labels, **extra):
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items.items()) + "}"
+
+def to_prometheus(snapshots, prefix=PROM_PREFIX):
+    """Prometheus text exposition of [(labels dict, snapshot)]."""
+    series = {}       # metric name -> (type, [lines])
+    def add(name, kind, line):
+        series.setdefault(name, (kind, []))[1].append(line)
+    for labels, snap in snapshots:
+        for k, v in snap["counters"].items():
+            name = f"{prefix}{k}_total"
+            add(name, "counter", f"{name}{_labels(labels)} {v}")
+        for k, v in snap["gauges"].items():
+            if v is not None:
+                name = prefix + k
+                add(name, "gauge", f"{name}{_labels(labels)} {v}")
+        for k, (counts, total) in snap["histograms"].items():
+            name = prefix + k
+            cum = 0
+            for i, c in enumerate(counts):
+                cum += c
+                le = repr(LATENCY_BUCKETS[i]) if i < len(LATENCY_BUCKETS) else "+Inf"
+                add(name, "histogram", f"{name}_bucket{_labels(labels, le=le)} {cum}")
+            add(name, "histogram", f"{name}_sum{_labels(labels)} {total}")
+            add(name, "histogram", f"{name}_count{_labels(labels)} {cum}")
+    out = []
+    for name, (kind, lines) in series.items():
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(lines)
+    return "\n".join(out) + "\n"
+
+def write_prometheus(path, snapshots):
+    """Replace `path` atomically, so a scraper never reads a half-written file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(to_prometheus(snapshots), encoding="utf-8")
+    os.replace(tmp, path)
+
+class MetricsExporter:
+    """Writes metrics every `interval` seconds on a background thread.
+
+    `collect()` returns [(labels dict, snapshot)]. A path ending in .prom is
+    rewritten with the cumulative Prometheus text; anything else gets one
+    JSON line per labels per interval, {"t", **labels, **window()}.
+    """
+    def __init__(self, collect, path, interval=EXPORT_INTERVAL_S):
+        self.collect = collect
+        self.path = Path(path)
+        self.interval = interval
+        self.prometheus = self.path.suffix == ".prom"
+        self.error = None
+        self._prev = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._prev = {self._key(labels): snap for labels, snap in self.collect()}
+        self._thread.start()
+
+    def stop(self):
+        """Write a last sample and stop."""
+        self._stop.set()
+        self._thread.join()
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+
+    def write(self):
+        snapshots = self.collect()
+        if self.prometheus:
+            write_prometheus(self.path, snapshots)
+            return
+        lines = []
+        for labels, snap in snapshots:
+            prev = self._prev.get(self._key(labels))
+            self._prev[self._key(labels)] = snap
+            if prev is not None:
+                lines.append(json.dumps({"t": snap["t"], **labels, **window(prev, snap)}))
+        if lines:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def _run(self):
+        while True:
+            stopping = self._stop.wait(self.interval)
+            try:
+                self.write()
+            except OSError as e:
+                self.error = e
+            if stopping:
+                return
@@ -0,0 +1,76 @@
+# IshtarRF protocol commands
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Builders for the JSON commands understood by IshtarRF.ino. Each returns the
+# dict to pass to SerialLink.send / SerialWorker.send.
+from .codec import HOST_CAPS
+
+RAW_MAX_PULSES = 10000    # firmware pulse buffer; longer trains go through tx_stream
+LINK_BAUDS = (115200, 230400, 460800, 921600, 1500000, 2000000)   # firmware BAUD_RATES
+BAUD_CONFIRM_S = 1.5      # firmware BAUD_CONFIRM_MS: unconfirmed set_baud reverts after this
+
+def ping(caps=HOST_CAPS):
+    return {"cmd": "ping", "caps": list(caps)}
+
+def set_baud(baud):
+    """Switch the UART after the reply; a ping at the new rate must follow (see SerialLink.set_baud)."""
+    return {"cmd": "set_baud", "baud": int(baud)}
+
+def recover():
+    return {"cmd": "recover"}
+
+def set_config(freq_mhz=433.92, mod="OOK", br_kbps=2.4, dev_khz=30.0, tx_power=0):
+    return {"cmd": "set_config", "freq": float(freq_mhz), "mod": mod, "br_kbps": float(br_kbps),
+            "dev_khz": float(dev_khz), "tx_power": int(tx_power)}
+
+def set_frequency(freq_mhz):
+    """Retune only; the firmware skips the radio re-init when nothing else changes."""
+    return {"cmd": "set_config", "freq": float(freq_mhz)}
+
+def rx_start(mode="raw_ook", timeout_ms=None):
+    if timeout_ms is None:
+        timeout_ms = 40 if mode == "raw_ook" else 0
+    return {"cmd": "rx_start", "mode": mode, "timeout_ms": int(timeout_ms)}
+
+def rx_stop():
+    return {"cmd": "rx_stop"}
+
+def get_rssi(dwell_ms=0):
+    obj = {"cmd": "get_rssi"}
+    if dwell_ms:
+        obj["dwell_ms"] = int(dwell_ms)   # report the peak over this window
+    return obj
+
+def tx_bytes(hexs):
+    return {"cmd": "tx_bytes", "hex": hexs}
+
+def tx_raw(pulses_us, repeat=1, gap_ms=20, invert=False):
+    obj = {"cmd": "tx_raw", "pulses_us": pulses_us, "repeat": int(repeat), "gap_ms": int(gap_ms)}
+    if invert:
+        # The firmware reads this key with valS(), i.e. as a quoted string.
+        obj["invert"] = "true"
+    return obj
+
+def tx_stream_begin(invert=False):
+    obj = {"cmd": "tx_stream", "op": "begin"}
+    if invert:
+        obj["invert"] = "true"
+    return obj
+
+def tx_stream_chunk(pulses_us):
+    return {"cmd": "tx_stream", "op": "chunk", "pulses_us": pulses_us}
+
+def tx_stream_end():
+    return {"cmd": "tx_stream", "op": "end"}
+
+def busy_seconds(obj):
+    """How long the device is busy before it can answer `obj` (airtime, RSSI dwell)."""
+    if obj.get("cmd") == "get_rssi":
+        return int(obj.get("dwell_ms", 0)) / 1000
+    if obj.get("cmd") == "tx_stream":
+        return sum(obj.get("pulses_us", ())) / 1e6
+    if obj.get("cmd") != "tx_raw":
+        return 0.0
+    repeat = max(1, int(obj.get("repeat", 1)))
+    return (sum(obj.get("pulses_us", ())) / 1e6 + int(obj.get("gap_ms", 0)) / 1000) * repeat
@@ -0,0 +1,89 @@
+# IshtarRF pulse trains
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# One compact type for a pulse train from capture to replay: the durations
+# as an int32 buffer plus start polarity and radio metadata. Captures, .sub
+# loads (including mmap'd cache entries) and TX all share the same buffer;
+# text is only produced for a short preview.
+from array import array
+
+PREVIEW_PULSES = 64
+
+def _int32_view(durations):
+    if isinstance(durations, memoryview) and durations.format == "i" and durations.ndim == 1:
+        return durations
+    if not (isinstance(durations, array) and durations.typecode == "i"):
+        durations = array("i", durations)
+    return memoryview(durations)
+
+class PulseTrain:
+    """Durations (µs) of alternating levels, with start polarity and metadata.
+
+    ``durations`` is an int32 memoryview (treat it as read-only); slicing a
+    train returns a new train over the same buffer (and flips the polarity
+    when the slice starts on an odd pulse). Iterating yields ints, so a train
+    goes anywhere a list of durations did, including protocol.tx_raw and
+    export_flipper_sub.
+    """
+    __slots__ = ("durations", "start_negative", "frequency_hz", "preset", "protocol")
+
+    def __init__(self, durations=(), start_negative=False, frequency_hz=None, preset=None, protocol=None):
+        self.durations = _int32_view(durations)
+        self.start_negative = bool(start_negative)
+        self.frequency_hz = frequency_hz
+        self.preset = preset
+        self.protocol = protocol
+
+    @classmethod
+    def from_sub(cls, sub):
+        """Wrap a parse_flipper_sub() / SignalIndex.load() dict without copying."""
+        return cls(sub["pulses_us"], sub.get("start_negative", False), sub.get("frequency_hz"),
+                   sub.get("preset"), sub.get("protocol"))
+
+    @classmethod
+    def parse(cls, text, **meta):
+        """Parse comma/space separated durations; raises ValueError."""
+        try:
+            return cls(array("i", map(int, text.replace(",", " ").split())), **meta)
+        except OverflowError:
+            raise ValueError("pulse out of range") from None
+
+    def __len__(self):
+        return len(self.durations)
+
+    def __iter__(self):
+        return iter(self.durations)
+
+    def __bool__(self):
+        return len(self.durations) > 0
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self.durations[key]
+        start, _, step = key.indices(len(self.durations))
+        if step != 1:
+            raise ValueError("PulseTrain slices must be contiguous")
+        return PulseTrain(self.durations[key], self.start_negative != bool(start % 2),
+                          self.frequency_hz, self.preset, self.protocol)
+
+    def __repr__(self):
+        return f"<PulseTrain {len(self)} pulses, {self.duration_us / 1000:.1f} ms>"
+
+    @property
+    def duration_us(self):
+        return sum(self.durations)
+
+    @property
+    def frequency_mhz(self):
+        return None if self.frequency_hz is None else self.frequency_hz / 1_000_000
+
+    def tolist(self):
+        return self.durations.tolist()
+
+    def preview(self, limit=PREVIEW_PULSES):
+        """The first `limit` durations as text, e.g. for a line edit."""
+        text = ",".join(map(str, self.durations[:limit]))
+        if len(self) > limit:
+            text += f",… (+{len(self) - limit} more)"
+        return text
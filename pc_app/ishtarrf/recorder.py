@@ -0,0 +1,223 @@
+# IshtarRF continuous recorder
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Unattended recording of every RX event. A recording is a directory of
+# append-only segments, `rec-<start ms>.jsonl`: one event per line, as
+# received (host time "t", "device", "config", "rssi_dbm"), with pulse trains
+# stored in the compact pulses_vlq form. Segments rotate by size and age and
+# are never rewritten, so a crash loses at most the unflushed tail and a torn
+# last line is skipped on read. Beside each segment, `.idx` holds a sparse
+# time index (packed <time, offset> pairs every INDEX_EVERY_S) for seeking.
+import json, queue, struct, threading, time
+from bisect import bisect_right
+from pathlib import Path
+
+from .codec import PULSES_VLQ, decode_pulses_vlq, encode_pulses_vlq
+
+RX_EVENTS = frozenset({"rx_raw", "rx_bytes"})
+SEGMENT_BYTES = 64 << 20
+SEGMENT_SECONDS = 3600
+INDEX_EVERY_S = 1.0
+QUEUE_MAX = 20000         # events buffered for the writer before new ones are dropped
+FLUSH_S = 0.5
+_INDEX = struct.Struct("<dQ")
+
+def _segment_start(path):
+    return int(path.stem.split("-", 1)[1]) / 1000
+
+class Recorder:
+    """Background writer of events into a segmented recording directory.
+
+    record() never blocks: events go into a bounded queue that a writer
+    thread drains in batches, so a slow disk costs memory only up to
+    QUEUE_MAX events and then drops (counted in ``stats["dropped"]``).
+    """
+    def __init__(self, directory, kinds=RX_EVENTS, segment_bytes=SEGMENT_BYTES,
+                 segment_seconds=SEGMENT_SECONDS):
+        self.dir = Path(directory)
+        self.kinds = kinds
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.stats = {"events": 0, "bytes": 0, "dropped": 0, "segments": 0}
+        self._q = queue.Queue(QUEUE_MAX)
+        self._thread = None
+        self._f = self._idx = None
+        self.error = None
+
+    def start(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Write out what is queued and stop."""
+        if self._thread:
+            if self.error is None:
+                self._q.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def record(self, obj):
+        if self.kinds is not None and obj.get("event") not in self.kinds:
+            return
+        if obj.get("playback"):
+            return
+        if self.error:
+            self.stats["dropped"] += 1
+            return
+        try:
+            self._q.put_nowait(obj)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    # ---- writer thread
+    def _open_segment(self, t):
+        self._close_segment()
+        path = self.dir / f"rec-{int(t * 1000)}.jsonl"
+        self._f = open(path, "ab")
+        self._idx = open(path.with_suffix(".idx"), "ab")
+        self._seg_t0, self._seg_size, self._last_index_t = t, 0, None
+        self.stats["segments"] += 1
+
+    def _close_segment(self):
+        for f in (self._f, self._idx):
+            if f:
+                f.close()
+        self._f = self._idx = None
+
+    def _encode(self, obj):
+        rec = dict(obj)
+        rec.setdefault("t", time.time())
+        pulses = rec.pop("pulses_us", None)
+        if pulses is not None:
+            rec.update(encode_pulses_vlq(pulses))
+        return rec["t"], (json.dumps(rec, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _write(self, obj):
+        t, line = self._encode(obj)
+        if (self._f is None or self._seg_size + len(line) > self.segment_bytes
+                or t - self._seg_t0 >= self.segment_seconds):
+            self._open_segment(t)
+        if self._last_index_t is None or t - self._last_index_t >= INDEX_EVERY_S:
+            self._idx.write(_INDEX.pack(t, self._seg_size))
+            self._last_index_t = t
+        self._f.write(line)
+        self._seg_size += len(line)
+        self.stats["events"] += 1
+        self.stats["bytes"] += len(line)
+
+    def _run(self):
+        last_flush = time.monotonic()
+        try:
+            while True:
+                batch = []
+                try:
+                    batch.append(self._q.get(timeout=FLUSH_S))
+                    while True:
+                        batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    pass
+                for obj in batch:
+                    if obj is None:
+                        return
+                    self._write(obj)
+                if self._f and time.monotonic() - last_flush >= FLUSH_S:
+                    self._f.flush()
+                    self._idx.flush()
+                    last_flush = time.monotonic()
+        except OSError as e:
+            self.error = e      # e.g. disk full; record() drops from now on
+        finally:
+            self._close_segment()
+
+class RecordingReader:
+    """Time-ordered access to a recording directory written by Recorder."""
+    def __init__(self, directory):
+        self.dir = Path(directory)
+
+    def segments(self):
+        return sorted(self.dir.glob("rec-*.jsonl"), key=_segment_start)
+
+    @staticmethod
+    def _seek_offset(path, start):
+        try:
+            raw = path.with_suffix(".idx").read_bytes()
+        except OSError:
+            return 0
+        entries = [_INDEX.unpack_from(raw, i) for i in range(0, len(raw) - len(raw) % _INDEX.size, _INDEX.size)]
+        k = bisect_right([t for t, _ in entries], start) - 1
+        return entries[k][1] if k >= 0 else 0
+
+    def events(self, start=None, end=None):
+        """Yield recorded events with start <= t < end, pulses decoded to array('i')."""
+        segs = self.segments()
+        if start is not None:
+            # The last segment that began at or before `start` may hold it.
+            starts = [_segment_start(p) for p in segs]
+            segs = segs[max(0, bisect_right(starts, start) - 1):]
+        for i, path in enumerate(segs):
+            if end is not None and _segment_start(path) >= end:
+                return
+            offset = self._seek_offset(path, start) if start is not None and i == 0 else 0
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    try:
+                        obj = json.loads(line)
+                        if PULSES_VLQ in obj:
+                            obj["pulses_us"] = decode_pulses_vlq(obj)
+                            for k in (PULSES_VLQ, "n", "crc"):
+                                del obj[k]
+                    except ValueError:
+                        continue        # torn tail of a segment still being written
+                    t = obj.get("t", 0)
+                    if start is not None and t < start:
+                        continue
+                    if end is not None and t >= end:
+                        return
+                    yield obj
+
+class Player:
+    """Re-emits recorded events on a background thread with their original spacing.
+
+    `speed` scales time (2.0 = twice as fast; 0 = as fast as possible).
+    Events are passed to `emit` tagged with "playback": True.
+    """
+    def __init__(self, reader, emit, speed=1.0, start=None, end=None, on_done=None):
+        self.reader = reader
+        self.emit = emit
+        self.speed = speed
+        self.start_t, self.end_t = start, end
+        self.on_done = on_done or (lambda count: None)
+        self.count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        t0 = wall0 = None
+        try:
+            for obj in self.reader.events(self.start_t, self.end_t):
+                if self._stop.is_set():
+                    break
+                if self.speed > 0:
+                    t = obj.get("t", 0)
+                    if t0 is None:
+                        t0, wall0 = t, time.monotonic()
+                    delay = wall0 + (t - t0) / self.speed - time.monotonic()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                obj["playback"] = True
+                self.emit(obj)
+                self.count += 1
+        finally:
+            self.on_done(self.count)
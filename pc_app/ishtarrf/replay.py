@@ -0,0 +1,166 @@
+# IshtarRF streamed replay
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Replays pulse trains of any length through the firmware's tx_stream command.
+# The train is cut into chunks small enough for the device's UART buffer,
+# preferably right after a long idle-level pulse: the firmware parses the next
+# chunk while that pulse is still on air, so cuts there add no audible gap.
+# Two chunks are kept in flight (one on air, one waiting in the UART buffer)
+# and each ack carries how late the chunk started (`late_us`, an underrun).
+import threading, time
+from concurrent.futures import Future
+
+from . import protocol
+from .codec import PULSES_VLQ
+from .transport import DEFAULT_TIMEOUT
+
+CHUNK_OVERHEAD = 100      # JSON keys, n/crc, id around the pulse payload
+
+def _pulse_cost(d, vlq):
+    if vlq:
+        # LEB128 bytes, times 4/3 for base64.
+        return (1 + (d >= 0x80) + (d >= 0x4000) + (d >= 0x200000)) * 4 / 3
+    return len(str(d)) + 1
+
+def plan_chunks(pulses, max_bytes, vlq=True, max_pulses=protocol.RAW_MAX_PULSES, min_fill=0.5):
+    """Split `pulses` into [(start, end)] chunks of at most `max_bytes` encoded.
+
+    Each cut falls after the longest idle-level (odd index) pulse in the back
+    part of the chunk, so every chunk starts on an active-level pulse.
+    """
+    chunks, n = [], len(pulses)
+    start = 0
+    while start < n:
+        size, best, best_d = 0.0, None, -1
+        i = start
+        while i < n and i - start < max_pulses:
+            size += _pulse_cost(int(pulses[i]), vlq)
+            if size > max_bytes and i > start:
+                break
+            if (i % 2 == 1 and pulses[i] > best_d and
+                    (size >= min_fill * max_bytes or i - start >= min_fill * max_pulses)):
+                best, best_d = i, pulses[i]
+            i += 1
+        end = i if i >= n or best is None else best + 1
+        chunks.append((start, end))
+        start = end
+    return chunks
+
+class StreamReplay:
+    """One tx_stream run over a SerialLink; start() returns a Future for the report.
+
+    Progress is reported through `on_chunk(record)`, called on the link's
+    reader thread with the chunk index, pulse count, planned airtime and the
+    device-reported `late_us`.
+    """
+    def __init__(self, link, pulses, invert=False, chunk_bytes=None, on_chunk=None):
+        self.link = link
+        self.pulses = pulses
+        self.invert = invert
+        self.on_chunk = on_chunk or (lambda rec: None)
+        budget = (chunk_bytes or link.window_bytes // 2) - CHUNK_OVERHEAD
+        self.chunks = plan_chunks(pulses, budget, vlq=PULSES_VLQ in link.caps)
+        self.done = Future()
+        self.records = []
+        self._lock = threading.Lock()
+        self._next = 0
+        self._acked = 0
+        self._failed = None
+        self._finished = False
+        self._cancel = False
+        self._t0 = None
+
+    def start(self):
+        self.done.set_running_or_notify_cancel()
+        self.link.send(protocol.tx_stream_begin(self.invert)).add_done_callback(self._on_begin)
+        return self.done
+
+    def cancel(self):
+        """Stop after the chunks already sent."""
+        self._cancel = True
+
+    def _air_s(self, k):
+        a, b = self.chunks[k]
+        return sum(self.pulses[a:b]) / 1e6
+
+    def _on_begin(self, fut):
+        if fut.exception():
+            self.done.set_exception(fut.exception())
+            return
+        self._t0 = time.monotonic()
+        if not self.chunks:
+            self._finish()
+            return
+        self._send_next()
+        self._send_next()
+
+    def _send_next(self):
+        with self._lock:
+            k = self._next
+            if k >= len(self.chunks) or self._cancel or self._failed:
+                return
+            self._next += 1
+        a, b = self.chunks[k]
+        # Chunk k queues behind chunk k-1 on the device before its own airtime.
+        wait = DEFAULT_TIMEOUT + (self._air_s(k - 1) if k else 0.0)
+        try:
+            fut = self.link.send(protocol.tx_stream_chunk(self.pulses[a:b]), wait)
+        except ConnectionError as e:
+            self._fail(e)
+            return
+        fut.add_done_callback(lambda f, k=k: self._on_ack(k, f))
+
+    def _on_ack(self, k, fut):
+        if fut.exception():
+            self._fail(fut.exception())
+            return
+        if self._failed:
+            return
+        a, b = self.chunks[k]
+        rec = {"chunk": k, "pulses": b - a, "air_ms": round(self._air_s(k) * 1000, 1),
+               "ack_ms": round((time.monotonic() - self._t0) * 1000, 1),
+               "late_us": fut.result().get("late_us", 0)}
+        with self._lock:
+            self.records.append(rec)
+            self._acked += 1
+            last = self._acked == self._next and (self._next == len(self.chunks) or self._cancel)
+        self.on_chunk(rec)
+        if last:
+            self._finish()
+        else:
+            self._send_next()
+
+    def _fail(self, exc):
+        with self._lock:
+            first = self._failed is None
+            self._failed = exc
+        if first:
+            self._finish()
+
+    def _finish(self):
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        try:
+            fut = self.link.send(protocol.tx_stream_end())
+        except ConnectionError as e:
+            self.done.set_exception(self._failed or e)
+            return
+        fut.add_done_callback(self._on_end)
+
+    def _on_end(self, fut):
+        if self._failed or fut.exception():
+            self.done.set_exception(self._failed or fut.exception())
+            return
+        late = [r["late_us"] for r in self.records]
+        self.done.set_result({
+            "chunks": len(self.records),
+            "pulses": sum(r["pulses"] for r in self.records),
+            "air_ms": round(sum(r["air_ms"] for r in self.records), 1),
+            "elapsed_ms": round((time.monotonic() - self._t0) * 1000, 1),
+            "late_us_total": sum(late),
+            "late_us_max": max(late, default=0),
+            "cancelled": self._cancel and len(self.records) < len(self.chunks),
+        })
@@ -0,0 +1,171 @@
+# IshtarRF band scanner
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# RSSI sweeps built from set_config + get_rssi. Every step of a sweep is
+# queued at once and SerialLink's window keeps the device fed, so a step costs
+# its serial bytes rather than a round trip; with several devices the steps
+# are split between them. A coarse pass at about the CC1101 RX bandwidth
+# finds candidate peaks and a fine pass around each one pins the carrier.
+# Sweeps are kept in a preallocated RssiWaterfall ring.
+import csv, math, time
+from array import array
+from statistics import median
+
+from . import protocol
+from .transport import DEFAULT_TIMEOUT, DeviceError
+
+CC1101_BANDS = ((300.0, 348.0), (387.0, 464.0), (779.0, 928.0))   # MHz the chip tunes
+NO_READING = -128
+DEFAULT_STEP_KHZ = 250      # just under the 270 kHz RX filter: no blind spots
+DEFAULT_REFINE_KHZ = 25
+MIN_SNR_DB = 10
+
+def plan_sweep(start_mhz, stop_mhz, step_khz=DEFAULT_STEP_KHZ):
+    """Frequencies (MHz) from start to stop every `step_khz`, skipping the CC1101's gaps."""
+    step = step_khz / 1000
+    n = int(math.floor((stop_mhz - start_mhz) / step + 1e-9)) + 1
+    freqs = (round(start_mhz + i * step, 4) for i in range(max(0, n)))
+    return [f for f in freqs if any(lo <= f <= hi for lo, hi in CC1101_BANDS)]
+
+def read_rssi(links, freqs, dwell_ms=0, timeout=DEFAULT_TIMEOUT):
+    """Retune + get_rssi at each of `freqs`, pipelined; returns array('b') of dBm.
+
+    `links` is a SerialLink or a list of them, which then share the sweep in
+    contiguous slices. Steps whose retune or reading failed hold NO_READING.
+    """
+    links = links if isinstance(links, (list, tuple)) else [links]
+    per = max(1, math.ceil(len(freqs) / len(links)))
+    steps = []
+    for i, f in enumerate(freqs):
+        link = links[i // per]
+        steps.append((link.send(protocol.set_frequency(f), timeout, quiet=True),
+                      link.send(protocol.get_rssi(dwell_ms), timeout, quiet=True)))
+    out = array("b", [NO_READING]) * len(freqs)
+    for i, (tune, read) in enumerate(steps):
+        try:
+            tune.result()
+            out[i] = max(NO_READING + 1, min(127, int(read.result()["value_dbm"])))
+        except (DeviceError, TimeoutError, KeyError, TypeError, ValueError):
+            pass
+    return out
+
+def find_peaks(levels, min_snr_db=MIN_SNR_DB):
+    """(indexes of local maxima at least `min_snr_db` above the median, median dBm)."""
+    valid = [v for v in levels if v != NO_READING]
+    if not valid:
+        return [], None
+    floor = median(valid)
+    n = len(levels)
+    peaks = [i for i, v in enumerate(levels)
+             if v != NO_READING and v >= floor + min_snr_db
+             and (i == 0 or v >= levels[i - 1]) and (i + 1 == n or v > levels[i + 1])]
+    return peaks, floor
+
+class RssiWaterfall:
+    """The last `rows` sweeps over fixed `freqs`, in one preallocated array('b') ring."""
+    def __init__(self, freqs, rows=256):
+        self.freqs = list(freqs)
+        self.rows = rows
+        self.data = array("b", [NO_READING]) * (rows * len(self.freqs))
+        self.times = array("d", [0.0]) * rows
+        self.head = 0           # next row to overwrite
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, levels, t=None):
+        n = len(self.freqs)
+        if len(levels) != n:
+            raise ValueError(f"sweep has {len(levels)} readings, expected {n}")
+        self.data[self.head * n:(self.head + 1) * n] = array("b", levels)
+        self.times[self.head] = time.time() if t is None else t
+        self.head = (self.head + 1) % self.rows
+        self.count = min(self.count + 1, self.rows)
+
+    def row(self, k):
+        """The k-th most recent sweep (0 = newest) as a memoryview."""
+        if not 0 <= k < self.count:
+            raise IndexError(k)
+        r, n = (self.head - 1 - k) % self.rows, len(self.freqs)
+        return memoryview(self.data)[r * n:(r + 1) * n]
+
+    def ordered_bytes(self):
+        """Stored sweeps oldest first, as raw int8 bytes (row-major)."""
+        n = len(self.freqs)
+        if self.count < self.rows:
+            return self.data[:self.count * n].tobytes()
+        cut = self.head * n
+        return self.data[cut:].tobytes() + self.data[:cut].tobytes()
+
+    def peak_hold(self):
+        """Per-frequency maximum over the stored sweeps."""
+        rows = [self.row(k) for k in range(self.count)]
+        return array("b", map(max, *rows)) if len(rows) > 1 else array("b", rows[0] if rows else ())
+
+    def to_csv(self, path):
+        """One line per sweep, oldest first: time, then dBm per frequency (blank = no reading)."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["time"] + [f"{x:.4f}" for x in self.freqs])
+            for k in range(self.count - 1, -1, -1):
+                t = self.times[(self.head - 1 - k) % self.rows]
+                w.writerow([f"{t:.3f}"] + ["" if v == NO_READING else v for v in self.row(k)])
+
+class BandScanner:
+    """Repeated coarse sweeps with a fine pass around each peak.
+
+    `config` (a protocol.set_config dict) is applied to every device before
+    each sweep so the steps themselves only retune.
+    """
+    def __init__(self, links, start_mhz=300.0, stop_mhz=928.0, step_khz=DEFAULT_STEP_KHZ,
+                 dwell_ms=0, refine_khz=DEFAULT_REFINE_KHZ, min_snr_db=MIN_SNR_DB,
+                 config=None, rows=256, timeout=DEFAULT_TIMEOUT):
+        self.links = list(links) if isinstance(links, (list, tuple)) else [links]
+        self.step_khz = step_khz
+        self.dwell_ms = dwell_ms
+        self.refine_khz = refine_khz
+        self.min_snr_db = min_snr_db
+        self.config = config
+        self.timeout = timeout
+        self.freqs = plan_sweep(start_mhz, stop_mhz, step_khz)
+        if not self.freqs:
+            raise ValueError(f"no tunable frequencies in {start_mhz}-{stop_mhz} MHz")
+        self.waterfall = RssiWaterfall(self.freqs, rows)
+
+    def scan(self):
+        """One sweep; stores it in `waterfall` and returns a result dict.
+
+        ``peaks`` holds {"freq_mhz", "rssi_dbm"} per transmitter found,
+        strongest first; ``floor_dbm`` is the sweep's median reading.
+        """
+        t0 = time.monotonic()
+        if self.config:
+            for fut in [link.send(self.config, self.timeout, quiet=True) for link in self.links]:
+                fut.result()
+        levels = read_rssi(self.links, self.freqs, self.dwell_ms, self.timeout)
+        self.waterfall.push(levels)
+        idx, floor = find_peaks(levels, self.min_snr_db)
+        peaks = [(self.freqs[i], levels[i]) for i in idx]
+        if idx and 0 < self.refine_khz < self.step_khz:
+            # One pipelined fine pass over every peak's neighbourhood.
+            half = self.step_khz / 1000
+            fine, spans = [], []
+            for f, _ in peaks:
+                fs = plan_sweep(f - half, f + half, self.refine_khz)
+                spans.append((len(fine), len(fine) + len(fs)))
+                fine += fs
+            fine_levels = read_rssi(self.links, fine, self.dwell_ms, self.timeout)
+            for k, (a, b) in enumerate(spans):
+                j = max(range(a, b), key=fine_levels.__getitem__, default=None)
+                if j is not None and fine_levels[j] != NO_READING:
+                    peaks[k] = (fine[j], fine_levels[j])
+        peaks.sort(key=lambda p: -p[1])
+        return {
+            "t": self.waterfall.times[(self.waterfall.head - 1) % self.waterfall.rows],
+            "elapsed_ms": round((time.monotonic() - t0) * 1000, 1),
+            "steps": len(self.freqs),
+            "floor_dbm": floor,
+            "peaks": [{"freq_mhz": f, "rssi_dbm": v} for f, v in peaks],
+        }
@@ -0,0 +1,73 @@
+# IshtarRF signal fingerprints
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Jitter-tolerant MinHash fingerprints of pulse trains. Pulses are replaced
+# by the rank of their symbol cluster (see analysis.cluster_durations), so two
+# captures of the same remote produce the same token string however the
+# widths drift. Rare clusters (noise before/after the burst) are ignored.
+# Overlapping runs of SHINGLE tokens form a set whose MinHash signature
+# estimates Jaccard similarity; LSH bands of the signature are stored by
+# SignalIndex so matches are found by lookup, not by scanning.
+import bisect, zlib
+from array import array
+from functools import partial
+
+from .analysis import FRAME_GAP_US, cluster_durations
+
+NUM_PERM = 64
+BANDS, ROWS = 16, 4            # match probability 50% at Jaccard ~0.5
+SHINGLE = 16
+MIN_SHARE = 0.02               # clusters below this share of pulses are noise
+GAP_TOKEN = 255
+
+def tokenize(pulses, gap_us=FRAME_GAP_US):
+    """Pulse train -> bytes of symbol ranks (GAP_TOKEN for gaps)."""
+    clusters = cluster_durations(pulses, gap_us=gap_us)
+    total = sum(n for _, n in clusters)
+    widths = [c for c, n in clusters if n >= MIN_SHARE * total]
+    if not widths:
+        return b""
+    mids = [(a + b) / 2 for a, b in zip(widths, widths[1:])]
+    mids.append(gap_us - 0.5)
+    codes = bytes(range(len(widths))) + bytes((GAP_TOKEN,))
+    return bytes(map(codes.__getitem__, map(partial(bisect.bisect_left, mids), pulses)))
+
+def fingerprint(pulses, gap_us=FRAME_GAP_US):
+    """MinHash signature (array('I') of NUM_PERM) of a pulse train, or None if too short.
+
+    One-permutation MinHash: each 32-bit shingle hash falls in bin h % NUM_PERM
+    and the bin keeps its smallest h // NUM_PERM. Walking the hashes in sorted
+    order fills every bin after a few hundred of them, so the cost is one C
+    sort. Empty bins borrow from the next filled one (rotation densification).
+    """
+    toks = tokenize(pulses, gap_us)
+    shingles = {zlib.crc32(toks[i:i + SHINGLE]) for i in range(len(toks) - SHINGLE + 1)}
+    if not shingles:
+        return None
+    sig = [None] * NUM_PERM
+    left = NUM_PERM
+    for h in sorted(shingles):
+        b = h % NUM_PERM
+        if sig[b] is None:
+            sig[b] = h // NUM_PERM
+            left -= 1
+            if not left:
+                break
+    if left:
+        filled = [i for i, v in enumerate(sig) if v is not None]
+        for i in range(NUM_PERM):
+            if sig[i] is None:
+                j = filled[bisect.bisect_left(filled, i) % len(filled)]
+                sig[i] = sig[j] + ((j - i) % NUM_PERM << 26)
+    return array("I", sig)
+
+def band_keys(sig):
+    """[(band, bucket)] LSH keys of a signature."""
+    raw = sig.tobytes()
+    step = len(raw) // BANDS
+    return [(i, zlib.crc32(raw[i * step:(i + 1) * step])) for i in range(BANDS)]
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures (0..1)."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
@@ -0,0 +1,175 @@
+# IshtarRF .sub (Flipper/Bruce RAW) codec
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import itertools, os, re
+from array import array
+from pathlib import Path
+
+from .pulses import PulseTrain
+
+def pulses_to_signed_list(pulses_us, start_negative=False):
+    signed = [d if d > 1 else 1 for d in map(int, pulses_us)]
+    lows = slice(0 if start_negative else 1, None, 2)
+    signed[lows] = [-d for d in signed[lows]]
+    return signed
+
+def flipper_preset_name(mod="OOK", rx_bw_khz=270.0):
+    if str(mod).upper() == "OOK":
+        return "FuriHalSubGhzPresetOok270Async"
+    return "FuriHalSubGhzPreset2FSKDev"
+
+def preset_mod(preset):
+    """The set_config modulation a Flipper preset name implies ("OOK", "2-FSK"), or None."""
+    name = str(preset or "").upper()
+    if "OOK" in name:
+        return "OOK"
+    if "2FSK" in name:
+        return "2-FSK"
+    return None
+
+RAW_WRAP = 64    # values per RAW_Data line
+
+def export_flipper_sub(path, freq_mhz, pulses_us, start_negative=False, preset=None, repeat=None):
+    """Write a RAW .sub, streaming one RAW_Data line at a time (constant extra memory).
+
+    The file is written next to `path` and renamed into place, so a failed
+    save never leaves a truncated .sub behind.
+    """
+    freq_hz = int(round(float(freq_mhz) * 1_000_000))
+    if not preset:
+        preset = flipper_preset_name()
+    header = ["Filetype: IshtarRF SubGhz RAW File", "Version: 1", f"Frequency: {freq_hz}",
+              f"Preset: {preset}", "Protocol: RAW"]
+    if repeat is not None:
+        header.append(f"Repeat: {int(repeat)}")
+
+    # RAW_WRAP is even, so every line starts on the same polarity.
+    first, second = ("-", "") if start_negative else ("", "-")
+    ones = itertools.repeat(1)
+    values = map(str, map(max, map(int, pulses_us), ones))
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(header) + "\n")
+            prefix = "RAW_Data: "
+            while strs := list(itertools.islice(values, RAW_WRAP)):
+                strs[0::2] = [first + v for v in strs[0::2]]
+                strs[1::2] = [second + v for v in strs[1::2]]
+                f.write(prefix + " ".join(strs) + "\n")
+                prefix = " "
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+SUB_HEADER_KEYS = ("Filetype", "Version", "Frequency", "Preset", "Protocol", "Repeat")
+
+def _raw_tokens_alternate(toks):
+    # A well-formed RAW line alternates sign, so every other token shares the
+    # sign of the first one. Checked on joined bytes to stay at C speed.
+    if len(toks) < 2:
+        return True
+    even, odd = toks[0::2], toks[1::2]
+    if toks[0][:1] == b"-":
+        return b"".join(even).count(b"-") == len(even) and b"".join(odd).count(b"-") == 0
+    return b"".join(even).count(b"-") == 0 and b"".join(odd).count(b"-") == len(odd)
+
+class _RawAccumulator:
+    """Collects RAW_Data tokens as absolute durations plus start polarity.
+
+    Adjacent durations with the same sign (which show up across RAW_Data
+    blocks) are merged so the stored train always alternates.
+    """
+    __slots__ = ("pulses", "start_negative", "last_negative")
+
+    def __init__(self):
+        self.pulses = array("i")
+        self.start_negative = False
+        self.last_negative = None
+
+    def feed(self, chunk):
+        toks = chunk.split()
+        if not toks:
+            return
+        try:
+            try:
+                if _raw_tokens_alternate(toks):
+                    vals = array("i", map(int, chunk.replace(b"-", b"").split()))
+                    self._extend_alternating(vals, toks[0][:1] == b"-")
+                    return
+                vals = list(map(int, toks))
+            except ValueError:
+                vals = [int(t) for t in re.findall(rb"-?\d+", chunk)]
+            for v in vals:
+                self._extend_alternating(array("i", (abs(v),)), v < 0)
+        except OverflowError:
+            # Durations (and same-sign merges of them) must fit the int32 buffer.
+            raise ValueError("RAW_Data value out of range") from None
+
+    def _extend_alternating(self, vals, first_negative):
+        if not vals:
+            return
+        out = self.pulses
+        if self.last_negative is None:
+            self.start_negative = first_negative
+        elif self.last_negative == first_negative:
+            out[-1] += vals[0]
+            vals = vals[1:]
+            first_negative = not first_negative
+        if vals:
+            out.extend(vals)
+            self.last_negative = first_negative if len(vals) % 2 else not first_negative
+
+def parse_flipper_sub(path: Path):
+    """Stream-parse a Flipper/Bruce RAW .sub file.
+
+    The file is read line by line and RAW_Data values are decoded straight into
+    an ``array('i')``; every ``RAW_Data:`` block (and any continuation line) is
+    concatenated, with adjacent same-sign durations merged so the result always
+    alternates. Returns a dict with ``frequency_hz``, ``preset``, ``protocol``,
+    ``repeat``, ``pulses_us`` (absolute durations) and ``start_negative``.
+    Raises OSError, or ValueError for a duration that does not fit in int32.
+    """
+    header = {}
+    raw = _RawAccumulator()
+    in_raw = False
+    with open(path, "rb") as f:
+        for line in f:
+            key, sep, rest = line.partition(b":")
+            key = key.strip()
+            if sep and key == b"RAW_Data":
+                in_raw = True
+                raw.feed(rest)
+            elif sep and key and key[:1] not in b"-0123456789":
+                in_raw = False
+                name = key.decode("utf-8", errors="ignore")
+                if name in SUB_HEADER_KEYS:
+                    header[name] = rest.strip().decode("utf-8", errors="ignore")
+            elif in_raw:
+                raw.feed(line)
+
+    def header_int(name):
+        try:
+            return int(header[name])
+        except (KeyError, ValueError):
+            return None
+
+    return {
+        "frequency_hz": header_int("Frequency"),
+        "preset": header.get("Preset"),
+        "protocol": header.get("Protocol"),
+        "repeat": header_int("Repeat"),
+        "pulses_us": raw.pulses,
+        "start_negative": raw.start_negative,
+    }
+
+def read_pulse_train(path):
+    """parse_flipper_sub() as a PulseTrain."""
+    return PulseTrain.from_sub(parse_flipper_sub(path))
+
+def write_pulse_train(path, train, repeat=None):
+    """export_flipper_sub() of a PulseTrain, using its frequency (default 433.92 MHz) and preset."""
+    export_flipper_sub(path, train.frequency_mhz or 433.92, train, start_negative=train.start_negative,
+                       preset=train.preset, repeat=repeat)
@@ -0,0 +1,276 @@
+# IshtarRF pulse-train transforms
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Cleanup of RAW captures before replay or save: absorb glitches, trim noise
+# off the ends, snap jittery durations to the symbol grid, merge same-level
+# runs and resample onto a timing grid. Every step is a generator over signed
+# durations (+high / -low, the RAW_Data convention), so the level travels
+# with each pulse and dropping or joining pulses never loses polarity. A
+# Pipeline chains steps lazily: apply() pulls the source through all of
+# them in one pass into a single array('i'), with no intermediate lists.
+# Steps stay cheap per pulse: polarity comes from a C-level map, quantize
+# looks each distinct duration up once, and the final merge is skipped when
+# the last step already leaves alternating levels.
+import operator
+from array import array
+from bisect import bisect_left
+from itertools import cycle
+from pathlib import Path
+
+from .analysis import FRAME_GAP_US, MIN_FRAME_PULSES, cluster_durations
+from .pulses import PulseTrain
+from .subfile import parse_flipper_sub, write_pulse_train
+
+GLITCH_US = 60          # well under the shortest symbol the CC1101 resolves in OOK
+QUANTIZE_TOLERANCE = 0.25
+DEFAULT_STEPS = "glitch,trim,quantize"
+
+def signed(train):
+    """A PulseTrain's durations as signed ints (+high, -low)."""
+    s = -1 if train.start_negative else 1
+    return map(operator.mul, train.durations, cycle((s, -s)))
+
+# ---- steps: each takes and returns an iterable of signed durations
+
+def merge(pulses):
+    """Join consecutive same-level durations and drop zero-length ones."""
+    acc = 0
+    for v in pulses:
+        if not acc or (v > 0) == (acc > 0):
+            acc += v
+        elif v:
+            yield acc
+            acc = v
+    if acc:
+        yield acc
+
+def _absorb(pulses, min_us):
+    level = None        # level of the last pulse kept
+    for v in pulses:
+        if -min_us < v < min_us:
+            if level is None:
+                continue            # leading noise: nothing to absorb it into
+            v = v if (v > 0) == level else -v
+        else:
+            level = v > 0
+        yield v
+
+def drop_glitches(pulses, min_us=GLITCH_US):
+    """Absorb pulses shorter than `min_us` into the level before them.
+
+    A dropout inside a long pulse (high, short low, high) becomes one high of
+    the combined length, so the timing around it is kept.
+    """
+    return merge(_absorb(pulses, min_us))
+
+def trim(pulses, gap_us=FRAME_GAP_US, min_pulses=MIN_FRAME_PULSES):
+    """Drop what comes before the first and after the last frame of at least `min_pulses`.
+
+    Frames are split at pulses of at least `gap_us`, as in
+    analysis.split_frames. Gaps and short bursts between kept frames stay;
+    only what follows the last complete frame so far is held back.
+    """
+    held, run, started = [], [], False
+    for v in pulses:
+        if -gap_us < v < gap_us:
+            run.append(v)
+            continue
+        if len(run) >= min_pulses:
+            if started:
+                yield from held
+            yield from run
+            started, held = True, [v]
+        elif started:
+            held += run
+            held.append(v)
+        run = []
+    if len(run) >= min_pulses:
+        if started:
+            yield from held
+        yield from run
+
+class _Snap(dict):
+    # duration -> nearest symbol width; filled on first sight of each duration
+    def __init__(self, widths, tolerance):
+        super().__init__()
+        self.widths = sorted(widths)
+        self.mids = [(a + b) / 2 for a, b in zip(self.widths, self.widths[1:])]
+        self.tolerance = tolerance
+
+    def __missing__(self, v):
+        d = abs(v)
+        w = self.widths[bisect_left(self.mids, d)] if self.widths else d
+        q = self[v] = (w if v > 0 else -w) if abs(d - w) <= self.tolerance * w else v
+        return q
+
+def quantize(pulses, widths, tolerance=QUANTIZE_TOLERANCE):
+    """Snap each duration to the nearest of `widths` (µs) when within `tolerance` of it.
+
+    Durations that fit no width (gaps, stray pulses) are left as they are.
+    """
+    return map(_Snap(widths, tolerance).__getitem__, pulses)
+
+def _resample(pulses, tick_us, factor):
+    t_in = 0.0
+    t_out = 0
+    for v in pulses:
+        t_in += abs(v) * factor
+        edge = round(t_in / tick_us) * tick_us
+        d = edge - t_out
+        if d:
+            t_out = edge
+            yield d if v > 0 else -d
+
+def resample(pulses, tick_us=1, factor=1.0):
+    """Scale time by `factor` and put every edge on a `tick_us` grid.
+
+    Edges are rounded on the running total, so rounding errors do not add
+    up over a long capture. Pulses that round to nothing are merged away.
+    """
+    if tick_us <= 0 or factor <= 0:
+        raise ValueError("tick_us and factor must be positive")
+    return merge(_resample(pulses, tick_us, factor))
+
+# ---- pipeline
+
+# name -> (parameter set by "name=value" in a spec, its type)
+STEPS = {
+    "glitch": ("min_us", int),
+    "trim": ("gap_us", int),
+    "quantize": ("tolerance", float),
+    "merge": (None, None),
+    "resample": ("tick_us", int),
+}
+
+MERGING = {"glitch", "merge", "resample"}     # steps whose output already alternates
+
+class Pipeline:
+    """An ordered chain of transforms; nothing runs until apply().
+
+    Built by chaining (``Pipeline().glitch(80).trim().quantize()``) or
+    from a spec string (``Pipeline.parse("glitch=80,trim,quantize")``).
+    Chaining returns a new Pipeline, so one can be shared and extended.
+    """
+    def __init__(self, steps=()):
+        self.steps = tuple(steps)     # ((name, {kwargs}), ...)
+
+    def then(self, name, **kw):
+        if name not in STEPS:
+            raise ValueError(f"unknown transform {name!r} (have {', '.join(STEPS)})")
+        return Pipeline(self.steps + ((name, kw),))
+
+    def glitch(self, min_us=GLITCH_US):
+        return self.then("glitch", min_us=min_us)
+
+    def trim(self, gap_us=FRAME_GAP_US, min_pulses=MIN_FRAME_PULSES):
+        return self.then("trim", gap_us=gap_us, min_pulses=min_pulses)
+
+    def quantize(self, widths=None, tolerance=QUANTIZE_TOLERANCE):
+        """`widths` default to the symbol clusters of the train being transformed."""
+        return self.then("quantize", widths=widths, tolerance=tolerance)
+
+    def merge(self):
+        return self.then("merge")
+
+    def resample(self, tick_us=1, factor=1.0):
+        return self.then("resample", tick_us=tick_us, factor=factor)
+
+    @classmethod
+    def parse(cls, spec):
+        """Steps from "name[=value],...", e.g. "glitch=80,trim,quantize=0.2,resample=10"; raises ValueError."""
+        p = cls()
+        for item in filter(None, (s.strip() for s in spec.replace(";", ",").split(","))):
+            name, _, value = (s.strip() for s in item.partition("="))
+            if name not in STEPS:
+                raise ValueError(f"unknown transform {name!r} (have {', '.join(STEPS)})")
+            param, kind = STEPS[name]
+            if value and not param:
+                raise ValueError(f"{name} takes no value")
+            try:
+                p = getattr(p, name)(**({param: kind(value)} if value else {}))
+            except (TypeError, ValueError):
+                raise ValueError(f"bad value for {name}: {value!r}") from None
+        return p
+
+    def __str__(self):
+        out = []
+        for name, kw in self.steps:
+            param = STEPS[name][0]
+            value = kw.get(param) if param else None
+            out.append(f"{name}={value}" if value is not None else name)
+        return ",".join(out)
+
+    def __repr__(self):
+        return f"<Pipeline {self}>"
+
+    def __bool__(self):
+        return bool(self.steps)
+
+    def stream(self, train):
+        """The transformed signed durations of `train`, lazily."""
+        it = signed(train)
+        merged = False
+        for name, kw in self.steps:
+            if name == "glitch":
+                it = drop_glitches(it, **kw)
+            elif name == "trim":
+                it = trim(it, **kw)
+            elif name == "quantize":
+                widths = kw["widths"]
+                if widths is None:
+                    widths = [w for w, _ in cluster_durations(train.durations, kw["tolerance"])]
+                it = quantize(it, widths, kw["tolerance"])
+            elif name == "merge":
+                it = merge(it)
+            elif name == "resample":
+                it = resample(it, **kw)
+            merged = name in MERGING
+        # Always end on alternating levels, whatever the steps did.
+        return it if merged else merge(it)
+
+    def apply(self, train):
+        """A new PulseTrain with the same metadata; empty if nothing survived."""
+        it = self.stream(train)
+        first = next(it, None)
+        if first is None:
+            return PulseTrain((), train.start_negative, train.frequency_hz, train.preset, train.protocol)
+        out = array("i", (abs(first),))
+        out.extend(map(abs, it))
+        return PulseTrain(out, first < 0, train.frequency_hz, train.preset, train.protocol)
+
+# ---- batch
+
+def clean_file(src, dst, spec):
+    """Apply the pipeline `spec` to the .sub `src` and write it to `dst`; returns a result dict."""
+    rec = {"file": str(src), "out": str(dst)}
+    try:
+        train = PulseTrain.from_sub(parse_flipper_sub(src))
+        if not train:
+            return {**rec, "error": "no RAW pulses"}
+        out = Pipeline.parse(spec).apply(train)
+        if not out:
+            return {**rec, "error": "no pulses left after cleaning"}
+        write_pulse_train(dst, out)
+    except (OSError, ValueError, OverflowError) as e:
+        return {**rec, "error": str(e)}
+    return {**rec, "pulses_in": len(train), "pulses_out": len(out),
+            "ms_in": round(train.duration_us / 1000, 1), "ms_out": round(out.duration_us / 1000, 1)}
+
+def clean_files(paths, spec, out_dir=None, workers=None):
+    """Clean many .sub files in a process pool; yields results in input order.
+
+    Results go to `out_dir` under the same names, or replace the files when
+    it is None.
+    """
+    Pipeline.parse(spec)        # fail on a bad spec before starting any work
+    paths = [Path(p) for p in paths]
+    dsts = [Path(out_dir) / p.name if out_dir else p for p in paths]
+    if out_dir:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+    if workers == 1 or len(paths) < 2:
+        yield from map(clean_file, paths, dsts, [spec] * len(paths))
+        return
+    from concurrent.futures import ProcessPoolExecutor   # pulls in multiprocessing: import on first use
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(clean_file, paths, dsts, [spec] * len(paths), chunksize=16)
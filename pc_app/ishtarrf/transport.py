@@ -0,0 +1,424 @@
+# IshtarRF serial transport
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import itertools, json, threading, time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from .codec import HOST_CAPS, PULSES_VLQ, decode_pulses_vlq, encode_pulses_vlq
+from .framing import LineFramer
+from .metrics import Metrics
+from . import protocol
+from .protocol import BAUD_CONFIRM_S, busy_seconds
+
+DEFAULT_BAUD = 115200     # firmware SERIAL_BAUD: what a freshly booted device talks
+FAST_BAUD = 921600        # what set_baud asks for unless told otherwise
+BAUD_SETTLE_S = 0.02      # after switching, before the confirming ping
+BAUD_VERIFY_S = 0.5       # wait for that ping's pong
+DEFAULT_TIMEOUT = 3.0     # seconds for a reply, counted from when the line is on the wire
+TX_WINDOW = 4             # commands in flight
+TX_WINDOW_BYTES = 2048    # bytes in flight; must fit the firmware SERIAL_RX_BUFFER
+REPLY_EVENTS = {"ping": "pong", "get_rssi": "rssi"}   # everything else answers ok/error
+
+class DeviceError(RuntimeError):
+    """The device answered a command with an error event."""
+
+def list_serial_ports():
+    import serial.tools.list_ports
+    ports = []
+    for p in serial.tools.list_ports.comports():
+        label = f"{p.device} — {p.description}"
+        ports.append((label, p.device))
+    return ports
+
+class _Pending:
+    __slots__ = ("future", "cmd", "size", "deadline", "quiet", "sent")
+
+    def __init__(self, future, cmd, size, deadline, quiet=False):
+        self.future, self.cmd, self.size, self.deadline = future, cmd, size, deadline
+        self.quiet = quiet
+        self.sent = time.monotonic()
+
+class SerialLink:
+    """Qt-free transport for the IshtarRF JSON line protocol.
+
+    A background thread frames and decodes device lines and hands each event
+    dict to `on_event` (called on that thread). Transport problems are
+    reported the same way, as {"event": "error", "msg": ...} dicts.
+
+    Commands go through a writer thread: send() queues the command and
+    returns a Future at once. Each line carries an "id" that the firmware
+    echoes in its reply; the Future resolves with that reply dict, fails
+    with DeviceError on an error event, or TimeoutError if nothing comes
+    back in time. At most `window` commands / `window_bytes` bytes are in
+    flight, so pipelined commands never overrun the device's UART buffer.
+    Replies from firmware that does not echo ids are matched in order.
+
+    set_baud() raises the line rate once the device has answered a ping at
+    the default rate; see its docstring.
+
+    `metrics` counts bytes and lines each way and times JSON decoding, the
+    `on_event` callback, port writes and command round trips (which include
+    device busy time such as tx_raw airtime).
+    """
+    def __init__(self, on_event=None, window=TX_WINDOW, window_bytes=TX_WINDOW_BYTES, metrics=None):
+        self.on_event = on_event or (lambda obj: None)
+        self.window = window
+        self.window_bytes = window_bytes
+        self.metrics = metrics or Metrics()
+        self.metrics.gauge("tx_queue", lambda: len(self._txq))
+        self.metrics.gauge("in_flight", lambda: len(self._pending))
+        self.metrics.gauge("baud", lambda: getattr(self.ser, "baudrate", None))
+        self.ser = None
+        self.rx_thread = None
+        self.tx_thread = None
+        self._stop = threading.Event()
+        self.caps = frozenset()   # capabilities the device confirmed on pong
+        self._cv = threading.Condition()
+        self._txq = deque()                 # (obj, future, timeout, quiet) waiting for the writer
+        self._pending = OrderedDict()       # id -> _Pending, in send order
+        self._inflight_bytes = 0
+        self._ids = itertools.count(1)
+        self._device_ids = False            # the firmware echoes "id"
+        self._switching = False             # set_baud in progress: expect line noise
+
+    @property
+    def is_open(self):
+        return self.ser is not None
+
+    @property
+    def baud(self):
+        return getattr(self.ser, "baudrate", None)
+
+    def open(self, port, baud=DEFAULT_BAUD):
+        """Open `port`; raises serial.SerialException on failure."""
+        import serial
+        self.close()
+        self.ser = serial.Serial(port, baudrate=baud, timeout=0.1)
+        self.caps = frozenset()
+        self._device_ids = False
+        self._stop.clear()
+        self.rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
+        self.rx_thread.start()
+        self.tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+        self.tx_thread.start()
+
+    def close(self):
+        self._stop.set()
+        with self._cv:
+            self._cv.notify_all()
+        for t in (self.rx_thread, self.tx_thread):
+            if t and t.is_alive() and t is not threading.current_thread():
+                t.join(timeout=0.5)
+        if self.ser:
+            try: self.ser.close()
+            except Exception: pass
+        self.ser = None
+        with self._cv:
+            dropped = [q[1] for q in self._txq] + [p.future for p in self._pending.values()]
+            self._txq.clear()
+            self._pending.clear()
+            self._inflight_bytes = 0
+        for fut in dropped:
+            # Queued futures are still PENDING (and may have been cancelled).
+            if fut.running() or fut.set_running_or_notify_cancel():
+                fut.set_exception(ConnectionError("Link closed"))
+
+    def _rx_loop(self):
+        framer = LineFramer()
+        dropped = 0
+        emit = self.on_event
+        m = self.metrics
+        clock = time.perf_counter
+        while not self._stop.is_set() and self.ser:
+            try:
+                # Block for the first byte (bounded by the port timeout), then
+                # drain whatever the driver already has queued in one read.
+                got = framer.read_from(self.ser, min(max(self.ser.in_waiting, 1), 65536))
+                if not got:
+                    continue
+                m.inc("rx_bytes", got)
+                for frame in framer.frames():
+                    line = str(frame, "utf-8", "ignore").strip()
+                    if not line: continue
+                    m.inc("rx_lines")
+                    t0 = clock()
+                    try:
+                        obj = json.loads(line)
+                    except json.JSONDecodeError:
+                        obj = self._salvage(line)
+                    if not isinstance(obj, dict):
+                        m.inc("rx_errors")
+                        if not self._switching:
+                            emit({"event":"error","msg":"Bad JSON line from device","raw":line})
+                        continue
+                    try:
+                        self._decode_event(obj)
+                    except ValueError as e:
+                        m.inc("rx_errors")
+                        emit({"event":"error","msg":f"Corrupt {obj.get('event')} payload: {e}"})
+                        continue
+                    t1 = clock()
+                    m.observe("decode_seconds", t1 - t0)
+                    if not self._is_quiet(obj):
+                        emit(obj)
+                        m.observe("handler_seconds", clock() - t1)
+                    self._resolve(obj)
+                if framer.dropped != dropped:
+                    m.inc("rx_errors", framer.dropped - dropped)
+                    dropped = framer.dropped
+                    emit({"event":"error","msg":"Oversized line from device dropped"})
+            except Exception as e:
+                emit({"event":"error","msg":f"Serial read error: {e}"})
+                break
+
+    @staticmethod
+    def _salvage(line):
+        # Line noise (e.g. while the baud rate changes) glued to the front of
+        # a good event: the firmware starts every line with {"event".
+        k = line.find('{"event"', 1)
+        if k < 0:
+            return None
+        try:
+            return json.loads(line[k:])
+        except json.JSONDecodeError:
+            return None
+
+    def _decode_event(self, obj):
+        if obj.get("event") == "pong":
+            self.caps = frozenset(obj.get("caps") or ()) & frozenset(HOST_CAPS)
+        if PULSES_VLQ in obj:
+            obj["pulses_us"] = decode_pulses_vlq(obj)
+            del obj[PULSES_VLQ], obj["crc"]
+        elif isinstance(obj.get("pulses_us"), list):
+            # Same compact int32 form as the VLQ path; see PulseTrain.
+            try:
+                obj["pulses_us"] = array("i", obj["pulses_us"])
+            except (TypeError, OverflowError) as e:
+                raise ValueError(e) from None
+
+    def _encode(self, obj, rid):
+        obj = dict(obj, id=rid)
+        if PULSES_VLQ in self.caps and "pulses_us" in obj:
+            obj.update(encode_pulses_vlq(obj.pop("pulses_us")))
+        # default=list lets array-backed pulse trains go out as JSON arrays;
+        # compact separators matter when a sweep sends thousands of lines.
+        return (json.dumps(obj, default=list, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def send(self, obj, timeout=DEFAULT_TIMEOUT, quiet=False):
+        """Queue one command; returns a Future for its reply. Raises ConnectionError when closed.
+
+        The reply timeout starts once the line is on the wire and is extended
+        by the airtime of a tx_raw. A `quiet` command's reply only resolves
+        the Future and is not passed to `on_event` (needs id-echoing firmware).
+        """
+        if not self.ser:
+            raise ConnectionError("Not connected")
+        timeout += busy_seconds(obj)
+        fut = Future()
+        with self._cv:
+            self._txq.append((obj, fut, timeout, quiet))
+            self._cv.notify_all()
+        return fut
+
+    def set_baud(self, baud=FAST_BAUD, timeout=DEFAULT_TIMEOUT):
+        """Negotiate a new line rate with the device; returns a Future.
+
+        Queued like any command, but handled alone: the writer waits until
+        nothing is in flight, sends set_baud, switches the port once the ok
+        arrives and confirms with a ping at the new rate; later commands wait
+        meanwhile. The Future resolves with the ok reply, or fails with
+        DeviceError (rate or command not supported: nothing changed) or
+        ConnectionError (no answer at the new rate: the link is back at the
+        old one, as is the device, which reverts on its own when no ping
+        confirms the switch).
+        """
+        return self.send(protocol.set_baud(baud), timeout, quiet=True)
+
+    # ---- writer thread
+    def _window_open(self, size):
+        return not self._pending or (len(self._pending) < self.window and
+                                     self._inflight_bytes + size <= self.window_bytes)
+
+    def _wait(self, ready):
+        # Called with the lock held; waits for `ready()` while expiring
+        # overdue commands. Returns False once the link is stopping.
+        while not self._stop.is_set():
+            expired = self._expire()
+            if expired:
+                self._cv.release()
+                try:
+                    self._fail_expired(expired)
+                finally:
+                    self._cv.acquire()
+                continue
+            if ready():
+                return True
+            deadline = min((p.deadline for p in self._pending.values()), default=None)
+            self._cv.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return False
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [(rid, p) for rid, p in self._pending.items() if p.deadline <= now]
+        for rid, p in expired:
+            del self._pending[rid]
+            self._inflight_bytes -= p.size
+        return expired
+
+    def _fail_expired(self, expired):
+        for rid, p in expired:
+            self.metrics.inc("timeouts")
+            p.future.set_exception(TimeoutError(f"no reply to {p.cmd} (id {rid})"))
+            if not self._switching:     # set_baud reports its own outcome
+                self.on_event({"event":"error","msg":f"No reply to {p.cmd}"})
+
+    def _tx_loop(self):
+        cv = self._cv
+        while not self._stop.is_set():
+            with cv:
+                if not self._wait(lambda: bool(self._txq)):
+                    return
+                obj, fut, timeout, quiet = self._txq.popleft()
+            if not fut.set_running_or_notify_cancel():
+                continue
+            if obj.get("cmd") == "set_baud":
+                self._switch_baud(obj, fut, timeout)
+            else:
+                self._transmit(obj, fut, timeout, quiet)
+
+    def _transmit(self, obj, fut, timeout, quiet):
+        """Write one command line; returns its id, or None if `fut` already failed."""
+        cv = self._cv
+        rid = next(self._ids) & 0x7FFFFFFF
+        try:
+            line = self._encode(obj, rid)
+        except (TypeError, ValueError) as e:
+            fut.set_exception(e)
+            return None
+        with cv:
+            if not self._wait(lambda: self._window_open(len(line))):
+                fut.set_exception(ConnectionError("Link closed"))
+                return None
+            # 8N1: ten bit times per byte before the device has the whole line.
+            wire = len(line) * 10 / (getattr(self.ser, "baudrate", 0) or DEFAULT_BAUD)
+            self._pending[rid] = _Pending(fut, obj.get("cmd"), len(line),
+                                          time.monotonic() + wire + timeout, quiet)
+            self._inflight_bytes += len(line)
+        try:
+            t0 = time.perf_counter()
+            self.ser.write(line)
+            self.ser.flush()
+            self.metrics.observe("write_seconds", time.perf_counter() - t0)
+            self.metrics.inc("tx_bytes", len(line))
+            self.metrics.inc("tx_lines")
+        except Exception as e:
+            with cv:
+                if self._pending.pop(rid, None):
+                    self._inflight_bytes -= len(line)
+            if not fut.done():
+                fut.set_exception(e)
+            if not self._stop.is_set():
+                self.on_event({"event":"error","msg":f"Serial write error: {e}"})
+            return None
+        return rid
+
+    # ---- link speed (writer thread)
+    def _exchange(self, obj, timeout):
+        """Send `obj` and block for its reply; raises like Future.result()."""
+        fut = Future()
+        fut.set_running_or_notify_cancel()
+        rid = self._transmit(obj, fut, timeout, True)
+        if rid is not None:
+            with self._cv:
+                if not self._wait(lambda: rid not in self._pending):
+                    raise ConnectionError("Link closed")
+        return fut.result(timeout)
+
+    def _retune(self, baud):
+        self.ser.baudrate = baud
+        time.sleep(BAUD_SETTLE_S)
+        self.ser.reset_input_buffer()
+        # End whatever the switch left in the device's line buffer.
+        self.ser.write(b"\n")
+
+    def _switch_baud(self, obj, fut, timeout):
+        with self._cv:
+            if not self._wait(lambda: not self._pending):
+                fut.set_exception(ConnectionError("Link closed"))
+                return
+        old, baud = self.ser.baudrate, int(obj["baud"])
+        ping = protocol.ping(sorted(self.caps))     # keeps the negotiated caps as they are
+        self._switching = True
+        try:
+            try:
+                reply = self._exchange(obj, timeout)
+            except TimeoutError as e:
+                # The ok may have been lost after the device switched: let it revert.
+                self._stop.wait(BAUD_CONFIRM_S)
+                fut.set_exception(e)
+                return
+            except Exception as e:
+                fut.set_exception(e)
+                return
+            switched = time.monotonic()
+            try:
+                self._retune(baud)
+                self._exchange(ping, BAUD_VERIFY_S)
+            except (TimeoutError, DeviceError, OSError, ValueError) as e:
+                self._stop.wait(max(0.0, switched + BAUD_CONFIRM_S + 0.1 - time.monotonic()))
+                try:
+                    self._retune(old)
+                    self._exchange(ping, timeout)
+                except Exception:
+                    fut.set_exception(ConnectionError(f"no reply at {baud} baud, nor back at {old}"))
+                    return
+                fut.set_exception(ConnectionError(f"no reply at {baud} baud ({e or type(e).__name__}); "
+                                                  f"back at {old}"))
+                return
+            fut.set_result(reply)
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+        finally:
+            self._switching = False
+
+    # ---- reply matching (reader thread)
+    def _is_quiet(self, obj):
+        rid = obj.get("id")
+        if rid is None:
+            # A line garbled by a baud switch reads as an unknown command.
+            return self._switching and obj.get("event") == "error"
+        with self._cv:
+            p = self._pending.get(rid)
+        return p is not None and p.quiet
+
+    def _resolve(self, obj):
+        et = obj.get("event")
+        if et not in ("ok", "error", "pong", "rssi"):
+            return
+        rid = obj.get("id")
+        with self._cv:
+            if rid is not None:
+                self._device_ids = True
+                p = self._pending.pop(rid, None)
+            elif self._device_ids or not self._pending:
+                p = None      # unsolicited (boot pong, init error)
+            else:
+                rid, p = next(iter(self._pending.items()))
+                want = REPLY_EVENTS.get(p.cmd, "ok")
+                if et == want and (et != "ok" or obj.get("of") == p.cmd) or et == "error":
+                    del self._pending[rid]
+                else:
+                    p = None
+            if p is None:
+                return
+            self._inflight_bytes -= p.size
+            self._cv.notify_all()
+        self.metrics.observe("reply_seconds", time.monotonic() - p.sent)
+        if et == "error":
+            p.future.set_exception(DeviceError(obj.get("msg")))
+        else:
+            p.future.set_result(obj)
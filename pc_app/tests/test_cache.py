@@ -0,0 +1,53 @@
+# IshtarRF pulse cache tests
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import tempfile, unittest
+from pathlib import Path
+
+from ishtarrf.cache import read_pulse_cache, write_pulse_cache
+from ishtarrf.library import SignalIndex
+from ishtarrf.subfile import export_flipper_sub, parse_flipper_sub
+
+class PulseCacheTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)   # mapped entries (Windows)
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_round_trip(self):
+        sub = {"frequency_hz": 868_350_000, "preset": "Pré", "protocol": "RAW", "repeat": 2,
+               "pulses_us": [1, 2, 300, 2_000_000_000], "start_negative": True}
+        write_pulse_cache(self.dir / "e.pulses", sub)
+        got = read_pulse_cache(self.dir / "e.pulses")
+        self.assertEqual(list(got.pop("pulses_us")), sub.pop("pulses_us"))
+        self.assertEqual(got, sub)
+
+    def test_empty_header_fields(self):
+        write_pulse_cache(self.dir / "e.pulses", {"pulses_us": [], "start_negative": False})
+        got = read_pulse_cache(self.dir / "e.pulses")
+        self.assertEqual(len(got["pulses_us"]), 0)
+        self.assertIsNone(got["frequency_hz"])
+        self.assertIsNone(got["preset"])
+        self.assertIsNone(got["repeat"])
+
+    def test_bad_entries_read_as_none(self):
+        write_pulse_cache(self.dir / "e.pulses", {"pulses_us": [1, 2, 3]})
+        data = (self.dir / "e.pulses").read_bytes()
+        (self.dir / "short.pulses").write_bytes(data[:-1])
+        (self.dir / "magic.pulses").write_bytes(b"XXXX" + data[4:])
+        for name in ("short", "magic", "missing"):
+            self.assertIsNone(read_pulse_cache(self.dir / f"{name}.pulses"), name)
+
+    def test_index_load_matches_parse(self):
+        pulses = [350 + i % 700 for i in range(1000)]
+        export_flipper_sub(self.dir / "a.sub", 433.92, pulses, start_negative=True, repeat=4)
+        index = SignalIndex(self.dir)
+        self.addCleanup(index.close)
+        index.refresh()
+        loaded, parsed = index.load("a.sub"), parse_flipper_sub(self.dir / "a.sub")
+        self.assertEqual(list(loaded.pop("pulses_us")), list(parsed.pop("pulses_us")))
+        self.assertEqual(loaded, parsed)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+# IshtarRF pulse payload codec tests
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import base64, binascii, unittest
+
+from ishtarrf.codec import PULSES_VLQ, decode_pulses_vlq, encode_pulses_vlq
+
+def _payload(data, n):
+    return {PULSES_VLQ: base64.b64encode(data).decode("ascii"), "n": n, "crc": binascii.crc_hqx(data, 0xFFFF)}
+
+class PulsesVlqTests(unittest.TestCase):
+    def test_round_trip(self):
+        pulses = [0, 1, 127, 128, 300, 16383, 16384, 1_000_000, 2**31 - 1]
+        obj = encode_pulses_vlq(pulses)
+        self.assertEqual(obj["n"], len(pulses))
+        self.assertEqual(list(decode_pulses_vlq(obj)), pulses)
+
+    def test_empty(self):
+        obj = encode_pulses_vlq([])
+        self.assertEqual(obj, {PULSES_VLQ: "", "n": 0, "crc": 0xFFFF})
+        self.assertEqual(list(decode_pulses_vlq(obj)), [])
+
+    def test_wire_format(self):
+        # LEB128, low group first; CRC-16/CCITT-FALSE of "123456789" is 0x29B1.
+        self.assertEqual(base64.b64decode(encode_pulses_vlq([300])[PULSES_VLQ]), b"\xac\x02")
+        self.assertEqual(binascii.crc_hqx(b"123456789", 0xFFFF), 0x29B1)
+
+    def test_negative_encodes_as_zero(self):
+        self.assertEqual(list(decode_pulses_vlq(encode_pulses_vlq([-5, 7]))), [0, 7])
+
+    def test_corruption_is_value_error(self):
+        obj = encode_pulses_vlq([350, 700, 1050])
+        bad_crc = {**obj, "crc": obj["crc"] ^ 1}
+        bad_count = {**obj, "n": 4}
+        bad_base64 = {**obj, PULSES_VLQ: "!!"}
+        for bad in (bad_crc, bad_count, bad_base64, _payload(b"\xac", 1), _payload(b"\xff" * 6 + b"\x01", 1)):
+            with self.assertRaises(ValueError, msg=bad):
+                decode_pulses_vlq(bad)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+# IshtarRF line framing tests
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import io, unittest
+
+from ishtarrf.framing import LineFramer
+
+def _lines(framer):
+    return [bytes(f) for f in framer.frames()]
+
+class LineFramerTests(unittest.TestCase):
+    def test_lines_split_across_feeds(self):
+        f = LineFramer(size=8)
+        self.assertEqual(_lines(f), [])
+        f.feed(b'{"a":1}\n{"b"')
+        self.assertEqual(_lines(f), [b'{"a":1}'])
+        f.feed(b':2}')
+        self.assertEqual(_lines(f), [])
+        f.feed(b'\n\n{"c":3}\n')
+        self.assertEqual(_lines(f), [b'{"b":2}', b"", b'{"c":3}'])
+        self.assertEqual((f.start, f.end), (0, 0))
+
+    def test_byte_at_a_time(self):
+        data = b"one\ntwo\r\nthree\n"
+        f, out = LineFramer(size=4), []
+        for i in range(len(data)):
+            f.feed(data[i:i + 1])
+            out += _lines(f)
+        self.assertEqual(out, [b"one", b"two\r", b"three"])
+
+    def test_buffer_grows_for_a_long_line(self):
+        f = LineFramer(size=16)
+        line = b"x" * 10_000
+        for i in range(0, len(line), 7):
+            f.feed(line[i:i + 7])
+            self.assertEqual(_lines(f), [])
+        f.feed(b"\nnext")
+        self.assertEqual(_lines(f), [line])
+        f.feed(b"\n")
+        self.assertEqual(_lines(f), [b"next"])
+
+    def test_oversized_line_is_dropped(self):
+        f = LineFramer(size=16, max_line=32)
+        f.feed(b"y" * 40)
+        self.assertEqual(_lines(f), [])
+        self.assertEqual(f.dropped, 1)
+        f.feed(b"tail of the long line\nok\n")
+        # The rest of the dropped line reads as a line of its own.
+        self.assertEqual(_lines(f), [b"tail of the long line", b"ok"])
+        self.assertEqual(f.dropped, 1)
+
+    def test_read_from(self):
+        ser = io.BytesIO(b"ab\ncd\nef")
+        f = LineFramer(size=4)
+        out = []
+        while f.read_from(ser, 3):
+            out += _lines(f)
+        self.assertEqual(out, [b"ab", b"cd"])
+        f.feed(b"\n")
+        self.assertEqual(_lines(f), [b"ef"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+# IshtarRF signal library index tests
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import os, tempfile, unittest
+from pathlib import Path
+
+from ishtarrf.library import SignalIndex
+from ishtarrf.subfile import export_flipper_sub
+
+def _pulses(n, seed):
+    return [350 * (1 + (i * seed) % 4) for i in range(n)]
+
+class SignalIndexTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.index = SignalIndex(self.dir)
+        self.addCleanup(self.index.close)
+
+    def names(self):
+        return [row[0] for row in self.index.query()]
+
+    def test_refresh_is_incremental(self):
+        export_flipper_sub(self.dir / "a.sub", 433.92, _pulses(200, 1))
+        export_flipper_sub(self.dir / "b.sub", 315.0, _pulses(200, 3))
+        self.assertEqual(self.index.refresh(), 2)
+        self.assertEqual(self.index.refresh(), 0)
+        self.assertEqual([row[0] for row in self.index.query("315")], ["b.sub"])
+        (self.dir / "a.sub").unlink()
+        self.assertEqual(self.index.refresh(), 1)
+        self.assertEqual(self.names(), ["b.sub"])
+
+    def test_malformed_file_is_dropped_until_it_changes(self):
+        export_flipper_sub(self.dir / "a.sub", 433.92, _pulses(200, 1))
+        export_flipper_sub(self.dir / "b.sub", 433.92, _pulses(200, 1))
+        self.index.refresh()
+        self.assertEqual(len(self.index.duplicates()), 1)
+
+        bad = self.dir / "b.sub"
+        bad.write_text("RAW_Data: 99999999999 -5\n", encoding="utf-8")
+        self.assertEqual(self.index.refresh(), 1)
+        self.assertEqual(self.names(), ["a.sub"])
+        self.assertEqual(self.index.duplicates(), [])
+        self.assertEqual(len(os.listdir(self.dir / ".cache")), 1)
+        self.assertEqual(self.index.refresh(), 0)        # not re-parsed while unchanged
+
+        export_flipper_sub(bad, 433.92, _pulses(201, 1))
+        self.assertEqual(self.index.refresh(), 1)
+        self.assertEqual(self.names(), ["a.sub", "b.sub"])
+
+    def test_match_finds_saved_signal(self):
+        export_flipper_sub(self.dir / "a.sub", 433.92, _pulses(400, 1))
+        export_flipper_sub(self.dir / "b.sub", 433.92, _pulses(400, 3))
+        self.index.refresh()
+        hits = self.index.match(_pulses(400, 1))
+        self.assertEqual(hits[0][0], "a.sub")
+        self.assertGreater(hits[0][1], 0.9)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+# IshtarRF .sub codec tests
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import tempfile, unittest
+from pathlib import Path
+
+from ishtarrf.subfile import RAW_WRAP, export_flipper_sub, parse_flipper_sub
+
+class SubFileTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def write(self, text):
+        path = self.dir / "t.sub"
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def test_round_trip(self):
+        pulses = [350 + 7 * i for i in range(3 * RAW_WRAP + 5)]    # several RAW_Data lines, odd tail
+        for start_negative in (False, True):
+            path = self.dir / f"rt_{start_negative}.sub"
+            export_flipper_sub(path, 433.92, pulses, start_negative=start_negative, repeat=3)
+            sub = parse_flipper_sub(path)
+            self.assertEqual(list(sub["pulses_us"]), pulses)
+            self.assertEqual(sub["start_negative"], start_negative)
+            self.assertEqual(sub["frequency_hz"], 433_920_000)
+            self.assertEqual(sub["repeat"], 3)
+            self.assertEqual(sub["protocol"], "RAW")
+
+    def test_export_clamps_to_one_us(self):
+        export_flipper_sub(self.dir / "c.sub", 433.92, [0, -5, 300])
+        self.assertEqual(list(parse_flipper_sub(self.dir / "c.sub")["pulses_us"]), [1, 1, 300])
+
+    def test_same_sign_durations_merge(self):
+        path = self.write("Frequency: 315000000\n"
+                          "RAW_Data: 100 -200 300\n"
+                          "RAW_Data: 400 -500\n"          # 300 and 400 are both high
+                          "RAW_Data: -600 700\n")         # -500 and -600 are both low
+        sub = parse_flipper_sub(path)
+        self.assertEqual(list(sub["pulses_us"]), [100, 200, 700, 1100, 700])
+        self.assertFalse(sub["start_negative"])
+
+    def test_non_alternating_line(self):
+        path = self.write("RAW_Data: -10 -20 30 40 -50\n")
+        sub = parse_flipper_sub(path)
+        self.assertEqual(list(sub["pulses_us"]), [30, 70, 50])
+        self.assertTrue(sub["start_negative"])
+
+    def test_continuation_lines_and_junk(self):
+        path = self.write("Filetype: Flipper SubGhz RAW File\n"
+                          "Preset: FuriHalSubGhzPresetOok650Async\n"
+                          "RAW_Data: 10 -20\n"
+                          " 30 -40 x\n"
+                          "Protocol: RAW\n"
+                          "50 -60\n")                     # not RAW data after another key
+        sub = parse_flipper_sub(path)
+        self.assertEqual(list(sub["pulses_us"]), [10, 20, 30, 40])
+        self.assertEqual(sub["preset"], "FuriHalSubGhzPresetOok650Async")
+        self.assertIsNone(sub["frequency_hz"])
+
+    def test_out_of_range_is_value_error(self):
+        with self.assertRaises(ValueError):
+            parse_flipper_sub(self.write("RAW_Data: 99999999999 -5\n"))
+        with self.assertRaises(ValueError):
+            parse_flipper_sub(self.write("RAW_Data: 2000000000 2000000000\n"))    # merge overflows
+
+    def test_missing_file(self):
+        with self.assertRaises(OSError):
+            parse_flipper_sub(self.dir / "missing.sub")
+
+if __name__ == "__main__":
+    unittest.main()
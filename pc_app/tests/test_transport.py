@@ -0,0 +1,87 @@
+# IshtarRF serial transport tests, against the pty device emulator
+# Copyright (c) 2025 Cyber ducky
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import unittest
+
+from ishtarrf import protocol
+from ishtarrf.transport import DEFAULT_BAUD, FAST_BAUD, DeviceError, SerialLink
+
+try:
+    import serial   # noqa: F401 (SerialLink.open needs pyserial)
+    from emulator import DeviceEmulator
+except ImportError:         # no pyserial, or no pty (Windows)
+    DeviceEmulator = None
+
+@unittest.skipIf(DeviceEmulator is None, "needs pyserial and a pty")
+class SerialLinkTests(unittest.TestCase):
+    def connect(self, **kw):
+        emu = DeviceEmulator(rate=0, seed=1, **kw)
+        path = emu.start()
+        self.addCleanup(emu.stop)
+        self.events = []
+        link = SerialLink(on_event=self.events.append)
+        link.open(path)
+        self.addCleanup(link.close)
+        link.send(protocol.ping()).result(3)
+        return emu, link
+
+    def check_pipelined_replies(self, link):
+        futs = [link.send(protocol.set_config(433.92)), link.send(protocol.get_rssi()),
+                link.send({"cmd": "bogus"}), link.send(protocol.rx_start()), link.send(protocol.rx_stop())]
+        self.assertEqual(futs[0].result(3)["of"], "set_config")
+        self.assertEqual(futs[1].result(3)["event"], "rssi")
+        with self.assertRaises(DeviceError):
+            futs[2].result(3)
+        self.assertEqual(futs[3].result(3)["of"], "rx_start")
+        self.assertEqual(futs[4].result(3)["of"], "rx_stop")
+        many = [link.send(protocol.get_rssi()) for _ in range(50)]
+        self.assertTrue(all(f.result(5)["event"] == "rssi" for f in many))
+
+    def test_replies_matched_by_id(self):
+        emu, link = self.connect()
+        self.check_pipelined_replies(link)
+        self.assertEqual([e["id"] for e in self.events if e.get("event") == "error"], [4])   # just "bogus"
+
+    def test_replies_matched_in_order_without_ids(self):
+        emu, link = self.connect(ids=False)
+        self.check_pipelined_replies(link)
+
+    def test_no_reply_times_out(self):
+        emu, link = self.connect()
+        emu.garbled = True          # drops commands, like a device that hung
+        with self.assertRaises(TimeoutError):
+            link.send(protocol.get_rssi(), timeout=0.3).result(3)
+
+    def test_close_fails_pending(self):
+        emu, link = self.connect()
+        emu.garbled = True
+        fut = link.send(protocol.get_rssi())
+        link.close()
+        with self.assertRaises(ConnectionError):
+            fut.result(3)
+
+    def test_set_baud(self):
+        emu, link = self.connect(max_baud=FAST_BAUD)
+        queued = link.send(protocol.get_rssi())       # behind the switch, sent after it
+        self.assertEqual(link.set_baud(FAST_BAUD).result(5)["baud"], FAST_BAUD)
+        self.assertEqual((link.baud, emu.link_baud), (FAST_BAUD, FAST_BAUD))
+        self.assertEqual(queued.result(5)["event"], "rssi")
+
+    def test_set_baud_falls_back(self):
+        emu, link = self.connect(max_baud=460800)     # the bridge garbles anything faster
+        fut = link.set_baud(FAST_BAUD)
+        queued = link.send(protocol.get_rssi())
+        with self.assertRaises(ConnectionError):
+            fut.result(10)
+        self.assertEqual((link.baud, emu.link_baud), (DEFAULT_BAUD, DEFAULT_BAUD))
+        self.assertEqual(queued.result(5)["event"], "rssi")
+
+    def test_set_baud_unsupported_rate(self):
+        emu, link = self.connect()
+        with self.assertRaises(DeviceError):
+            link.set_baud(250000).result(5)
+        self.assertEqual((link.baud, emu.link_baud), (DEFAULT_BAUD, DEFAULT_BAUD))
+
+if __name__ == "__main__":
+    unittest.main()